@@ -1,10 +1,12 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import categories, templates, users, projects, user_assets, shared_projects, auth
+from app.api.v1.endpoints import categories, templates, users, projects, user_assets, shared_projects, auth, me
 
 api_router = APIRouter()
 
 # Authentification (non protégée)
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
+# Espace de l'utilisateur connecté
+api_router.include_router(me.router, prefix="/me", tags=["me"])
 
 # Routes protégées ( à sécuriser plus tard)
 api_router.include_router(categories.router, prefix="/categories", tags=["categories"])
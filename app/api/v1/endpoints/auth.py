@@ -1,19 +1,18 @@
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app.deps.database import get_db
-from app.deps.auth import get_current_active_user
+from app.deps.database import get_async_db
+from app.deps.auth import get_current_active_user, get_current_active_principal
 from app.core.security import (
-    verify_password,
-    get_password_hash,
     create_access_token,
     create_refresh_token,
     verify_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.crud.crud_users import user
+from app.services.password_hashing import HashingOverloaded, password_hasher
 from app.schemas.schemas import (
     UserLogin,
     UserRegister,
@@ -25,24 +24,34 @@ from app.schemas.schemas import (
 
 router = APIRouter()
 
+def _hashing_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many authentication requests, retry later",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     user_data: UserRegister,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Inscription d'un nouvel utilisateur
     """
     # Vérifier si l'email existe déjà
-    existing_user = user.get_by_email(db, email=user_data.email)
+    existing_user = await user.get_by_email(db, email=user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
-    # Hacher le mot de passe
-    hashed_password = get_password_hash(user_data.password)
+    # Hacher le mot de passe (pool de processus dédié)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except HashingOverloaded:
+        raise _hashing_overloaded()
 
     # Créer l'utilisateur
     user_create = UserCreate(
@@ -52,34 +61,38 @@ def register(
         is_active=True
     )
 
-    db_user = user.create(db, obj_in=user_create)
+    db_user = await user.create(db, obj_in=user_create)
 
     if not db_user.is_active:
         db_user.is_active = True
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
 
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     user_credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Connexion d'un utilisateur
     """
     # Récupérer l'utilisateur par email
-    db_user = user.get_by_email(db, email=user_credentials.email)
+    db_user = await user.get_by_email(db, email=user_credentials.email)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
-    # Vérifier le mot de passe
-    if not verify_password(user_credentials.password, db_user.password_hash):
+    # Vérifier le mot de passe (pool de processus dédié)
+    try:
+        valid, new_hash = await password_hasher.verify(user_credentials.password, db_user.password_hash)
+    except HashingOverloaded:
+        raise _hashing_overloaded()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -92,13 +105,18 @@ def login(
             detail="Inactive user"
         )
 
+    # Re-hacher si BCRYPT_ROUNDS a changé depuis le dernier login
+    if new_hash:
+        db_user.password_hash = new_hash
+        await db.commit()
+
     # Créer les tokens
     access_token = create_access_token(
-        data={"sub": str(db_user.id)},
+        data={"sub": str(db_user.id), "ver": db_user.token_version or 0},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     refresh_token = create_refresh_token(
-        data={"sub": str(db_user.id)}
+        data={"sub": str(db_user.id), "ver": db_user.token_version or 0}
     )
 
     return Token(
@@ -109,9 +127,9 @@ def login(
 
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(
+async def refresh_token(
     refresh_data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Rafraîchir le token d'accès
@@ -133,20 +151,27 @@ def refresh_token(
         )
 
     # Vérifier que l'utilisateur existe toujours
-    db_user = user.get(db, id=int(user_id))
+    db_user = await user.get(db, id=int(user_id))
     if db_user is None or not db_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
         )
 
+    # Refuser les refresh tokens révoqués
+    if (db_user.token_version or 0) != payload.get("ver", 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+
     # Créer de nouveaux tokens
     access_token = create_access_token(
-        data={"sub": str(db_user.id)},
+        data={"sub": str(db_user.id), "ver": db_user.token_version or 0},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     refresh_token = create_refresh_token(
-        data={"sub": str(db_user.id)}
+        data={"sub": str(db_user.id), "ver": db_user.token_version or 0}
     )
 
     return Token(
@@ -157,7 +182,7 @@ def refresh_token(
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(
+async def get_current_user_info(
     current_user: Any = Depends(get_current_active_user)
 ):
     """
@@ -166,8 +191,8 @@ def get_current_user_info(
     return current_user
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
-def logout(
-    current_user: Any = Depends(get_current_active_user)
+async def logout(
+    current_user: Any = Depends(get_current_active_principal)
 ):
     """
     Déconnexion (côté client, supprime le token)
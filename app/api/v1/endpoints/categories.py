@@ -1,43 +1,48 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps.database import get_db
-from app.deps.auth import get_current_active_user
+from app.core.http_cache import conditional_response
+from app.deps.database import get_async_db
+from app.deps.auth import get_current_active_principal
 from app.crud.crud_category import category
-from app.schemas.schemas import CategoryCreate, CategoryUpdate, CategoryResponse
-from app.models.models import User
+from app.deps.pagination import PageParams
+from app.schemas.schemas import CategoryCreate, CategoryUpdate, CategoryResponse, Page
+from app.services.user_snapshots import UserSnapshot
 
 router = APIRouter()
 
 # ======== ENDPOINTS PUBLICS (pour la landing page) ========
 
-@router.get("/", response_model=List[CategoryResponse])
-def get_categories(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+@router.get("/", response_model=Page[CategoryResponse])
+async def get_categories(
+    request: Request,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer toutes les catégories avec pagination
     """
-    categories = category.get_multi(db, skip=skip, limit=limit)
-    return categories
+    categories, next_cursor = await category.get_page(db, cursor=page.cursor, limit=page.limit)
+    return conditional_response(request, Page[CategoryResponse], {"items": categories, "next_cursor": next_cursor})
 
-@router.get("/active", response_model=List[CategoryResponse])
-def get_active_categories(db: Session = Depends(get_db)):
+@router.get("/active", response_model=Page[CategoryResponse])
+async def get_active_categories(
+    request: Request,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Récupérer uniquement les catégories actives
     """
-    categories = category.get_active_categories(db)
-    return categories
+    categories, next_cursor = await category.get_active_categories(db, cursor=page.cursor, limit=page.limit)
+    return conditional_response(request, Page[CategoryResponse], {"items": categories, "next_cursor": next_cursor})
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+async def get_category(category_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Récupérer une catégorie par son ID
     """
-    db_category = category.get(db, id=category_id)
+    db_category = await category.get(db, id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,34 +53,34 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
 # ======== ENDPOINTS PROTÉGÉS (authentification) ========
 
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category_in: CategoryCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Créer une nouvelle catégorie (PROTEGE par auth)
     """
     # Vérifier si le nom existe déjà
-    existing_category = category.get_by_name(db, name=category_in.name)
+    existing_category = await category.get_by_name(db, name=category_in.name)
     if existing_category:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Category with this name already exists"
         )
-    return category.create(db, obj_in=category_in)
+    return await category.create(db, obj_in=category_in)
 
 @router.put("/{category_id}", response_model=CategoryResponse)
-def update_category(
+async def update_category(
     category_id: int, 
     category_in: CategoryUpdate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Mettre à jour une catégorie
     """
-    db_category = category.get(db, id=category_id)
+    db_category = await category.get(db, id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,28 +89,28 @@ def update_category(
     
     # Vérifier si le nouveau nom existe (si on change le nom)
     if category_in.name and category_in.name != db_category.name:
-        existing_category = category.get_by_name(db, name=category_in.name)
+        existing_category = await category.get_by_name(db, name=category_in.name)
         if existing_category:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Category with this name already exists"
             )
             
-    return category.update(db, db_obj=db_category, obj_in=category_in)
+    return await category.update(db, db_obj=db_category, obj_in=category_in)
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
-    category_id: int, db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+async def delete_category(
+    category_id: int, db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Supprimer une catégorie
     """
-    db_category = category.get(db, id=category_id)
+    db_category = await category.get(db, id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    category.remove(db, id=category_id)
+    await category.remove(db, id=category_id)
     return None
\ No newline at end of file
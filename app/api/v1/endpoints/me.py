@@ -0,0 +1,115 @@
+import os
+from datetime import date
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.query_stats import allow_batched_queries
+from app.core.serialization import fast_response
+from app.deps.auth import get_current_active_principal
+from app.schemas.schemas import Dashboard, ImportResult
+from app.services.autosave import autosave_buffer
+from app.services.dashboard import load_dashboard
+from app.services.portability import (
+    NDJSON_MEDIA_TYPE, USER_TYPES, ZIP_MEDIA_TYPE, ImportTooLarge, InvalidImport,
+    export_ndjson, export_zip, import_records, ndjson_records, spool_archive, zip_records,
+)
+from app.services.user_snapshots import UserSnapshot
+
+router = APIRouter()
+
+# Corps de POST /import, lu en flux par l'endpoint (documenté pour OpenAPI)
+IMPORT_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        ZIP_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+    },
+}
+
+def _section_limit(description: str) -> int:
+    return Query(settings.DASHBOARD_SECTION_LIMIT, ge=0, le=settings.MAX_PAGE_SIZE, description=description)
+
+@router.get("/dashboard", response_model=Dashboard)
+async def get_dashboard(
+    projects_limit: int = _section_limit("Nombre de projets (0 = section vide)"),
+    shared_limit: int = _section_limit("Nombre de projets partagés (0 = section vide)"),
+    assets_limit: int = _section_limit("Nombre d'assets (0 = section vide)"),
+    categories_limit: int = _section_limit("Nombre de catégories actives (0 = section vide)"),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Page d'accueil de l'éditeur en une requête : utilisateur connecté, ses projets, les projets
+    partagés avec lui, ses assets et les catégories actives (sections lues en parallèle)
+    Chaque section est une page dont le next_cursor se poursuit sur l'endpoint de liste correspondant
+    """
+    dashboard = await load_dashboard(current_user.id, limits={
+        "projects": projects_limit,
+        "shared_projects": shared_limit,
+        "assets": assets_limit,
+        "categories": categories_limit,
+    })
+    if dashboard is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    return fast_response(Dashboard, dashboard)
+
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, ZIP_MEDIA_TYPE: {}}}})
+async def export_my_data(
+    format: Literal["ndjson", "zip"] = Query("ndjson", description="NDJSON (une ligne par enregistrement) ou archive zip"),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Exporter en flux les projets et assets de l'utilisateur connecté (sauvegarde, portabilité)
+    Lecture par curseur côté serveur et envoi lot par lot : mémoire constante quelle que soit la taille du compte
+    """
+    # Canvas en attente dans le tampon d'autosave de ce worker : écrits avant la lecture
+    await autosave_buffer.flush_all()
+    filename = f"export-{current_user.id}-{date.today().isoformat()}.{format}"
+    if format == "zip":
+        chunks, media_type = export_zip(current_user.id, USER_TYPES), ZIP_MEDIA_TYPE
+    else:
+        chunks, media_type = export_ndjson(current_user.id, USER_TYPES), NDJSON_MEDIA_TYPE
+    return StreamingResponse(
+        chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post("/import", response_model=ImportResult, openapi_extra={"requestBody": IMPORT_REQUEST_BODY})
+async def import_my_data(
+    request: Request,
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Importer en flux un export (NDJSON, ou zip avec Content-Type application/zip) dans le compte de l'utilisateur connecté
+    Insertion par lots ; nouveaux ids, templates ignorés, assets soumis au quota de stockage
+    Les lignes invalides sont rapportées dans errors (numéro de ligne) sans interrompre l'import
+    """
+    allow_batched_queries()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    path = None
+    try:
+        if content_type in (ZIP_MEDIA_TYPE, "application/x-zip-compressed"):
+            path = await spool_archive(request.stream())
+            records = zip_records(path)
+        else:
+            records = ndjson_records(request.stream())
+        return await import_records(
+            records, user_id=current_user.id, quota=settings.STORAGE_QUOTA_BYTES
+        )
+    except InvalidImport as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    except ImportTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Record exceeds {settings.IMPORT_MAX_RECORD_BYTES} bytes or archive exceeds {settings.IMPORT_MAX_ARCHIVE_BYTES} bytes"
+        )
+    finally:
+        if path is not None:
+            os.unlink(path)
@@ -1,95 +1,151 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from typing import List, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps.database import get_db
-from app.deps.auth import get_current_active_user
+from app.core.http_cache import check_if_match, conditional_response, is_conditional, make_etag, version_part
+from app.core.serialization import JSON_RESPONSE_CLASS, page_response
+from app.deps.database import get_async_db
+from app.deps.access import ProjectAccess
+from app.deps.auth import get_current_active_principal, get_optional_principal
+from app.crud.base import ResourceModified
 from app.crud.crud_project import project
+from app.crud.json_patch import JsonPatchError, VersionConflict
 from app.crud.crud_users import user
-from app.schemas.schemas import ProjectCreate, ProjectUpdate, ProjectResponse
-from app.models.models import User
+from app.deps.fields import FieldsParam, project_items
+from app.deps.pagination import PageParams
+from app.schemas.schemas import ProjectCreate, ProjectUpdate, ProjectResponse, ProjectSummary, Page, UserResponse, AccessibleProject, CanvasPatch, CanvasVersion, AutosaveRequest, AutosaveStatus
+from app.models.models import Project
+from app.services.autosave import autosave_buffer
+from app.services.permissions import invalidate_permission, remember_permission
+from app.services.thumbnails import thumbnail_renderer
+from app.services.user_snapshots import UserSnapshot
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ProjectResponse])
-def get_projects(
-    skip: int = 0,
-    limit: int = 100,
+def _project_etag(db_project: Project) -> str:
+    """
+    ETag d'un projet, "version.miniature" : sa version (id, updated_at et le propriétaire embarqué
+    dans la réponse), puis la miniature, enregistrée après coup sans changer updated_at.
+    If-Match ne compare que la version (check_if_match(..., version_only=True)).
+    """
+    owner = UserResponse.model_validate(db_project.owner).model_dump_json()
+    version = make_etag(db_project.id, db_project.updated_at.isoformat(), owner)
+    thumbnail = make_etag(db_project.thumbnail_url)
+    return f'"{version_part(version)}.{version_part(thumbnail)[:12]}"'
+
+# Champs dont dépend la miniature rendue côté serveur
+RENDERED_FIELDS = {"canvas_data", "format_type", "width", "height"}
+
+def _project_page(projects: List[Project], next_cursor: Optional[str], fields: Optional[Set[str]]):
+    """Page de ProjectSummary, ou des seuls champs demandés avec fields=..."""
+    if fields is None:
+        return page_response(Page[ProjectSummary], projects, next_cursor)
+    return JSON_RESPONSE_CLASS({"items": project_items(ProjectResponse, projects, fields), "next_cursor": next_cursor})
+
+@router.get("/", response_model=Page[ProjectSummary])
+async def get_projects(
+    page: PageParams = Depends(),
     owner_id: Optional[int] = Query(None, description="Filter by owner ID"),
     format_type: Optional[str] = Query(None, description="Filter by format (A4, A5, custom)"),
     search: Optional[str] = Query(None, description="Search in title and description"),
     public_only: bool = Query(False, description="Show only public projects"),
-    db: Session = Depends(get_db)
+    fields: Optional[Set[str]] = Depends(FieldsParam(ProjectResponse)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les projets avec filtres optionnels
     """
+    options = project.projection_options(fields)
     if search:
-        projects = project.search_projects(db, query=search)
+        projects, next_cursor = await project.search_projects(db, query=search, cursor=page.cursor, limit=page.limit, options=options)
     elif owner_id:
-        projects = project.get_user_projects(db, owner_id=owner_id, skip=skip, limit=limit)
+        projects, next_cursor = await project.get_user_projects(db, owner_id=owner_id, cursor=page.cursor, limit=page.limit, options=options)
     elif format_type:
-        projects = project.get_by_format(db, format_type=format_type)
+        projects, next_cursor = await project.get_by_format(db, format_type=format_type, cursor=page.cursor, limit=page.limit, options=options)
     elif public_only:
-        projects = project.get_public_projects(db, skip=skip, limit=limit)
+        projects, next_cursor = await project.get_public_projects(db, cursor=page.cursor, limit=page.limit, options=options)
     else:
-        projects = project.get_multi(db, skip=skip, limit=limit)
+        projects, next_cursor = await project.get_page(db, cursor=page.cursor, limit=page.limit, options=options)
 
-    return projects
+    return _project_page(projects, next_cursor, fields)
 
-@router.get("/public", response_model=List[ProjectResponse])
-def get_public_projects(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+@router.get("/public", response_model=Page[ProjectSummary])
+async def get_public_projects(
+    page: PageParams = Depends(),
+    fields: Optional[Set[str]] = Depends(FieldsParam(ProjectResponse)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer uniquement les projets publics
     """
-    projects = project.get_public_projects(db, skip=skip, limit=limit)
-    return projects
+    projects, next_cursor = await project.get_public_projects(
+        db, cursor=page.cursor, limit=page.limit, options=project.projection_options(fields)
+    )
+    return _project_page(projects, next_cursor, fields)
+
+@router.get("/accessible", response_model=Page[AccessibleProject])
+async def get_accessible_projects(
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Projets possédés ou partagés avec l'utilisateur connecté, avec la permission effective
+    (owner, edit, copy, view) : une seule requête, quel que soit le nombre de partages
+    """
+    rows, next_cursor = await project.get_accessible_page(
+        db, user_id=current_user.id, cursor=page.cursor, limit=page.limit
+    )
+    # Les projets listés sont souvent ouverts ensuite : leurs permissions sont déjà résolues
+    for db_project, permission in rows:
+        remember_permission(current_user.id, db_project.id, permission)
+    items = [{"project": db_project, "permission": permission} for db_project, permission in rows]
+    return page_response(Page[AccessibleProject], items, next_cursor)
 
-@router.get("/user/{user_id}", response_model=List[ProjectResponse])
-def get_user_projects(
+@router.get("/user/{user_id}", response_model=Page[ProjectSummary])
+async def get_user_projects(
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    fields: Optional[Set[str]] = Depends(FieldsParam(ProjectResponse)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les projets d'un utilisateur
     """
     # Vérifier que l'utilisateur existe
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get(db, id=user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    projects = project.get_user_projects(db, owner_id=user_id, skip=skip, limit=limit)
-    return projects
+    projects, next_cursor = await project.get_user_projects(
+        db, owner_id=user_id, cursor=page.cursor, limit=page.limit, options=project.projection_options(fields)
+    )
+    return _project_page(projects, next_cursor, fields)
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-def get_project(
+async def get_project(
     project_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    access: ProjectAccess = Depends(),
+    principal: Optional[UserSnapshot] = Depends(get_optional_principal)
 ):
     """
-    Récupérer un projet par son ID
+    Récupérer un projet par son ID (304 si If-None-Match / If-Modified-Since correspond)
+    Projet public, ou accessible à l'utilisateur connecté (propriétaire ou partage) ; 404 sinon
     """
-    db_project = project.get(db, id=project_id)
-    if not db_project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-    return db_project
+    db_project = await access.get_readable(project_id, principal, cached=not is_conditional(request))
+    return conditional_response(
+        request, ProjectResponse, db_project,
+        etag=_project_etag(db_project), last_modified=db_project.updated_at
+    )
 
 @router.post("/", response_model=ProjectResponse, status_code=status.HTTP_201_CREATED)
-def create_project(
+async def create_project(
     project_in: ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Créer un nouveau projet
@@ -98,44 +154,161 @@ def create_project(
     project_data = project_in.model_dump()
     project_data["owner_id"] = current_user.id
     
-    return project.create(db, obj_in=ProjectCreate(**project_data))
+    db_project = await project.create(db, obj_in=ProjectCreate(**project_data))
+    # Un "aucun accès" mis en cache pour cet id (projet supprimé puis id réutilisé...) serait faux
+    invalidate_permission(current_user.id, db_project.id)
+    thumbnail_renderer.schedule(db_project.id)
+    return db_project
 
 @router.put("/{project_id}", response_model=ProjectResponse)
-def update_project(
+async def update_project(
     project_id: int,
     project_in: ProjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
-    Mettre à jour un projet
+    Mettre à jour un projet (412 si If-Match ne correspond pas à la version courante)
+    Réservé au propriétaire et aux partages en édition
     """
-    db_project = project.get(db, id=project_id)
+    # Version courante lue en base : le cache d'entités d'un worker peut précéder une écriture d'un autre
+    db_project = await project.get(db, id=project_id, cached=False)
     if not db_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
+    await access.require(project_id, current_user, "edit", db_project=db_project)
 
-    # Plus tard, avec l'authentification, on vérifiera que l'utilisateur
-    # connecté est bien le propriétaire du projet
-    
-    return project.update(db, db_obj=db_project, obj_in=project_in)
+    check_if_match(request, _project_etag(db_project), version_only=True)
+
+    # Le canvas du PUT remplace l'autosave en attente : sans cela, le prochain flush l'écraserait
+    if "canvas_data" in project_in.model_fields_set:
+        await autosave_buffer.discard(project_id)
+
+    # La version vérifiée est aussi la condition de l'UPDATE : deux PUT concurrents avec le même
+    # If-Match ne peuvent pas réussir tous les deux
+    try:
+        db_project = await project.update(
+            db, db_obj=db_project, obj_in=project_in, if_unmodified="if-match" in request.headers
+        )
+    except ResourceModified:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified"
+        )
+    # Une miniature fournie explicitement par le client n'est pas remplacée
+    changed = project_in.model_fields_set
+    if changed & RENDERED_FIELDS and "thumbnail_url" not in changed:
+        thumbnail_renderer.schedule(project_id)
+    response.headers["ETag"] = _project_etag(db_project)
+    return db_project
+
+@router.patch("/{project_id}/canvas", response_model=CanvasVersion)
+async def patch_project_canvas(
+    project_id: int,
+    patch: CanvasPatch,
+    db: AsyncSession = Depends(get_async_db),
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Mise à jour incrémentale du canvas (JSON Patch, RFC 6902) appliquée en base
+    409 si le canvas a changé depuis `version`, 422 si une opération n'est pas applicable
+    """
+    await access.require(project_id, current_user, "edit")
+    # Comme PUT : le patch part de la version en base, l'autosave en attente ne doit pas l'écraser au flush suivant
+    await autosave_buffer.discard(project_id)
+    try:
+        new_version = await project.patch_canvas(
+            db, id=project_id, version=patch.version, operations=patch.operations
+        )
+    except VersionConflict as exc:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Canvas version conflict", "current_version": exc.current_version}
+        )
+    except JsonPatchError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(exc)
+        )
+    if new_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    thumbnail_renderer.schedule(project_id)
+    return CanvasVersion(version=new_version)
+
+@router.put("/{project_id}/autosave", response_model=AutosaveStatus, status_code=status.HTTP_202_ACCEPTED)
+async def autosave_project_canvas(
+    project_id: int,
+    autosave_in: AutosaveRequest,
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Autosave du canvas : gardé en mémoire et écrit en base au prochain flush (quelques secondes)
+    Une sauvegarde remplace la précédente non encore écrite ; 202 ne garantit pas la durabilité
+    """
+    await access.require(project_id, current_user, "edit")
+    return await autosave_buffer.save(project_id, autosave_in.canvas_data)
+
+@router.post("/{project_id}/autosave/flush", response_model=AutosaveStatus)
+async def flush_project_autosave(
+    project_id: int,
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Sauvegarde explicite : écrit immédiatement le canvas en attente (réponse après le commit)
+    """
+    await access.require(project_id, current_user, "edit")
+    state = await autosave_buffer.flush_project(project_id)
+    if state is None:
+        return AutosaveStatus(project_id=project_id, state="idle")
+    if state.state == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Autosave flush failed: {state.error}"
+        )
+    return state
+
+@router.get("/{project_id}/autosave", response_model=AutosaveStatus)
+async def get_project_autosave_status(
+    project_id: int,
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    État de l'autosave du projet sur ce worker (pending, saved, failed...)
+    """
+    await access.require(project_id, current_user, "edit")
+    state = autosave_buffer.status(project_id)
+    if state is None:
+        return AutosaveStatus(project_id=project_id, state="idle")
+    return state
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(
+async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
-    Supprimer un projet
+    Supprimer un projet (réservé au propriétaire)
     """
-    db_project = project.get(db, id=project_id)
+    db_project = await project.get(db, id=project_id)
     if not db_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
-    project.remove(db, id=project_id)
+    await access.require(project_id, current_user, "owner", db_project=db_project)
+    await project.remove(db, id=project_id)
     return None
\ No newline at end of file
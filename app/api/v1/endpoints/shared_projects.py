@@ -1,86 +1,96 @@
-from typing import List, Optional
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps.database import get_db
+from app.deps.access import ProjectAccess
+from app.deps.auth import get_current_active_principal
+from app.deps.database import get_async_db
 from app.crud.crud_shared_project import shared_project
 from app.crud.crud_users import user
 from app.crud.crud_project import project
-from app.schemas.schemas import SharedProjectCreate, SharedProjectResponse
+from app.core.serialization import page_response
+from app.deps.pagination import PageParams
+from app.services.user_snapshots import UserSnapshot
+from app.schemas.schemas import (
+    SharedProjectCreate, SharedProjectResponse, Page, BulkCreate, BulkCreateResult, BulkDelete, BulkDeleteResult,
+    BulkItemError
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[SharedProjectResponse])
-def get_shared_projects(
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/", response_model=Page[SharedProjectResponse])
+async def get_shared_projects(
+    page: PageParams = Depends(),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     project_id: Optional[int] = Query(None, description="Filter by project ID"),
     permission: Optional[str] = Query(None, description="Filter by permission"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les projets partagés avec filtres optionnels
     """
     if user_id:
-        shares = shared_project.get_by_user(db, user_id=user_id)
+        shares, next_cursor = await shared_project.get_by_user(db, user_id=user_id, cursor=page.cursor, limit=page.limit)
     elif project_id:
-        shares = shared_project.get_by_project(db, project_id=project_id)
+        shares, next_cursor = await shared_project.get_by_project(db, project_id=project_id, cursor=page.cursor, limit=page.limit)
     elif permission:
-        shares = shared_project.get_by_permission(db, permission=permission)
+        shares, next_cursor = await shared_project.get_by_permission(db, permission=permission, cursor=page.cursor, limit=page.limit)
     else:
-        shares = shared_project.get_multi(db, skip=skip, limit=limit)
+        shares, next_cursor = await shared_project.get_page(db, cursor=page.cursor, limit=page.limit)
     
-    return shares
+    return page_response(Page[SharedProjectResponse], shares, next_cursor)
 
-@router.get("/user/{user_id}", response_model=List[SharedProjectResponse])
-def get_user_shared_projects(
+@router.get("/user/{user_id}", response_model=Page[SharedProjectResponse])
+async def get_user_shared_projects(
     user_id: int,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les projets partagés avec un utilisateur
     """
     # Vérifier que l'utilisateur existe
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get(db, id=user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    shares = shared_project.get_by_user(db, user_id=user_id)
-    return shares
+    shares, next_cursor = await shared_project.get_by_user(db, user_id=user_id, cursor=page.cursor, limit=page.limit)
+    return page_response(Page[SharedProjectResponse], shares, next_cursor)
 
-@router.get("/project/{project_id}", response_model=List[SharedProjectResponse])
-def get_project_shares(
+@router.get("/project/{project_id}", response_model=Page[SharedProjectResponse])
+async def get_project_shares(
     project_id: int,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les partages d'un projet
     """
     # Vérifier que le projet existe
-    db_project = project.get(db, id=project_id)
+    db_project = await project.get(db, id=project_id)
     if not db_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Project not found"
         )
     
-    shares = shared_project.get_by_project(db, project_id=project_id)
-    return shares
+    shares, next_cursor = await shared_project.get_by_project(db, project_id=project_id, cursor=page.cursor, limit=page.limit)
+    return page_response(Page[SharedProjectResponse], shares, next_cursor)
 
 @router.get("/permission/{user_id}/{project_id}", response_model=SharedProjectResponse)
-def get_user_project_permission(
+async def get_user_project_permission(
     user_id: int,
     project_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer la permission d'un utilisateur sur un projet
     """
-    permission = shared_project.get_user_project_permission(db, user_id=user_id, project_id=project_id)
+    permission = await shared_project.get_user_project_permission(db, user_id=user_id, project_id=project_id)
     if not permission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,14 +99,14 @@ def get_user_project_permission(
     return permission
 
 @router.get("/{share_id}", response_model=SharedProjectResponse)
-def get_shared_project(
+async def get_shared_project(
     share_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer un partage par son ID
     """
-    db_share = shared_project.get(db, id=share_id)
+    db_share = await shared_project.get(db, id=share_id)
     if not db_share:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,73 +115,139 @@ def get_shared_project(
     return db_share
 
 @router.post("/", response_model=SharedProjectResponse, status_code=status.HTTP_201_CREATED)
-def create_shared_project(
+async def create_shared_project(
     share_in: SharedProjectCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Créer un nouveau partage de projet
+    Réservé au propriétaire du projet
     """
+    # Vérifie aussi l'existence du projet (404 s'il n'est pas accessible)
+    await access.require(share_in.project_id, current_user, "owner")
+
     # Vérifier que l'utilisateur existe
-    db_user = user.get(db, id=share_in.shared_with_id)
+    db_user = await user.get(db, id=share_in.shared_with_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User not found"
         )
     
-    # Vérifier que le projet existe
-    db_project = project.get(db, id=share_in.project_id)
-    if not db_project:
+    # L'index unique (shared_with_user_id, project_id) refuse les doublons, même concurrents
+    try:
+        return await shared_project.create(db, obj_in=share_in)
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Project not found"
+            detail="Project already shared with this user"
         )
-    
-    # Vérifier qu'il n'existe pas déjà un partage
-    existing_share = shared_project.get_user_project_permission(
-        db, user_id=share_in.shared_with_id, project_id=share_in.project_id
+
+@router.post("/bulk", response_model=BulkCreateResult[SharedProjectResponse])
+async def create_shared_projects_bulk(
+    bulk_in: BulkCreate[SharedProjectCreate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Créer plusieurs partages de projets de l'utilisateur connecté en une requête : utilisateurs,
+    projets possédés et doublons sont vérifiés en une requête IN chacun, les partages valides
+    insérés en un seul INSERT.
+    Les éléments refusés sont rapportés par position dans errors (projet d'un autre utilisateur : not found).
+    """
+    items = bulk_in.items
+    user_ids = await user.existing_ids(db, {share_in.shared_with_id for share_in in items})
+    project_ids = await project.owned_ids(db, owner_id=current_user.id, ids={share_in.project_id for share_in in items})
+    already_shared = await shared_project.existing_pairs(
+        db, pairs={(share_in.shared_with_id, share_in.project_id) for share_in in items}
     )
-    if existing_share:
+
+    valid, errors = [], []
+    for index, share_in in enumerate(items):
+        pair = (share_in.shared_with_id, share_in.project_id)
+        if share_in.shared_with_id not in user_ids:
+            errors.append(BulkItemError(index=index, detail="User not found"))
+        elif share_in.project_id not in project_ids:
+            errors.append(BulkItemError(index=index, detail="Project not found"))
+        elif pair in already_shared:
+            errors.append(BulkItemError(index=index, detail="Project already shared with this user"))
+        else:
+            already_shared.add(pair)
+            valid.append(share_in)
+
+    # Un partage concurrent peut encore violer l'index unique entre la vérification et l'INSERT
+    try:
+        created = await shared_project.create_many(db, objs_in=valid)
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Project already shared with this user"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Shares changed concurrently, retry the request"
         )
-    
-    return shared_project.create(db, obj_in=share_in)
+    return {"created": created, "errors": errors}
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_shared_projects_bulk(
+    bulk_in: BulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Supprimer plusieurs partages de projets de l'utilisateur connecté en une requête
+    Les ids inconnus ou de projets d'un autre utilisateur sont rapportés par élément (not found)
+    """
+    deleted = set(await shared_project.remove_many(db, ids=bulk_in.ids, owner_id=current_user.id))
+    errors = [
+        BulkItemError(index=index, detail="Shared project not found")
+        for index, share_id in enumerate(bulk_in.ids) if share_id not in deleted
+    ]
+    return BulkDeleteResult(deleted=sorted(deleted), errors=errors)
 
 @router.put("/{share_id}", response_model=SharedProjectResponse)
-def update_shared_project(
+async def update_shared_project(
     share_id: int,
     share_in: SharedProjectResponse,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Mettre à jour un partage de projet
+    Réservé au propriétaire du projet (et du projet de destination si le partage est déplacé)
     """
-    db_share = shared_project.get(db, id=share_id)
+    db_share = await shared_project.get(db, id=share_id)
     if not db_share:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Shared project not found"
         )
-    
-    return shared_project.update(db, db_obj=db_share, obj_in=share_in)
+    await access.require(db_share.project_id, current_user, "owner")
+    if share_in.project_id != db_share.project_id:
+        await access.require(share_in.project_id, current_user, "owner")
+
+    return await shared_project.update(db, db_obj=db_share, obj_in=share_in)
 
 @router.delete("/{share_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_shared_project(
+async def delete_shared_project(
     share_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    access: ProjectAccess = Depends(),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Supprimer un partage de projet
+    Réservé au propriétaire du projet
     """
-    db_share = shared_project.get(db, id=share_id)
+    db_share = await shared_project.get(db, id=share_id)
     if not db_share:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Shared project not found"
         )
-    
-    shared_project.remove(db, id=share_id)
+    await access.require(db_share.project_id, current_user, "owner")
+
+    await shared_project.remove(db, id=share_id)
     return None
@@ -1,139 +1,171 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps.database import get_db
-from app.deps.auth import get_current_active_user
+from app.core.http_cache import check_if_match, conditional_response, is_conditional, representation_etag
+from app.deps.database import get_async_db
+from app.deps.auth import get_current_active_principal
 from app.crud.crud_template import template
 from app.crud.crud_category import category
-from app.schemas.schemas import TemplateCreate, TemplateUpdate, TemplateResponse
-from app.models.models import User
+from app.deps.fields import FieldsParam, project_items
+from app.deps.pagination import PageParams
+from app.models.models import Template
+from app.schemas.schemas import TemplateCreate, TemplateUpdate, TemplateResponse, TemplateSummary, Page
+from app.services.user_snapshots import UserSnapshot
 
 router = APIRouter()
 
-@router.get("/", response_model=List[TemplateResponse])
-def get_templates(
-    skip: int=0,
-    limit: int = 100,
+def _template_page(request: Request, templates: List[Template], next_cursor: Optional[str], fields: Optional[Set[str]]):
+    """Page de TemplateSummary, ou des seuls champs demandés avec fields=..."""
+    if fields is None:
+        return conditional_response(request, Page[TemplateSummary], {"items": templates, "next_cursor": next_cursor})
+    items = project_items(TemplateResponse, templates, fields)
+    return conditional_response(request, Page[Dict[str, Any]], {"items": items, "next_cursor": next_cursor})
+
+@router.get("/", response_model=Page[TemplateSummary])
+async def get_templates(
+    request: Request,
+    page: PageParams = Depends(),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
     search: Optional[str] = Query(None, description="Search in title and description"),
-    db: Session = Depends(get_db)
+    fields: Optional[Set[str]] = Depends(FieldsParam(TemplateResponse)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les templates avec filtres optionnels
     """
+    options = template.projection_options(fields)
     if search:
-        templates = template.search_templates(db, query=search)
+        templates, next_cursor = await template.search_templates(db, query=search, cursor=page.cursor, limit=page.limit, options=options)
     elif category_id:
-        templates = template.get_by_category(db, category_id=category_id)
+        templates, next_cursor = await template.get_by_category(db, category_id=category_id, cursor=page.cursor, limit=page.limit, options=options)
     else:
-        templates = template.get_multi(db, skip=skip, limit=limit)
+        templates, next_cursor = await template.get_page(db, cursor=page.cursor, limit=page.limit, options=options)
     
-    return templates
+    return _template_page(request, templates, next_cursor, fields)
 
-@router.get("/active", response_model=List[TemplateResponse])
-def get_active_templates(db: Session = Depends(get_db)):
+@router.get("/active", response_model=Page[TemplateSummary])
+async def get_active_templates(
+    request: Request,
+    page: PageParams = Depends(),
+    fields: Optional[Set[str]] = Depends(FieldsParam(TemplateResponse)),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
     Récupérer uniquement les templates actifs
     """
-    templates = template.get_active_templates(db)
-    return templates
+    templates, next_cursor = await template.get_active_templates(
+        db, cursor=page.cursor, limit=page.limit, options=template.projection_options(fields)
+    )
+    return _template_page(request, templates, next_cursor, fields)
 
-@router.get("/category/{category_id}", response_model=List[TemplateResponse])
-def get_templates_by_category(
+@router.get("/category/{category_id}", response_model=Page[TemplateSummary])
+async def get_templates_by_category(
     category_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    page: PageParams = Depends(),
+    fields: Optional[Set[str]] = Depends(FieldsParam(TemplateResponse)),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les templates d'une catégorie spécifique
     """
     # Vérifier que la catégorie existe
-    db_category = category.get(db, id=category_id)
+    db_category = await category.get(db, id=category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
-    templates = template.get_by_category(db, category_id=category_id)
-    return templates
+    templates, next_cursor = await template.get_by_category(
+        db, category_id=category_id, cursor=page.cursor, limit=page.limit, options=template.projection_options(fields)
+    )
+    return _template_page(request, templates, next_cursor, fields)
 
 @router.get("/{template_id}", response_model=TemplateResponse)
-def get_template_by_id(
+async def get_template_by_id(
     template_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Récupérer un template par son ID
+    Récupérer un template par son ID (304 si If-None-Match correspond)
     """
-    db_template = template.get(db, id=template_id)
+    db_template = await template.get(db, id=template_id, cached=not is_conditional(request))
     if not db_template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Template not found"
         )
-    return db_template
+    return conditional_response(request, TemplateResponse, db_template)
 
 @router.post("/", response_model=TemplateResponse, status_code=status.HTTP_201_CREATED)
-def create_template(
+async def create_template(
     template_in: TemplateCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Créer un nouveau template
     """
     # Vérifier que la catégorie existe
-    db_category = category.get(db, id=template_in.category_id)
+    db_category = await category.get(db, id=template_in.category_id)
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Category not found"
         )
-    return template.create(db, obj_in=template_in)
+    return await template.create(db, obj_in=template_in)
 
 
 @router.put("/{template_id}", response_model=TemplateResponse)
-def update_template(
+async def update_template(
     template_id: int,
     template_in: TemplateUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
-    Mettre à jour un template
+    Mettre à jour un template (412 si If-Match ne correspond pas à la version courante)
     """
-    db_template = template.get(db, id=template_id)
+    # Version comparée à If-Match lue en base, comme pour les projets
+    db_template = await template.get(db, id=template_id, cached="if-match" not in request.headers)
     if not db_template:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Template not found"
         )
+    if "if-match" in request.headers:
+        check_if_match(request, representation_etag(TemplateResponse, db_template))
 
     # Vérifier que la nouvelle catégorie existe (si changée)
     if template_in.category_id and template_in.category_id != db_template.category_id:
-        db_category = category.get(db, id=template_in.category_id)
+        db_category = await category.get(db, id=template_in.category_id)
         if not db_category:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Category not found"
             )
-    return template.update(db, db_obj=db_template, obj_in=template_in)
+    db_template = await template.update(db, db_obj=db_template, obj_in=template_in)
+    response.headers["ETag"] = representation_etag(TemplateResponse, db_template)
+    return db_template
 
 @router.delete("/{template_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_template(
+async def delete_template(
     template_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
     Supprimer un template
     """
-    db_template = template.get(db, id=template_id)
-    if not db_template:
+    # DELETE ... RETURNING : le canvas n'est ni lu ni décompressé
+    if not await template.remove_many(db, ids=[template_id]):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Template not found"
         )
-    template.remove(db, id=template_id)
     return None
 
@@ -1,81 +1,131 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps.database import get_db
+from app.core.config import settings
+from app.deps.database import get_async_db
+from app.deps.auth import get_current_active_principal
+from app.crud.crud_storage_usage import QuotaExceeded, storage_usage
 from app.crud.crud_user_asset import user_asset
 from app.crud.crud_users import user
-from app.schemas.schemas import UserAssetCreate, UserAssetResponse
+from app.core.serialization import page_response
+from app.deps.pagination import PageParams
+from app.services.uploads import InvalidUpload, UploadTooLarge, receive_upload, store_upload
+from app.services.user_snapshots import UserSnapshot
+from app.schemas.schemas import (
+    UserAssetCreate, UserAssetResponse, Page, StorageUsage, BulkCreate, BulkCreateResult, BulkDelete, BulkDeleteResult, BulkItemError
+)
 
 router = APIRouter()
 
-@router.get("/", response_model=List[UserAssetResponse])
-def get_user_assets(
-    skip: int = 0,
-    limit: int = 100,
+def _quota_exceeded(exc: QuotaExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail={"message": "Storage quota exceeded", "required_bytes": exc.required, "quota_bytes": exc.quota}
+    )
+
+# Corps de POST /upload, lu en flux par l'endpoint (documenté pour OpenAPI)
+UPLOAD_REQUEST_BODY = {
+    "required": True,
+    "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "required": ["file"],
+        "properties": {
+            "file": {"type": "string", "format": "binary"},
+            "file_type": {"type": "string", "description": "image, video, audio, document (déduit du type MIME par défaut)"},
+        },
+    }}},
+}
+
+@router.get("/", response_model=Page[UserAssetResponse])
+async def get_user_assets(
+    page: PageParams = Depends(),
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     file_type: Optional[str] = Query(None, description="Filter by file type"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les assets avec filtres optionnels
     """
     if user_id and file_type:
-        assets = user_asset.get_user_assets_by_type(db, user_id=user_id, file_type=file_type)
+        assets, next_cursor = await user_asset.get_user_assets_by_type(
+            db, user_id=user_id, file_type=file_type, cursor=page.cursor, limit=page.limit
+        )
     elif user_id:
-        assets = user_asset.get_by_user(db, user_id=user_id)
+        assets, next_cursor = await user_asset.get_by_user(db, user_id=user_id, cursor=page.cursor, limit=page.limit)
     elif file_type:
-        assets = user_asset.get_by_type(db, file_type=file_type)
+        assets, next_cursor = await user_asset.get_by_type(db, file_type=file_type, cursor=page.cursor, limit=page.limit)
     else:
-        assets = user_asset.get_multi(db, skip=skip, limit=limit)
+        assets, next_cursor = await user_asset.get_page(db, cursor=page.cursor, limit=page.limit)
 
-    return assets
+    return page_response(Page[UserAssetResponse], assets, next_cursor)
 
-@router.get("/user/{user_id}", response_model=List[UserAssetResponse])
-def get_user_assets_by_user(
+@router.get("/user/{user_id}", response_model=Page[UserAssetResponse])
+async def get_user_assets_by_user(
     user_id: int,
     file_type: Optional[str] = Query(None, description="Filter by file type"),
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les assets d'un utilisateur
     """
     # Vérifier que l'user existe
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get(db, id=user_id)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     if file_type:
-        assets = user_asset.get_user_assets_by_type(db, user_id=user_id, file_type=file_type)
+        assets, next_cursor = await user_asset.get_user_assets_by_type(
+            db, user_id=user_id, file_type=file_type, cursor=page.cursor, limit=page.limit
+        )
     else:
-        assets = user_asset.get_by_user(db, user_id=user_id)
+        assets, next_cursor = await user_asset.get_by_user(db, user_id=user_id, cursor=page.cursor, limit=page.limit)
 
-    return assets
+    return page_response(Page[UserAssetResponse], assets, next_cursor)
 
-@router.get("/type/{file_type}", response_model=List[UserAssetResponse])
-def get_assets_by_type(
+@router.get("/usage", response_model=StorageUsage)
+async def get_storage_usage(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Usage du stockage de l'utilisateur connecté (compteurs tenus à jour, sans parcourir ses assets)
+    """
+    counters = await storage_usage.get_by_user(db, user_id=current_user.id)
+    return StorageUsage(
+        total_bytes=sum(counter.total_bytes for counter in counters),
+        asset_count=sum(counter.asset_count for counter in counters),
+        quota_bytes=settings.STORAGE_QUOTA_BYTES or None,
+        by_type={
+            counter.file_type: {"total_bytes": counter.total_bytes, "asset_count": counter.asset_count}
+            for counter in counters if counter.asset_count
+        },
+    )
+
+@router.get("/type/{file_type}", response_model=Page[UserAssetResponse])
+async def get_assets_by_type(
     file_type: str,
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db)
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer tous les assets par type
     """
-    assets = user_asset.get_by_type(db, file_type=file_type)
-    return assets
+    assets, next_cursor = await user_asset.get_by_type(db, file_type=file_type, cursor=page.cursor, limit=page.limit)
+    return page_response(Page[UserAssetResponse], assets, next_cursor)
 
 @router.get("/{asset_id}", response_model=UserAssetResponse)
-def get_user_asset(
+async def get_user_asset(
     asset_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupérer un asset par son ID
     """
-    db_asset = user_asset.get(db, id=asset_id)
+    db_asset = await user_asset.get(db, id=asset_id)
     if not db_asset:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -84,47 +134,149 @@ def get_user_asset(
     return db_asset
 
 @router.post("/", response_model=UserAssetResponse, status_code=status.HTTP_201_CREATED)
-def create_user_asset(
+async def create_user_asset(
     asset_in: UserAssetCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Créer un nouvel asset de l'utilisateur connecté (413 si le quota de stockage est dépassé)
+    """
+    try:
+        return await user_asset.create_for_user(
+            db, obj_in=asset_in, user_id=current_user.id, quota=settings.STORAGE_QUOTA_BYTES
+        )
+    except QuotaExceeded as exc:
+        raise _quota_exceeded(exc)
+
+@router.post(
+    "/upload", response_model=UserAssetResponse, status_code=status.HTTP_201_CREATED,
+    openapi_extra={"requestBody": UPLOAD_REQUEST_BODY},
+)
+async def upload_user_asset(
+    request: Request,
+    response: Response,
+    content_sha256: Optional[str] = Header(
+        None, alias="X-Content-SHA256", description="SHA-256 (hex) du fichier, s'il est connu du client"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
 ):
     """
-    Créer un nouvel asset
+    Uploader un fichier (multipart, champ `file`) : lu en flux, haché et envoyé au stockage
+    Un fichier identique déjà uploadé par l'utilisateur n'est pas re-stocké : l'asset existant est retourné (200)
+    413 si le fichier ou le quota de stockage est dépassé
     """
-    return user_asset.create(db, obj_in=asset_in)
+    # Refus avant lecture du corps : Content-Length majore la taille du fichier (enveloppe multipart).
+    # Un fichier annoncé (X-Content-SHA256) que l'utilisateur possède déjà sera dédupliqué sans rien
+    # coûter : pas de refus anticipé (l'empreinte réelle est recalculée à la réception).
+    duplicate = content_sha256 is not None and await user_asset.get_by_hash(
+        db, user_id=current_user.id, content_hash=content_sha256.lower()
+    ) is not None
+    content_length = request.headers.get("content-length", "")
+    try:
+        if not duplicate:
+            await storage_usage.check_quota(
+                db, user_id=current_user.id, quota=settings.STORAGE_QUOTA_BYTES,
+                extra_bytes=int(content_length) if content_length.isdigit() else 0,
+            )
+    except QuotaExceeded as exc:
+        raise _quota_exceeded(exc)
+    finally:
+        # Pas de transaction ouverte (connexion "idle in transaction") pendant la réception du corps
+        await db.rollback()
 
+    try:
+        received = await receive_upload(request)
+    except UploadTooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds {settings.UPLOAD_MAX_BYTES} bytes"
+        )
+    except InvalidUpload as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(exc)
+        )
+    try:
+        asset, created = await store_upload(
+            db, user_id=current_user.id, received=received, quota=settings.STORAGE_QUOTA_BYTES
+        )
+    except QuotaExceeded as exc:
+        raise _quota_exceeded(exc)
+    finally:
+        received.cleanup()
+    if not created:
+        response.status_code = status.HTTP_200_OK
+    return asset
+
+@router.post("/bulk", response_model=BulkCreateResult[UserAssetResponse])
+async def create_user_assets_bulk(
+    bulk_in: BulkCreate[UserAssetCreate],
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Créer plusieurs assets de l'utilisateur connecté en une requête (un seul INSERT)
+    Les éléments qui feraient dépasser le quota de stockage sont rapportés dans errors
+    """
+    created, rejected = await user_asset.create_many_within_quota(
+        db, objs_in=bulk_in.items, user_id=current_user.id, quota=settings.STORAGE_QUOTA_BYTES
+    )
+    errors = [BulkItemError(index=index, detail="Storage quota exceeded") for index in rejected]
+    return {"created": created, "errors": errors}
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def delete_user_assets_bulk(
+    bulk_in: BulkDelete,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserSnapshot = Depends(get_current_active_principal)
+):
+    """
+    Supprimer plusieurs assets de l'utilisateur connecté en une requête
+    Les ids inconnus ou appartenant à un autre utilisateur sont rapportés par élément (not found)
+    """
+    deleted = set(await user_asset.remove_many(db, ids=bulk_in.ids, user_id=current_user.id))
+    errors = [
+        BulkItemError(index=index, detail="Asset not found")
+        for index, asset_id in enumerate(bulk_in.ids) if asset_id not in deleted
+    ]
+    return BulkDeleteResult(deleted=sorted(deleted), errors=errors)
 
 @router.put("/{asset_id}", response_model=UserAssetResponse)
-def update_user_asset(
+async def update_user_asset(
     asset_id: int,
     asset_in: UserAssetResponse,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Mettre à jour un asset
+    Mettre à jour un asset (413 si une taille plus grande dépasse le quota de stockage du propriétaire)
     """
-    db_asset = user_asset.get(db, id=asset_id)
+    db_asset = await user_asset.get(db, id=asset_id)
     if not db_asset:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Asset not found"
         )
-    return user_asset.update(db, db_obj=db_asset, obj_in=asset_in)
+    try:
+        return await user_asset.update(db, db_obj=db_asset, obj_in=asset_in, quota=settings.STORAGE_QUOTA_BYTES)
+    except QuotaExceeded as exc:
+        raise _quota_exceeded(exc)
 
 @router.delete("/{asset_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user_asset(
+async def delete_user_asset(
     asset_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Supprimer un asset
     """
-    db_asset = user_asset.get(db, id=asset_id)
+    db_asset = await user_asset.get(db, id=asset_id)
     if not db_asset:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Asset not found"
         )
     
-    user_asset.remove(db, id=asset_id)
+    await user_asset.remove(db, id=asset_id)
     return None
\ No newline at end of file
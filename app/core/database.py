@@ -1,11 +1,128 @@
-from sqlalchemy import create_engine
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from .metrics import REGISTRY, Counter, Gauge
+from .query_stats import after_cursor_execute, before_cursor_execute
+
+
+class PoolStats:
+    """Compteurs d'utilisation d'un pool de connexions (par processus)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.disconnects = 0
+        self.invalidations = 0
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def snapshot(self, pool: QueuePool) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.checkouts
+            return {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "max_overflow": settings.DB_MAX_OVERFLOW,
+                "checkouts": checkouts,
+                "wait_avg_ms": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "connects": self.connects,
+                "disconnects": self.disconnects,
+                "invalidations": self.invalidations,
+            }
+
+
+class _TimedPoolMixin:
+    """Mesure le temps passé à attendre une connexion libre dans le pool"""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedPoolMixin, QueuePool):
+    stats = PoolStats()
 
-engine = create_engine(settings.DATABASE_URL)
+
+class InstrumentedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _instrument(sync_engine: Engine, stats: PoolStats) -> None:
+    """Brancher les compteurs de churn sur les événements du pool, et l'instrumentation SQL"""
+    event.listen(sync_engine, "connect", lambda *args: stats.incr("connects"))
+    event.listen(sync_engine, "close", lambda *args: stats.incr("disconnects"))
+    event.listen(sync_engine, "invalidate", lambda *args: stats.incr("invalidations"))
+    event.listen(sync_engine, "checkout", lambda *args: stats.incr("checkouts"))
+    # Nombre et durée des requêtes SQL par requête HTTP, requêtes lentes, mode strict (voir query_stats)
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+_is_postgres = settings.DATABASE_URL.startswith(("postgresql", "postgres://"))
+_sync_connect_args: Dict[str, Any] = {}
+_async_connect_args: Dict[str, Any] = {}
+if _is_postgres and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+    _sync_connect_args["options"] = f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"
+    _async_connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+
+# Moteur synchrone (scripts, migrations, tâches de maintenance)
+engine = create_engine(
+    settings.DATABASE_URL,
+    poolclass=InstrumentedQueuePool,
+    connect_args=_sync_connect_args,
+    **_pool_kwargs(),
+)
+_instrument(engine, InstrumentedQueuePool.stats)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur asynchrone utilisé par les endpoints de l'API
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    poolclass=InstrumentedAsyncQueuePool,
+    connect_args=_async_connect_args,
+    **_pool_kwargs(),
+)
+_instrument(async_engine.sync_engine, InstrumentedAsyncQueuePool.stats)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -15,3 +132,32 @@ def get_db():
     finally:
         db.close()
 
+db_pool_connections = Gauge("db_pool_connections", "Connexions des pools par état", ("pool", "state"))
+db_pool_checkouts = Counter("db_pool_checkouts_total", "Connexions empruntées aux pools", ("pool",))
+db_pool_wait = Counter("db_pool_wait_seconds_total", "Temps d'attente d'une connexion libre", ("pool",))
+db_pool_connects = Counter("db_pool_connects_total", "Connexions ouvertes vers la base", ("pool",))
+db_pool_invalidations = Counter("db_pool_invalidations_total", "Connexions invalidées (erreurs, pre-ping)", ("pool",))
+
+def _collect_pool_metrics() -> None:
+    for name, pool, stats in (
+        ("async", async_engine.sync_engine.pool, InstrumentedAsyncQueuePool.stats),
+        ("sync", engine.pool, InstrumentedQueuePool.stats),
+    ):
+        db_pool_connections.set((name, "checked_out"), pool.checkedout())
+        db_pool_connections.set((name, "checked_in"), pool.checkedin())
+        db_pool_connections.set((name, "overflow"), max(0, pool.overflow()))
+        db_pool_checkouts.set_total((name,), stats.checkouts)
+        db_pool_wait.set_total((name,), stats.wait_total)
+        db_pool_connects.set_total((name,), stats.connects)
+        db_pool_invalidations.set_total((name,), stats.invalidations)
+
+REGISTRY.register_collector(_collect_pool_metrics)
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Statistiques live des pools de ce worker (les compteurs sont par processus)"""
+    return {
+        "pid": os.getpid(),
+        "async": InstrumentedAsyncQueuePool.stats.snapshot(async_engine.sync_engine.pool),
+        "sync": InstrumentedQueuePool.stats.snapshot(engine.pool),
+    }
+
@@ -0,0 +1,118 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Request, Response, status
+
+from app.core.serialization import dump_json
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag fort dérivé des éléments qui identifient une version de la ressource"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def version_part(etag: str) -> str:
+    """Partie version d'un ETag composé "version.dérivé" (voir check_if_match), l'ETag entier sinon"""
+    return etag.removeprefix("W/").strip('"').split(".", 1)[0]
+
+
+def is_conditional(request: Request) -> bool:
+    """
+    Requête de revalidation (If-None-Match, If-Modified-Since) : la version comparée doit être lue en
+    base, pas dans le cache d'entités d'un worker (un 304 ou un ETag en retard sur une écriture)
+    """
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def body_etag(body: bytes) -> str:
+    """ETag fort dérivé du contenu exact de la réponse"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def http_date(value: datetime) -> str:
+    """Formater une date (naïve = heure locale, comme les colonnes du modèle) pour Last-Modified"""
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_etags(header: str) -> List[str]:
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    La copie du client est-elle à jour ? If-None-Match est prioritaire sur If-Modified-Since
+    (RFC 9110, comparaison faible).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = _parse_etags(if_none_match)
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.astimezone(timezone.utc).replace(microsecond=0) <= since
+    return False
+
+
+def check_if_match(request: Request, etag: str, *, version_only: bool = False) -> None:
+    """
+    Refuser une écriture (412) si le client ne modifie pas la version courante.
+    version_only : ETag composé "version.dérivé", seule la version est comparée (la partie dérivée,
+    p. ex. une miniature rendue après coup, change la représentation mais pas ce que le client modifie).
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        return
+    tags = [tag.strip() for tag in if_match.split(",")]
+    if version_only:
+        matches = version_part(etag) in {version_part(tag) for tag in tags}
+    else:
+        matches = etag in tags
+    if "*" not in tags and not matches:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Resource has been modified"
+        )
+
+
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def representation_etag(response_type: Any, data: Any) -> str:
+    """ETag de la représentation JSON de `data` selon le schéma de réponse"""
+    return body_etag(dump_json(response_type, data))
+
+
+def conditional_response(
+    request: Request,
+    response_type: Any,
+    data: Any,
+    *,
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None,
+) -> Response:
+    """
+    Réponse JSON avec ETag : 304 sans corps si la copie du client est à jour.
+    Si `etag` est fourni (ex. id + updated_at), la vérification se fait avant toute sérialisation ;
+    sinon l'ETag est le hash du corps sérialisé.
+    """
+    if etag is not None and is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(etag, last_modified))
+
+    body = dump_json(response_type, data)
+    if etag is None:
+        etag = body_etag(body)
+        if is_not_modified(request, etag, last_modified):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_validator_headers(etag, last_modified))
+    return Response(content=body, media_type="application/json", headers=_validator_headers(etag, last_modified))
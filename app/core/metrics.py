@@ -0,0 +1,388 @@
+"""
+Métriques de l'application au format texte Prometheus (exposées sur /metrics).
+
+Compteurs, jauges et histogrammes sont des valeurs Python modifiées uniquement depuis la boucle
+d'événements (middleware, collecteurs) : pas de verrou. Les séries d'un histogramme sont
+préallouées à la première observation de leurs labels, une observation ne fait ensuite
+qu'incrémenter deux cases d'une liste.
+
+Plusieurs workers (uvicorn --workers N) : chaque processus a son propre registre. Avec
+METRICS_MULTIPROC_DIR, chaque worker y écrit son état toutes les METRICS_WRITE_INTERVAL_SECONDS
+(metrics-<pid>-<démarrage>.json : un pid peut être réutilisé par un nouveau worker) et /metrics, servi par n'importe quel worker, additionne les fichiers :
+compteurs et histogrammes de tous les workers (y compris arrêtés, pour rester croissants),
+jauges des seuls workers vivants. Le répertoire est à vider au démarrage du déploiement.
+"""
+import asyncio
+import glob
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+import uuid
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, Any] = {}
+        REGISTRY.register(self)
+
+    def _samples(self) -> List[List[Any]]:
+        return [[list(labels), value] for labels, value in self._values.items()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": self.type, "help": self.documentation, "labelnames": list(self.labelnames), "samples": self._samples()}
+
+
+class Counter(_Metric):
+    """Valeur croissante (requêtes, erreurs...)"""
+
+    type = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set_total(self, labels: Labels, value: float) -> None:
+        """Recopier un total tenu ailleurs (compteurs des pools, des caches) lors de la collecte"""
+        self._values[labels] = float(value)
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (requêtes en cours, connexions ouvertes...)"""
+
+    type = "gauge"
+
+    def set(self, labels: Labels, value: float) -> None:
+        self._values[labels] = float(value)
+
+    def inc(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, labels: Labels = (), amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+
+class Histogram(_Metric):
+    """Distribution (durées) : une case par borne `le`, plus la somme et le nombre d'observations"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), *, buckets: Sequence[float]):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            # Cases non cumulées + "+Inf", puis somme ; le nombre est la somme des cases
+            series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def _samples(self) -> List[List[Any]]:
+        # Copie : le snapshot peut être sérialisé hors de la boucle d'événements
+        return [[list(labels), list(series)] for labels, series in self._values.items()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self.metrics[metric.name] = metric
+
+    def register_collector(self, collector: Callable[[], None]) -> None:
+        """Fonction appelée avant chaque lecture, pour recopier des valeurs tenues ailleurs dans les métriques"""
+        self.collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État du registre de ce processus (sérialisable en JSON)"""
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector failed")
+        return {
+            "pid": os.getpid(),
+            "worker": worker_id(),
+            "written_at": time.time(),
+            "metrics": {name: metric.snapshot() for name, metric in self.metrics.items()},
+        }
+
+
+REGISTRY = Registry()
+
+
+# --- Agrégation multi-workers ---
+
+def _process_start(pid: int) -> Optional[str]:
+    """Date de démarrage d'un processus (starttime de /proc, Linux), None si indisponible"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # Champ 22, compté après le nom du processus (entre parenthèses, peut contenir des espaces)
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+_worker: Optional[Tuple[int, str]] = None
+
+
+def worker_id() -> str:
+    """
+    Identifiant du processus courant, unique dans le temps : pid et date de démarrage (un uuid
+    hors Linux). Recalculé après un fork, le pid seul peut être repris par un nouveau worker.
+    """
+    global _worker
+    pid = os.getpid()
+    if _worker is None or _worker[0] != pid:
+        _worker = (pid, f"{pid}-{_process_start(pid) or uuid.uuid4().hex}")
+    return _worker[1]
+
+
+def _snapshot_path(worker: str) -> str:
+    return os.path.join(settings.METRICS_MULTIPROC_DIR, f"metrics-{worker}.json")
+
+
+def write_snapshot(snapshot: Dict[str, Any]) -> None:
+    """Écrire l'état du worker de façon atomique (fichier temporaire puis rename)"""
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.METRICS_MULTIPROC_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, _snapshot_path(snapshot["worker"]))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _worker_alive(snapshot: Dict[str, Any]) -> bool:
+    """Le worker qui a écrit ce snapshot tourne-t-il encore (et non un autre processus de même pid) ?"""
+    pid = snapshot["pid"]
+    if not _pid_alive(pid):
+        return False
+    start = _process_start(pid)
+    return start is None or snapshot.get("worker") == f"{pid}-{start}"
+
+
+def read_snapshots(local: Dict[str, Any]) -> List[Tuple[Dict[str, Any], bool]]:
+    """États de tous les workers : (snapshot, vivant) ; l'état du worker courant est pris en direct"""
+    snapshots = [(local, True)]
+    for path in glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, "metrics-*.json")):
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue  # fichier en cours de remplacement ou illisible
+        if snapshot.get("worker") == local["worker"]:
+            continue
+        snapshots.append((snapshot, _worker_alive(snapshot)))
+    return snapshots
+
+
+def merge_snapshots(snapshots: Iterable[Tuple[Dict[str, Any], bool]]) -> Dict[str, Dict[str, Any]]:
+    """Additionner les séries de même labels : compteurs et histogrammes de tous les workers, jauges des vivants"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot, alive in snapshots:
+        for name, metric in snapshot["metrics"].items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "samples": {}})
+            if metric.get("buckets") != target.get("buckets"):
+                continue  # buckets modifiés entre deux déploiements : séries incomparables
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+# --- Format texte Prometheus ---
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(metrics: Dict[str, Dict[str, Any]]) -> str:
+    lines: List[str] = []
+    for name in sorted(metrics):
+        metric = metrics[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] == "histogram":
+                cumulative = 0
+                for bound, count in zip(metric["buckets"] + [math.inf], value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labelnames, labels, ('le', _number(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(value[-1])}")
+                lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def generate_latest(local: Dict[str, Any]) -> str:
+    """
+    Métriques de ce worker (`local` = REGISTRY.snapshot(), pris sur la boucle d'événements),
+    ou de tous les workers avec METRICS_MULTIPROC_DIR (lecture de fichiers : hors de la boucle)
+    """
+    if settings.METRICS_MULTIPROC_DIR:
+        return render(merge_snapshots(read_snapshots(local)))
+    return render(merge_snapshots([(local, True)]))
+
+
+class SnapshotWriter:
+    """Tâche de fond d'un worker : publier son état dans METRICS_MULTIPROC_DIR"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if settings.METRICS_ENABLED and settings.METRICS_MULTIPROC_DIR and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await self.write()
+            await asyncio.sleep(settings.METRICS_WRITE_INTERVAL_SECONDS)
+
+    async def write(self) -> None:
+        try:
+            # Lecture du registre sur la boucle d'événements, écriture disque dans un thread
+            await asyncio.to_thread(write_snapshot, REGISTRY.snapshot())
+        except Exception:
+            logger.exception("Could not write metrics snapshot")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.write()  # dernier état : les compteurs du worker arrêté restent comptés
+
+
+snapshot_writer = SnapshotWriter()
+
+
+# --- Métriques HTTP ---
+
+http_requests = Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Durée des requêtes HTTP (jusqu'à la fin de la réponse)",
+    ("method", "route", "status"), buckets=settings.METRICS_LATENCY_BUCKETS,
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requêtes HTTP en cours de traitement", ("method",)
+)
+
+
+# Méthodes HTTP standard (RFC 9110, PATCH) ; toute autre méthode envoyée par un client est
+# regroupée sous "OTHER", sinon chaque verbe inventé créerait ses séries dans tous les snapshots
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE", "PATCH"})
+
+
+def method_label(scope: Dict[str, Any]) -> str:
+    method = scope["method"]
+    return method if method in HTTP_METHODS else "OTHER"
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    """Modèle de la route (/api/v1/projects/{project_id}) plutôt que le chemin : cardinalité bornée"""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or route.path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"] + "/{path}"  # application montée (fichiers statiques)
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : durée, statut et requêtes en cours, par méthode et route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = method_label(scope)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec((method,))
+            labels = (method, route_label(scope), str(status))
+            http_requests.inc(labels)
+            http_request_duration.observe(labels, time.perf_counter() - start)
@@ -0,0 +1,151 @@
+"""
+Instrumentation SQL par requête HTTP.
+
+Les hooks before/after_cursor_execute (branchés sur les moteurs dans app/core/database.py)
+comptent les requêtes SQL et leur durée dans les statistiques de la requête HTTP courante
+(contextvar posée par QueryStatsMiddleware ; les tâches filles d'un TaskGroup la partagent).
+Le total est renvoyé au client dans l'en-tête Server-Timing et publié dans /metrics.
+
+Détection des N+1 : une relation chargée paresseusement dans une boucle (ou un get() par
+élément) exécute le même SQL avec des paramètres différents. Au-delà de
+SQL_REPEATED_QUERY_THRESHOLD exécutions d'un même SQL dans une requête, un avertissement est
+journalisé ; en mode strict (SQL_STRICT_MODE, pour les tests) la requête SQL est refusée, de
+même que celle qui dépasse SQL_QUERY_BUDGET.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram, route_label
+
+logger = logging.getLogger("app.sql")
+
+
+class SQLStrictModeError(RuntimeError):
+    """Requête SQL refusée par le mode strict"""
+
+
+class QueryBudgetExceeded(SQLStrictModeError):
+    """La requête HTTP dépasse SQL_QUERY_BUDGET requêtes SQL"""
+
+
+class RepeatedQueryError(SQLStrictModeError):
+    """Même SQL exécuté SQL_REPEATED_QUERY_THRESHOLD fois dans une requête HTTP (N+1 probable)"""
+
+
+class QueryStats:
+    """Requêtes SQL d'une requête HTTP"""
+
+    __slots__ = ("scope", "count", "duration", "statements", "batched")
+
+    def __init__(self, scope: Dict[str, Any]):
+        self.scope = scope
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Dict[str, int] = {}
+        self.batched = False  # voir allow_batched_queries
+
+    @property
+    def route(self) -> str:
+        return f"{self.scope['method']} {route_label(self.scope)}"
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Statistiques SQL de la requête HTTP en cours (None hors requête : tâches de fond, scripts)"""
+    return _current.get()
+
+
+def allow_batched_queries() -> None:
+    """
+    Requête HTTP qui répète volontairement le même SQL, un lot à la fois (import en flux) :
+    ses requêtes restent comptées mais échappent au budget et à la détection des N+1
+    """
+    stats = _current.get()
+    if stats is not None:
+        stats.batched = True
+
+
+def _short(statement: str, limit: int = 500) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._query_start = time.perf_counter()
+    stats = _current.get()
+    if stats is None or stats.batched:
+        return
+    seen = stats.statements.get(statement, 0) + 1
+    stats.statements[statement] = seen
+    threshold = settings.SQL_REPEATED_QUERY_THRESHOLD
+    if settings.SQL_STRICT_MODE:
+        if settings.SQL_QUERY_BUDGET and stats.count >= settings.SQL_QUERY_BUDGET:
+            raise QueryBudgetExceeded(
+                f"{stats.route}: more than {settings.SQL_QUERY_BUDGET} SQL queries in one request"
+            )
+        if threshold and seen >= threshold:
+            raise RepeatedQueryError(
+                f"{stats.route}: same SQL executed {seen} times (N+1?): {_short(statement)}"
+            )
+    elif threshold and seen == threshold:
+        logger.warning("Possible N+1 on %s: same SQL executed %d times: %s", stats.route, seen, _short(statement))
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._query_start
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+    if settings.SQL_SLOW_QUERY_MS and elapsed * 1000 >= settings.SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow SQL query (%.1f ms) on %s: %s",
+            elapsed * 1000, stats.route if stats is not None else "-", _short(statement),
+        )
+
+
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "Requêtes SQL par requête HTTP", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+http_request_db_seconds = Counter(
+    "http_request_db_seconds_total", "Temps passé en base par les requêtes HTTP", ("method", "route")
+)
+
+
+class QueryStatsMiddleware:
+    """Middleware ASGI : statistiques SQL de la requête, en-tête Server-Timing et métriques par route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = QueryStats(scope)
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.SQL_SERVER_TIMING:
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            labels = (scope["method"], route_label(scope))
+            http_request_db_queries.observe(labels, stats.count)
+            if stats.duration:
+                http_request_db_seconds.inc(labels, stats.duration)
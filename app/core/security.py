@@ -1,12 +1,12 @@
 from datetime import datetime, timedelta
-from typing import Optional, Union, Any
+from typing import Optional, Tuple, Union, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from .config import settings
 
 # Configuration du hachage des mots de passe
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # Utilisation de la configuration centralisée
 SECRET_KEY = settings.SECRET_KEY
@@ -20,6 +20,12 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifier le mot de passe et retourner un nouveau hash si le coût a changé
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     """
     Hacher un mot de passe
@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Any, Optional, Union
+
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle (extra "fast-json")
+    orjson = None
+
+
+def _response_class() -> type:
+    """Classe de réponse par défaut : orjson si FAST_JSON_RESPONSES et orjson disponible"""
+    if settings.FAST_JSON_RESPONSES and orjson is not None:
+        return ORJSONResponse
+    return JSONResponse
+
+
+JSON_RESPONSE_CLASS = _response_class()
+
+
+@lru_cache(maxsize=None)
+def get_adapter(tp: Any) -> TypeAdapter:
+    """TypeAdapter mis en cache par type : le schéma pydantic-core n'est construit qu'une fois"""
+    return TypeAdapter(tp)
+
+
+def dump_json(response_type: Any, data: Any) -> bytes:
+    """
+    Lire les objets ORM selon le schéma de réponse et les sérialiser directement en JSON (pydantic-core)
+    Une seule lecture des attributs, sans passage par jsonable_encoder ni json.dumps
+    """
+    adapter = get_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+def fast_response(response_type: Any, data: Any, *, status_code: int = 200) -> Union[Response, Any]:
+    """
+    Chemin rapide opt-in (FAST_JSON_RESPONSES) pour les sorties ORM de confiance :
+    le corps est produit ici et FastAPI ne revalide pas le retour contre response_model.
+    Sans l'option, `data` est retourné tel quel au pipeline standard de FastAPI.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return data
+    return Response(content=dump_json(response_type, data), media_type="application/json", status_code=status_code)
+
+
+def page_response(response_type: Any, items: Any, next_cursor: Optional[str]) -> Union[Response, Any]:
+    """Page {"items", "next_cursor"} via le chemin rapide si activé"""
+    return fast_response(response_type, {"items": items, "next_cursor": next_cursor})
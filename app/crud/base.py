@@ -1,13 +1,92 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import copy
+import json
+from datetime import datetime
+from typing import AbstractSet, Any, Dict, Generic, Iterable, List, Optional, Sequence, Set, Tuple, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import Select, delete, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, attributes, class_mapper, joinedload, load_only, make_transient_to_detached
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
 from app.models.models import Base
+from app.services.cache import CacheBackend, LRUTTLCache
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Nature de la clé d'un curseur : une page triée par date ne peut pas reprendre un curseur de
+# recherche (score) et inversement, la clé serait comparée à une colonne d'un autre type
+CURSOR_DATE = "d"
+CURSOR_RANK = "r"
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible, ou d'une autre nature que la liste demandée (400)"""
+
+
+class ResourceModified(Exception):
+    """Écriture conditionnelle refusée : la ligne a changé depuis la version lue (412)"""
+
+
+def encode_cursor(value: Union[datetime, float], id: int) -> str:
+    """Encoder la clé (date ou score, id) du dernier élément d'une page en curseur opaque"""
+    if isinstance(value, datetime):
+        raw = json.dumps([CURSOR_DATE, value.isoformat(), id])
+    else:
+        raw = json.dumps([CURSOR_RANK, float(value), id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, kind: Optional[str] = None) -> Tuple[Union[datetime, float], int]:
+    """Décoder un curseur opaque ; InvalidCursor s'il est invalide ou n'est pas de nature `kind`"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_kind, value, id = json.loads(raw)
+        if cursor_kind == CURSOR_DATE:
+            key = datetime.fromisoformat(value)
+        elif cursor_kind == CURSOR_RANK and isinstance(value, (int, float)):
+            key = float(value)
+        else:
+            raise ValueError(f"Unknown cursor kind: {cursor_kind!r}")
+        id = int(id)
+    except (TypeError, ValueError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+    if kind is not None and cursor_kind != kind:
+        raise InvalidCursor("Invalid cursor")
+    return key, id
+
+def entity_cache(name: str) -> CacheBackend:
+    """Cache d'entités par défaut d'un CRUD (en mémoire, LRU + TTL)"""
+    return LRUTTLCache(
+        name, max_entries=settings.ENTITY_CACHE_MAX_ENTRIES, ttl=settings.ENTITY_CACHE_TTL_SECONDS
+    )
+
+def _snapshot(obj: Any) -> Tuple[type, Dict[str, Any], Dict[str, Any]]:
+    """Copier les colonnes et relations many-to-one chargées d'un objet, sans lien avec sa session"""
+    mapper = class_mapper(type(obj))
+    state = obj.__dict__
+    # Copie profonde : canvas_data & co. ne doivent pas être partagés entre sessions
+    columns = {attr.key: copy.deepcopy(state[attr.key]) for attr in mapper.column_attrs if attr.key in state}
+    related = {}
+    for rel in mapper.relationships:
+        if rel.key in state and not rel.uselist:
+            value = state[rel.key]
+            related[rel.key] = _snapshot(value) if value is not None else None
+    return type(obj), columns, related
+
+def _restore(snapshot: Tuple[type, Dict[str, Any], Dict[str, Any]]) -> Any:
+    """Reconstruire un objet détaché (sans historique) depuis un snapshot"""
+    cls, columns, related = snapshot
+    obj = class_mapper(cls).class_manager.new_instance()
+    for key, value in columns.items():
+        attributes.set_committed_value(obj, key, copy.deepcopy(value))
+    for key, value in related.items():
+        attributes.set_committed_value(obj, key, _restore(value) if value is not None else None)
+    make_transient_to_detached(obj)
+    return obj
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -56,4 +135,237 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
-        return obj
\ No newline at end of file
+        return obj
+
+
+class AsyncCRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        *,
+        options: Sequence[ExecutableOption] = (),
+        list_options: Optional[Sequence[ExecutableOption]] = None,
+        cursor_column: str = "created_at",
+        cache: Optional[CacheBackend] = None,
+    ):
+        """
+        Variante asynchrone de CRUDBase, utilisée avec une AsyncSession.
+        **Parameters**
+        * `model`: A SQLAlchemy model class
+        * `options`: options de chargement par défaut (selectinload/joinedload) des relations
+          sérialisées par les schémas de réponse
+        * `list_options`: options des listes (par défaut `options`), p. ex. defer() des colonnes
+          volumineuses absentes des schémas résumés
+        * `cursor_column`: colonne de date qui, avec l'id, sert de clé à la pagination par curseur
+        * `cache`: cache optionnel des lectures par id (invalidé par update/remove)
+        """
+        self.model = model
+        self.options = tuple(options)
+        self.list_options = self.options if list_options is None else tuple(list_options)
+        self.cursor_column = cursor_column
+        self.cache = cache if settings.ENTITY_CACHE_ENABLED else None
+
+    def _options(self, options: Optional[Sequence[ExecutableOption]]) -> Sequence[ExecutableOption]:
+        return self.options if options is None else options
+
+    def _select(self, options: Optional[Sequence[ExecutableOption]] = None) -> Select:
+        """Requête de base sur le modèle avec les options de chargement"""
+        return select(self.model).options(*self._options(options))
+
+    def _list_select(self, options: Optional[Sequence[ExecutableOption]] = None) -> Select:
+        """Requête de base des listes (options résumées par défaut)"""
+        return select(self.model).options(*(self.list_options if options is None else options))
+
+    def projection_options(self, fields: Optional[AbstractSet[str]]) -> Optional[Sequence[ExecutableOption]]:
+        """
+        Options de chargement limitées aux champs demandés (paramètre fields=...).
+        Les colonnes absentes sont différées ; les relations many-to-one demandées sont jointes.
+        None (pas de projection) = options de liste par défaut.
+        """
+        if fields is None:
+            return None
+        mapper = class_mapper(self.model)
+        columns = {attr.key for attr in mapper.column_attrs} & (set(fields) | {"id", self.cursor_column})
+        options: List[ExecutableOption] = [load_only(*(getattr(self.model, key) for key in sorted(columns)))]
+        for rel in mapper.relationships:
+            if rel.key in fields and not rel.uselist:
+                options.append(joinedload(getattr(self.model, rel.key)))
+        return options
+
+    async def _reload(self, db: AsyncSession, db_obj: ModelType) -> ModelType:
+        """Recharger un objet après commit avec ses relations (remplace refresh)"""
+        result = await db.execute(
+            self._select().filter(self.model.id == db_obj.id).execution_options(populate_existing=True)
+        )
+        return result.scalars().one()
+
+    async def get(
+        self, db: AsyncSession, id: Any, *, options: Optional[Sequence[ExecutableOption]] = None, cached: bool = True
+    ) -> Optional[ModelType]:
+        """
+        Récupérer un élément par son ID (read-through sur le cache si configuré).
+        cached=False relit la ligne en base, y compris si elle est déjà dans la session, et rafraîchit le
+        cache : à utiliser pour toute requête conditionnelle (If-Match, If-None-Match), le cache pouvant
+        être en retard sur une écriture d'un autre worker (au plus ENTITY_CACHE_TTL_SECONDS).
+        """
+        if not cached:
+            obj = await db.get(self.model, id, options=self._options(options), populate_existing=True)
+            if self.cache is not None and options is None:
+                if obj is None:
+                    self.cache.delete(id)
+                else:
+                    self.cache.set(id, _snapshot(obj))
+            return obj
+        if self.cache is None or options is not None:
+            return await db.get(self.model, id, options=self._options(options))
+
+        existing = db.identity_map.get(self.model.__mapper__.identity_key_from_primary_key((id,)))
+        if existing is not None:
+            return existing
+
+        snapshot = self.cache.get(id)
+        if snapshot is not None:
+            # Copie propre à cette session, sans requête SQL
+            return await db.merge(_restore(snapshot), load=False)
+
+        obj = await db.get(self.model, id, options=self.options)
+        if obj is not None:
+            self.cache.set(id, _snapshot(obj))
+        return obj
+
+    def invalidate(self, id: Any) -> None:
+        """Retirer un élément du cache (à appeler après toute écriture hors update/remove)"""
+        if self.cache is not None:
+            self.cache.delete(id)
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100, options: Optional[Sequence[ExecutableOption]] = None
+    ) -> List[ModelType]:
+        """Récupérer plusieurs éléments avec pagination"""
+        result = await db.execute(self._list_select(options).offset(skip).limit(limit))
+        return list(result.scalars().all())
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+        filters: Sequence[Any] = (),
+        options: Optional[Sequence[ExecutableOption]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Récupérer une page filtrée, paginée par curseur"""
+        return await self._paginate(db, self._list_select(options).filter(*filters), cursor=cursor, limit=limit)
+
+    async def _paginate(
+        self, db: AsyncSession, query: Select, *, cursor: Optional[str], limit: int
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Pagination par clé (keyset) sur (cursor_column, id) décroissants : le coût d'une page
+        ne dépend pas de sa profondeur, contrairement à OFFSET.
+        Retourne les éléments et le curseur de la page suivante (None sur la dernière page).
+        """
+        sort_column = getattr(self.model, self.cursor_column)
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        if cursor:
+            value, last_id = decode_cursor(cursor, CURSOR_DATE)
+            query = query.filter(tuple_(sort_column, self.model.id) < tuple_(value, last_id))
+        query = query.order_by(sort_column.desc(), self.model.id.desc()).limit(limit + 1)
+        result = await db.execute(query)
+        items = list(result.scalars().all())
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(getattr(last, self.cursor_column), last.id)
+        return items, next_cursor
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        """Créer un nouvel élément"""
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        await db.commit()
+        return await self._reload(db, db_obj)
+
+    async def _insert_many(
+        self, db: AsyncSession, objs_in: Sequence[CreateSchemaType], values: Optional[Dict[str, Any]] = None
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """INSERT multi-lignes ... RETURNING id, sans commit ; retourne les ids et les lignes insérées"""
+        synonyms = {prop.key: prop.name for prop in class_mapper(self.model).synonyms}
+        rows = [
+            {synonyms.get(key, key): value for key, value in {**jsonable_encoder(obj_in), **(values or {})}.items()}
+            for obj_in in objs_in
+        ]
+        result = await db.execute(insert(self.model).returning(self.model.id, sort_by_parameter_order=True), rows)
+        return list(result.scalars().all()), rows
+
+    async def _load_many(self, db: AsyncSession, ids: Sequence[int]) -> List[ModelType]:
+        """Charger des éléments par id avec leurs relations, en une requête, dans l'ordre de `ids`"""
+        loaded = await db.execute(self._select().filter(self.model.id.in_(ids)))
+        by_id = {obj.id: obj for obj in loaded.unique().scalars().all()}
+        return [by_id[id] for id in ids]
+
+    async def create_many(
+        self, db: AsyncSession, *, objs_in: Sequence[CreateSchemaType], values: Optional[Dict[str, Any]] = None
+    ) -> List[ModelType]:
+        """
+        Créer plusieurs éléments en un seul INSERT multi-lignes ... RETURNING, puis les recharger
+        avec leurs relations en une requête. Les éléments sont retournés dans l'ordre de objs_in.
+        `values` : colonnes communes à toutes les lignes (p. ex. le propriétaire).
+        """
+        if not objs_in:
+            return []
+        ids, _ = await self._insert_many(db, objs_in, values)
+        await db.commit()
+        return await self._load_many(db, ids)
+
+    async def existing_ids(self, db: AsyncSession, ids: Iterable[int]) -> Set[int]:
+        """Ids existants parmi ceux donnés, en une seule requête IN"""
+        ids = set(ids)
+        if not ids:
+            return set()
+        result = await db.execute(select(self.model.id).filter(self.model.id.in_(ids)))
+        return set(result.scalars().all())
+
+    def _assign(self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]) -> None:
+        """
+        Appliquer les champs fournis aux colonnes de l'objet (sans commit). Les relations chargées
+        (options) et les schémas qui les embarquent (p. ex. SharedProjectResponse) sont ignorés.
+        """
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.model_dump(exclude_unset=True)
+        for field in class_mapper(self.model).column_attrs.keys():
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+
+    async def update(self, db: AsyncSession, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]) -> ModelType:
+        """Mettre à jour un élément"""
+        self._assign(db_obj, obj_in)
+        db.add(db_obj)
+        await db.commit()
+        self.invalidate(db_obj.id)
+        return await self._reload(db, db_obj)
+
+    async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
+        """Supprimer un élément"""
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        self.invalidate(id)
+        return obj
+
+    async def remove_many(self, db: AsyncSession, *, ids: Sequence[int]) -> List[int]:
+        """Supprimer plusieurs éléments en un seul DELETE ... RETURNING (sans cascades ORM), retourne les ids supprimés"""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        result = await db.execute(delete(self.model).filter(self.model.id.in_(ids)).returning(self.model.id))
+        deleted = set(result.scalars().all())
+        await db.commit()
+        for id in deleted:
+            self.invalidate(id)
+        return [id for id in ids if id in deleted]
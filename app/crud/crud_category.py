@@ -1,16 +1,22 @@
-from typing import List
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
+from app.crud.base import AsyncCRUDBase, entity_cache
 from app.models.models import Category
 from app.schemas.schemas import CategoryCreate, CategoryUpdate
 
-class CRUDCategory(CRUDBase[Category, CategoryCreate, CategoryUpdate]):
-    def get_by_name(self, db: Session, *, name: str) -> Category:
+class CRUDCategory(AsyncCRUDBase[Category, CategoryCreate, CategoryUpdate]):
+    async def get_by_name(self, db: AsyncSession, *, name: str, options: Optional[Sequence[ExecutableOption]] = None) -> Optional[Category]:
         """Récupérer une catégorie par son nom"""
-        return db.query(Category).filter(Category.name == name).first()
+        result = await db.execute(self._select(options).filter(Category.name == name))
+        return result.scalars().first()
 
-    def get_active_categories(self, db: Session) -> List[Category]:
-        """Récupérer toutes les catégories actives"""
-        return db.query(Category).filter(Category.is_active == True).all()
+    async def get_active_categories(
+        self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Category], Optional[str]]:
+        """Récupérer les catégories actives"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[Category.is_active == True], options=options)
 
-category = CRUDCategory(Category)
+category = CRUDCategory(Category, cache=entity_cache("category"))
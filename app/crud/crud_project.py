@@ -1,28 +1,239 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
-from app.models.models import Project
-from app.schemas.schemas import ProjectCreate, ProjectUpdate
-
-class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectUpdate]):
-    def get_by_owner(self, db: Session, *, owner_id: int) -> List[Project]:
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from sqlalchemy import case, func, literal, select, tuple_, union_all, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, joinedload
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
+from app.crud.base import CURSOR_DATE, AsyncCRUDBase, ResourceModified, decode_cursor, encode_cursor, entity_cache
+from app.crud.json_patch import JsonPatchError, VersionConflict, compile_operation
+from app.crud.search import SearchMixin
+from app.models.models import Project, SharedProject
+from app.schemas.schemas import JsonPatchOperation, ProjectCreate, ProjectUpdate
+
+# Permissions effectives sur un projet, de la plus faible à la plus forte
+PERMISSION_LEVELS = ("view", "copy", "edit", "owner")
+PERMISSION_RANKS = {permission: rank for rank, permission in enumerate(PERMISSION_LEVELS, start=1)}
+
+def permission_at_least(permission: Optional[str], required: str) -> bool:
+    """La permission `permission` (None = aucun accès) couvre-t-elle `required` ?"""
+    return permission is not None and PERMISSION_RANKS.get(permission, 0) >= PERMISSION_RANKS[required]
+
+class CRUDProject(SearchMixin, AsyncCRUDBase[Project, ProjectCreate, ProjectUpdate]):
+    async def get_by_owner(self, db: AsyncSession, *, owner_id: int, options: Optional[Sequence[ExecutableOption]] = None) -> List[Project]:
         """Récupérer tous les projets d'un utilisateur"""
-        return db.query(Project).filter(Project.owner_id == owner_id).all()
+        result = await db.execute(self._list_select(options).filter(Project.owner_id == owner_id))
+        return list(result.scalars().all())
 
-    def get_public_projects(self, db: Session, *, skip: int=0, limit: int=0) -> List[Project]:
-        """Récupérer tous les projets publics"""
-        return db.query(Project).filter(Project.is_public == True).offset(skip).limit(limit).all()
+    async def get_public_projects(
+        self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Project], Optional[str]]:
+        """Récupérer les projets publics"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[Project.is_public == True], options=options)
 
-    def get_by_format(self, db: Session, *, format_type: str) -> List[Project]:
+    async def get_by_format(
+        self, db: AsyncSession, *, format_type: str, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Project], Optional[str]]:
         """Récupérer les projets par format (A4, A5, custom)"""
-        return db.query(Project).filter(Project.format_type == format_type).all()
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[Project.format_type == format_type], options=options)
 
-    def search_projects(self, db: Session, *, query: str) -> List[Project]:
-        """Rechercher des projets par titre ou description"""
-        return db.query(Project).filter(Project.title.ilike(f"%{query}%")) | Project.description.ilike(f"%{query}%").all().all()
+    async def search_projects(
+        self, db: AsyncSession, *, query: str, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Project], Optional[str]]:
+        """Rechercher des projets par titre ou description (plein texte, classé par pertinence)"""
+        return await self.search_page(db, query=query, cursor=cursor, limit=limit, options=options)
 
-    def get_user_projects(self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100) -> List[Project]:
+    async def get_user_projects(
+        self, db: AsyncSession, *, owner_id: int, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Project], Optional[str]]:
         """Récupérer les projets d'un utilisateur avec pagination"""
-        return db.query(Project).filter(Project.owner_id == owner_id).offset(skip).limit(limit).all()
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[Project.owner_id == owner_id], options=options)
+
+    async def owned_ids(self, db: AsyncSession, *, owner_id: int, ids: Iterable[int]) -> Set[int]:
+        """Ids des projets de `owner_id` parmi ceux donnés, en une seule requête IN"""
+        ids = set(ids)
+        if not ids:
+            return set()
+        result = await db.execute(select(Project.id).filter(Project.id.in_(ids), Project.owner_id == owner_id))
+        return set(result.scalars().all())
+
+    def _access_ranks(self, user_id: int, project_id: Optional[int] = None) -> Any:
+        """
+        Projets accessibles à l'utilisateur et rang de la permission : UNION ALL des projets possédés
+        (index owner_id) et des partages reçus (index shared_with_user_id). Un projet à la fois
+        possédé et partagé apparaît deux fois : prendre le rang maximal.
+        """
+        owned = select(Project.id.label("project_id"), literal(PERMISSION_RANKS["owner"]).label("rank")).where(
+            Project.owner_id == user_id
+        )
+        shared = select(
+            SharedProject.project_id,
+            case(
+                {permission: PERMISSION_RANKS[permission] for permission in ("copy", "edit")},
+                value=SharedProject.permission,
+                else_=PERMISSION_RANKS["view"],
+            ),
+        ).where(SharedProject.shared_with_user_id == user_id)
+        if project_id is not None:
+            owned = owned.where(Project.id == project_id)
+            shared = shared.where(SharedProject.project_id == project_id)
+        return union_all(owned, shared).subquery()
+
+    async def get_permission(self, db: AsyncSession, *, user_id: int, project_id: int) -> Optional[str]:
+        """Permission effective d'un utilisateur sur un projet (owner, edit, copy, view), None sans accès"""
+        ranks = self._access_ranks(user_id, project_id)
+        rank = await db.scalar(select(func.max(ranks.c.rank)))
+        return PERMISSION_LEVELS[rank - 1] if rank else None
+
+    async def get_accessible_page(
+        self, db: AsyncSession, *, user_id: int, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Tuple[Project, str]], Optional[str]]:
+        """
+        Projets possédés ou partagés avec l'utilisateur et leur permission effective, en une requête,
+        paginés par curseur (created_at, id) décroissants.
+        """
+        ranks = self._access_ranks(user_id)
+        best = (
+            select(ranks.c.project_id, func.max(ranks.c.rank).label("rank"))
+            .group_by(ranks.c.project_id)
+            .subquery()
+        )
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        stmt = self._list_select(options).join(best, best.c.project_id == Project.id).add_columns(best.c.rank)
+        if cursor:
+            last_created_at, last_id = decode_cursor(cursor, CURSOR_DATE)
+            stmt = stmt.filter(tuple_(Project.created_at, Project.id) < tuple_(last_created_at, last_id))
+        stmt = stmt.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit + 1)
+
+        rows = (await db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return [(item, PERMISSION_LEVELS[rank - 1]) for item, rank in rows], next_cursor
+
+    async def update(
+        self, db: AsyncSession, *, db_obj: Project, obj_in: Union[ProjectUpdate, Dict[str, Any]],
+        if_unmodified: bool = False
+    ) -> Project:
+        """
+        Mettre à jour un projet (nouvelle version du canvas si canvas_data est remplacé).
+        if_unmodified : l'UPDATE ne s'applique que si updated_at est toujours celui de db_obj
+        (condition dans le WHERE, atomique face aux écritures concurrentes) ; ResourceModified sinon.
+        """
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        if "canvas_data" in update_data:
+            update_data = {**update_data, "canvas_version": Project.canvas_version + 1}
+        if not if_unmodified:
+            return await super().update(db, db_obj=db_obj, obj_in=update_data)
+
+        id = db_obj.id  # le rollback expire db_obj
+        result = await db.execute(
+            update(Project)
+            .where(Project.id == id, Project.updated_at == db_obj.updated_at)
+            .values(**update_data)
+            .execution_options(synchronize_session=False)
+        )
+        if not result.rowcount:
+            await db.rollback()
+            self.invalidate(id)
+            raise ResourceModified()
+        await db.commit()
+        self.invalidate(id)
+        return await self._reload(db, db_obj)
+
+    async def write_canvas(self, db: AsyncSession, *, id: int, canvas_data: Dict[str, Any]) -> Optional[int]:
+        """Remplacer le canvas sans relire le projet ; retourne la nouvelle version, None si le projet n'existe pas"""
+        new_version = await db.scalar(
+            update(Project)
+            .where(Project.id == id)
+            .values(canvas_data=canvas_data, canvas_version=Project.canvas_version + 1)
+            .returning(Project.canvas_version)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        self.invalidate(id)
+        return new_version
+
+    async def get_render_source(self, db: AsyncSession, *, id: int) -> Optional[Any]:
+        """Colonnes nécessaires au rendu de la miniature (canvas, version, format, miniature courante)"""
+        result = await db.execute(
+            select(
+                Project.canvas_data, Project.canvas_version, Project.format_type,
+                Project.width, Project.height, Project.thumbnail_url,
+            ).where(Project.id == id)
+        )
+        return result.first()
+
+    async def set_thumbnail(self, db: AsyncSession, *, id: int, thumbnail_url: str, canvas_version: int) -> bool:
+        """
+        Enregistrer la miniature rendue pour `canvas_version` ; sans effet si le canvas a changé depuis.
+        updated_at est conservé : la miniature est dérivée du canvas et ne doit pas invalider les If-Match.
+        """
+        result = await db.execute(
+            update(Project)
+            .where(Project.id == id, Project.canvas_version == canvas_version)
+            .values(thumbnail_url=thumbnail_url, updated_at=Project.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        self.invalidate(id)
+        return bool(result.rowcount)
+
+    async def patch_canvas(
+        self, db: AsyncSession, *, id: int, version: int, operations: Sequence[JsonPatchOperation]
+    ) -> Optional[int]:
+        """
+        Appliquer un JSON Patch (RFC 6902) au canvas directement en base, sans relire le document.
+        Retourne la nouvelle version, None si le projet n'existe pas.
+        Lève VersionConflict si `version` n'est plus la version courante, JsonPatchError si une opération échoue.
+        """
+        # Verrouille la ligne jusqu'au commit : les patchs concurrents sont sérialisés
+        current = await db.scalar(select(Project.canvas_version).where(Project.id == id).with_for_update())
+        if current is None:
+            return None
+        if current != version:
+            await db.rollback()
+            raise VersionConflict(current)
+
+        new_version = current
+        try:
+            for index, operation in enumerate(operations):
+                new_doc, condition = compile_operation(Project.canvas_data, operation)
+                if new_doc is None:
+                    matched = await db.scalar(select(Project.id).where(Project.id == id, condition))
+                else:
+                    new_version = current + 1
+                    result = await db.execute(
+                        update(Project)
+                        .where(Project.id == id, condition)
+                        .values(canvas_data=new_doc, canvas_version=new_version)
+                        .execution_options(synchronize_session=False)
+                    )
+                    matched = result.rowcount
+                if not matched:
+                    raise JsonPatchError(f"Operation {index} ({operation.op} {operation.path}) cannot be applied")
+        except DBAPIError as exc:
+            await db.rollback()
+            raise JsonPatchError(f"Operation {index} ({operation.op} {operation.path}) cannot be applied") from exc
+        except JsonPatchError:
+            await db.rollback()
+            raise
+
+        await db.commit()
+        self.invalidate(id)
+        return new_version
 
-project = CRUDProject(Project)
\ No newline at end of file
+# owner est embarqué dans ProjectResponse ; les listes (ProjectSummary) ne chargent pas canvas_data
+project = CRUDProject(
+    Project,
+    options=[joinedload(Project.owner)],
+    list_options=[joinedload(Project.owner), defer(Project.canvas_data)],
+    cache=entity_cache("project"),
+)
@@ -1,27 +1,113 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
-from app.models.models import SharedProject
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, joinedload
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
+from app.crud.base import AsyncCRUDBase
+from app.models.models import Project, SharedProject
 from app.schemas.schemas import SharedProjectCreate, SharedProjectResponse
+from app.services.permissions import invalidate_permission
 
-class CRUDSharedProject(CRUDBase[SharedProject, SharedProjectCreate, SharedProjectResponse]):
-    def get_by_user(self, db: Session, *, user_id: int) -> List[SharedProject]:
-        """Récupérer tous les projets partagés avec un utilisateur"""
-        return db.query(SharedProject).filter(SharedProject.shared_with_user_id == user_id).all()
+class CRUDSharedProject(AsyncCRUDBase[SharedProject, SharedProjectCreate, SharedProjectResponse]):
+    """Les écritures invalident le cache des permissions des couples (utilisateur, projet) concernés"""
 
-    def get_by_project(self, db: Session, *, project_id: int) -> List[SharedProject]:
-        """Récupérer tous les partages d'un projet"""
-        return db.query(SharedProject).filter(SharedProject.project_id == project_id).all()
+    async def get_by_user(
+        self, db: AsyncSession, *, user_id: int, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[SharedProject], Optional[str]]:
+        """Récupérer les projets partagés avec un utilisateur"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[SharedProject.shared_with_user_id == user_id], options=options)
 
-    def get_by_permission(self, db: Session, *, permission: str) -> List[SharedProject]:
+    async def get_by_project(
+        self, db: AsyncSession, *, project_id: int, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[SharedProject], Optional[str]]:
+        """Récupérer les partages d'un projet"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[SharedProject.project_id == project_id], options=options)
+
+    async def get_by_permission(
+        self, db: AsyncSession, *, permission: str, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[SharedProject], Optional[str]]:
         """Récupérer les partages par permission (view, edit, copy)"""
-        return db.query(SharedProject).filter(SharedProject.permission == permission).all()
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[SharedProject.permission == permission], options=options)
 
-    def get_user_project_permission(self, db: Session, *, user_id: int, project_id: int) -> Optional[SharedProject]:
+    async def get_user_project_permission(self, db: AsyncSession, *, user_id: int, project_id: int, options: Optional[Sequence[ExecutableOption]] = None) -> Optional[SharedProject]:
         """Récupérer la permission d'un utilisateur sur un projet"""
-        return db.query(SharedProject).filter(
+        result = await db.execute(self._select(options).filter(
             SharedProject.shared_with_user_id == user_id, 
             SharedProject.project_id == project_id
-        ).first()
+        ))
+        return result.scalars().first()
+
+    async def existing_pairs(self, db: AsyncSession, *, pairs: Iterable[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+        """Couples (user_id, project_id) déjà partagés parmi ceux donnés, en une seule requête"""
+        pairs = set(pairs)
+        if not pairs:
+            return set()
+        key = tuple_(SharedProject.shared_with_user_id, SharedProject.project_id)
+        result = await db.execute(
+            select(SharedProject.shared_with_user_id, SharedProject.project_id).filter(key.in_(pairs))
+        )
+        return set(result.tuples().all())
+
+    async def create(self, db: AsyncSession, *, obj_in: SharedProjectCreate) -> SharedProject:
+        """Créer un partage"""
+        db_obj = await super().create(db, obj_in=obj_in)
+        invalidate_permission(db_obj.shared_with_user_id, db_obj.project_id)
+        return db_obj
+
+    async def create_many(
+        self, db: AsyncSession, *, objs_in: Sequence[SharedProjectCreate], values: Optional[Dict[str, Any]] = None
+    ) -> List[SharedProject]:
+        """Créer plusieurs partages en un seul INSERT"""
+        created = await super().create_many(db, objs_in=objs_in, values=values)
+        for db_obj in created:
+            invalidate_permission(db_obj.shared_with_user_id, db_obj.project_id)
+        return created
+
+    async def update(
+        self, db: AsyncSession, *, db_obj: SharedProject, obj_in: Union[SharedProjectResponse, Dict[str, Any]]
+    ) -> SharedProject:
+        """Mettre à jour un partage (le couple d'origine et le nouveau sont invalidés)"""
+        before = (db_obj.shared_with_user_id, db_obj.project_id)
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=obj_in)
+        invalidate_permission(*before)
+        invalidate_permission(db_obj.shared_with_user_id, db_obj.project_id)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> SharedProject:
+        """Supprimer un partage"""
+        db_obj = await super().remove(db, id=id)
+        invalidate_permission(db_obj.shared_with_user_id, db_obj.project_id)
+        return db_obj
+
+    async def remove_many(self, db: AsyncSession, *, ids: Sequence[int], owner_id: Optional[int] = None) -> List[int]:
+        """
+        Supprimer plusieurs partages en un seul DELETE ... RETURNING, retourne les ids supprimés.
+        `owner_id` : seuls les partages des projets de cet utilisateur sont supprimés.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        filters = [SharedProject.id.in_(ids)]
+        if owner_id is not None:
+            filters.append(SharedProject.project_id.in_(select(Project.id).where(Project.owner_id == owner_id)))
+        result = await db.execute(
+            delete(SharedProject).filter(*filters)
+            .returning(SharedProject.id, SharedProject.shared_with_user_id, SharedProject.project_id)
+        )
+        rows = result.all()
+        await db.commit()
+        for id, user_id, project_id in rows:
+            self.invalidate(id)
+            invalidate_permission(user_id, project_id)
+        deleted = {row[0] for row in rows}
+        return [id for id in ids if id in deleted]
 
-shared_project = CRUDSharedProject(SharedProject)
\ No newline at end of file
+# project (ProjectSummary, avec son owner, sans canvas_data) et shared_with sont embarqués dans SharedProjectResponse
+shared_project = CRUDSharedProject(SharedProject, cursor_column="shared_at", options=[
+    joinedload(SharedProject.project).options(joinedload(Project.owner), defer(Project.canvas_data)),
+    joinedload(SharedProject.shared_with),
+])
@@ -0,0 +1,132 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import User, UserAsset, UserStorageUsage
+
+# Variation des compteurs : (user_id, file_type) -> (octets, nombre d'assets)
+UsageDeltas = Dict[Tuple[Optional[int], str], Tuple[int, int]]
+
+
+class QuotaExceeded(Exception):
+    """L'opération ferait dépasser le quota de stockage de l'utilisateur"""
+
+    def __init__(self, required: int, quota: int):
+        super().__init__(f"Storage quota exceeded ({required} / {quota} bytes)")
+        self.required = required  # usage après l'opération
+        self.quota = quota
+
+
+def add_delta(deltas: UsageDeltas, user_id: Optional[int], file_type: str, size: int, count: int) -> None:
+    """Cumuler une variation (négative pour une suppression)"""
+    total_bytes, asset_count = deltas.get((user_id, file_type), (0, 0))
+    deltas[(user_id, file_type)] = (total_bytes + size, asset_count + count)
+
+
+class CRUDStorageUsage:
+    """
+    Compteurs d'usage du stockage par (utilisateur, type de fichier).
+    apply() ne commite pas : il est appelé dans la transaction qui crée ou supprime les assets,
+    après l'écriture de ceux-ci (ordre attendu par reconcile_batch).
+    """
+
+    async def apply(self, db: AsyncSession, deltas: UsageDeltas) -> None:
+        """Appliquer des variations aux compteurs, en un seul INSERT ... ON CONFLICT DO UPDATE"""
+        # Ordre stable des verrous de lignes : pas d'interblocage entre transactions concurrentes
+        rows = [
+            {"user_id": user_id, "file_type": file_type, "total_bytes": size, "asset_count": count}
+            for (user_id, file_type), (size, count) in sorted(deltas.items(), key=lambda item: (item[0][0] or 0, item[0][1]))
+            if user_id is not None and (size or count)
+        ]
+        if not rows:
+            return
+        stmt = insert(UserStorageUsage).values(rows)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[UserStorageUsage.user_id, UserStorageUsage.file_type],
+            set_={
+                "total_bytes": UserStorageUsage.total_bytes + stmt.excluded.total_bytes,
+                "asset_count": UserStorageUsage.asset_count + stmt.excluded.asset_count,
+            },
+        ))
+
+    async def get_total(self, db: AsyncSession, *, user_id: int) -> int:
+        """Octets utilisés par un utilisateur (somme de quelques lignes lues par clé primaire)"""
+        total = await db.scalar(
+            select(func.coalesce(func.sum(UserStorageUsage.total_bytes), 0)).where(UserStorageUsage.user_id == user_id)
+        )
+        return int(total)
+
+    async def get_by_user(self, db: AsyncSession, *, user_id: int) -> List[UserStorageUsage]:
+        """Compteurs d'un utilisateur par type de fichier"""
+        result = await db.execute(
+            select(UserStorageUsage).where(UserStorageUsage.user_id == user_id).order_by(UserStorageUsage.file_type)
+        )
+        return list(result.scalars().all())
+
+    async def lock_user(self, db: AsyncSession, *, user_id: int) -> None:
+        """
+        Verrouiller l'utilisateur jusqu'à la fin de la transaction, avant d'insérer ses assets :
+        les écritures d'un même utilisateur sont sérialisées, l'usage lu ensuite inclut celles déjà
+        validées. FOR NO KEY UPDATE reste compatible avec le FOR KEY SHARE des clés étrangères.
+        """
+        await db.execute(select(User.id).where(User.id == user_id).with_for_update(key_share=True))
+
+    async def check_quota(self, db: AsyncSession, *, user_id: int, quota: int, extra_bytes: int = 0) -> int:
+        """Lever QuotaExceeded si l'usage (+ extra_bytes) dépasse le quota (0 = illimité) ; retourne l'usage"""
+        used = await self.get_total(db, user_id=user_id)
+        if quota and used + extra_bytes > quota:
+            raise QuotaExceeded(used + extra_bytes, quota)
+        return used
+
+    async def reconcile_batch(self, db: AsyncSession, *, user_ids: Sequence[int], fix: bool = True) -> List[Dict[str, Any]]:
+        """
+        Recalculer les compteurs d'un lot d'utilisateurs depuis user_assets et retourner les écarts.
+        Verrouille les utilisateurs (FOR UPDATE, en conflit avec le FOR KEY SHARE pris par l'insertion
+        d'un asset) puis leurs compteurs : les écritures concurrentes sont soit visibles, soit appliquées
+        après le commit du lot, en delta. Commit (fix) ou rollback à la fin du lot.
+        """
+        user_ids = sorted(set(user_ids))
+        await db.execute(select(User.id).where(User.id.in_(user_ids)).order_by(User.id).with_for_update())
+        counted = await db.execute(
+            select(UserStorageUsage.user_id, UserStorageUsage.file_type, UserStorageUsage.total_bytes, UserStorageUsage.asset_count)
+            .where(UserStorageUsage.user_id.in_(user_ids))
+            .order_by(UserStorageUsage.user_id, UserStorageUsage.file_type)
+            .with_for_update()
+        )
+        actual = await db.execute(
+            select(UserAsset.user_id, UserAsset.file_type, func.sum(UserAsset.file_size), func.count())
+            .where(UserAsset.user_id.in_(user_ids))
+            .group_by(UserAsset.user_id, UserAsset.file_type)
+        )
+        counters = {(row[0], row[1]): (int(row[2]), int(row[3])) for row in counted}
+        expected = {(row[0], row[1]): (int(row[2]), int(row[3])) for row in actual}
+
+        drift: List[Dict[str, Any]] = []
+        corrections: UsageDeltas = {}
+        for key in sorted(counters.keys() | expected.keys()):
+            counted_bytes, counted_count = counters.get(key, (0, 0))
+            expected_bytes, expected_count = expected.get(key, (0, 0))
+            if (counted_bytes, counted_count) != (expected_bytes, expected_count):
+                drift.append({
+                    "user_id": key[0], "file_type": key[1],
+                    "counted_bytes": counted_bytes, "expected_bytes": expected_bytes,
+                    "counted_count": counted_count, "expected_count": expected_count,
+                })
+                add_delta(corrections, key[0], key[1], expected_bytes - counted_bytes, expected_count - counted_count)
+
+        if fix and corrections:
+            await self.apply(db, corrections)
+            await db.execute(
+                UserStorageUsage.__table__.delete().where(
+                    UserStorageUsage.user_id.in_(user_ids),
+                    UserStorageUsage.total_bytes == 0,
+                    UserStorageUsage.asset_count == 0,
+                )
+            )
+            await db.commit()
+        else:
+            await db.rollback()
+        return drift
+
+
+storage_usage = CRUDStorageUsage()
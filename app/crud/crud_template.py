@@ -1,21 +1,41 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, undefer
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
+from app.crud.base import AsyncCRUDBase, entity_cache
+from app.crud.search import SearchMixin
 from app.models.models import Template
 from app.schemas.schemas import TemplateCreate, TemplateUpdate
 
-class CRUDTemplate(CRUDBase[Template, TemplateCreate, TemplateUpdate]):
-    def get_by_category(self, db: Session, *, category_id: int) -> List[Template]:
-        """Récupérer tous les templates d'une catégorie"""
-        return db.query(Template).filter(Template.category_id == category_id).all()
+class CRUDTemplate(SearchMixin, AsyncCRUDBase[Template, TemplateCreate, TemplateUpdate]):
+    async def get_by_category(
+        self, db: AsyncSession, *, category_id: int, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Template], Optional[str]]:
+        """Récupérer les templates d'une catégorie"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[Template.category_id == category_id], options=options)
 
 
-    def get_active_templates(self, db: Session) -> List[Template]:
+    async def get_active_templates(
+        self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Template], Optional[str]]:
         """Récupérer les templates actifs"""
-        return db.query(Template).filter(Template.is_active == True).all()
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[Template.is_active == True], options=options)
 
-    def search_templates(self, db: Session, *, query: str) -> List[Template]:
-        """Rechercher des templates par titre ou description"""
-        return db.query(Template).filter(Template.title.ilike(f"%{query}%") | Template.description.ilike(f"%{query}%")).all()
+    async def search_templates(
+        self, db: AsyncSession, *, query: str, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[Template], Optional[str]]:
+        """Rechercher des templates par titre ou description (plein texte, classé par pertinence)"""
+        return await self.search_page(db, query=query, cursor=cursor, limit=limit, options=options)
 
-template = CRUDTemplate(Template)
\ No newline at end of file
+# category est embarquée dans TemplateResponse ; canvas_data (différée dans le modèle) n'est chargée
+# et décompressée que par les lectures unitaires, pas par les listes (TemplateSummary)
+template = CRUDTemplate(
+    Template,
+    options=[joinedload(Template.category), undefer(Template.canvas_data)],
+    list_options=[joinedload(Template.category)],
+    cache=entity_cache("template"),
+)
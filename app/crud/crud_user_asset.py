@@ -1,23 +1,213 @@
-from typing import List
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+import asyncio
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
+from app.crud.base import AsyncCRUDBase
+from app.crud.crud_storage_usage import QuotaExceeded, UsageDeltas, add_delta, storage_usage
 from app.models.models import UserAsset
 from app.schemas.schemas import UserAssetCreate, UserAssetResponse
+from app.services.storage import get_storage
 
-class CRUDUserAsset(CRUDBase[UserAsset, UserAssetCreate, UserAssetResponse]):
-    def get_by_user(self, db: Session, *, user_id: int) -> List[UserAsset]:
-        """Récupérer tous les assets d'un utilisateur"""
-        return db.query(UserAsset).filter(UserAsset.user_id == user_id).all()
+logger = logging.getLogger(__name__)
 
-    def get_by_type(self, db: Session, *, file_type: str) -> List[UserAsset]:
+# Clé des fichiers stockés par l'upload : assets/<user_id>/<sha256><ext> (app/services/uploads.py)
+_UPLOAD_KEY = re.compile(r"assets/(\d+)/([0-9a-f]{64})(\.[a-z0-9]{1,10})?")
+
+def stored_file_key(user_id: Optional[int], content_hash: Optional[str], filename: str) -> Optional[str]:
+    """Clé du fichier stocké pour un asset uploadé ; None pour un asset qui référence une URL externe"""
+    match = _UPLOAD_KEY.fullmatch(filename or "")
+    if match and content_hash and match.group(1) == str(user_id) and match.group(2) == content_hash:
+        return filename
+    return None
+
+async def delete_stored_files(keys: Iterable[str]) -> None:
+    """Supprimer des fichiers du stockage (après le commit) ; un échec est journalisé, pas propagé"""
+    storage = get_storage()
+    for key in keys:
+        try:
+            await asyncio.to_thread(storage.delete, key)
+        except Exception:
+            logger.exception("Could not delete stored file %s", key)
+
+class CRUDUserAsset(AsyncCRUDBase[UserAsset, UserAssetCreate, UserAssetResponse]):
+    async def get_by_user(
+        self, db: AsyncSession, *, user_id: int, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[UserAsset], Optional[str]]:
+        """Récupérer les assets d'un utilisateur"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[UserAsset.user_id == user_id], options=options)
+
+    async def get_by_type(
+        self, db: AsyncSession, *, file_type: str, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[UserAsset], Optional[str]]:
         """Récupérer les assets par type (image, video, audio, document)"""
-        return db.query(UserAsset).filter(UserAsset.file_type == file_type).all()
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[UserAsset.file_type == file_type], options=options)
 
-    def get_user_assets_by_type(self, db: Session, *, user_id: int, file_type: str) -> List[UserAsset]:
+    async def get_user_assets_by_type(
+        self, db: AsyncSession, *, user_id: int, file_type: str, cursor: Optional[str] = None,
+        limit: int = settings.DEFAULT_PAGE_SIZE, options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[UserAsset], Optional[str]]:
         """Récupérer les assets d'un utilisateur par type"""
-        return db.query(UserAsset).filter(
+        return await self.get_page(db, cursor=cursor, limit=limit, options=options, filters=[
             UserAsset.user_id == user_id, 
             UserAsset.file_type == file_type
-        ).all()
+        ])
+
+    async def get_by_hash(self, db: AsyncSession, *, user_id: int, content_hash: str) -> Optional[UserAsset]:
+        """Récupérer l'asset d'un utilisateur par l'empreinte SHA-256 de son contenu"""
+        result = await db.execute(
+            select(UserAsset).filter(UserAsset.user_id == user_id, UserAsset.content_hash == content_hash)
+        )
+        return result.scalars().first()
+
+    # Toutes les écritures ci-dessous mettent à jour les compteurs d'usage (storage_usage)
+    # dans la même transaction que les assets, après l'écriture de ceux-ci
+
+    async def create_for_user(
+        self, db: AsyncSession, *, obj_in: UserAssetCreate, user_id: Optional[int], content_hash: Optional[str] = None,
+        quota: int = 0
+    ) -> UserAsset:
+        """Créer un asset appartenant à un utilisateur ; QuotaExceeded (rollback) si l'usage dépasse `quota`"""
+        if quota and user_id is not None:
+            await storage_usage.lock_user(db, user_id=user_id)
+        db_obj = UserAsset(**obj_in.model_dump(), user_id=user_id, content_hash=content_hash)
+        db.add(db_obj)
+        await db.flush()
+        await storage_usage.apply(db, {(user_id, db_obj.file_type): (db_obj.file_size, 1)})
+        if quota and user_id is not None:
+            # Usage relu dans la transaction, compteur déjà incrémenté
+            try:
+                await storage_usage.check_quota(db, user_id=user_id, quota=quota)
+            except QuotaExceeded:
+                await db.rollback()
+                raise
+        await db.commit()
+        return await self._reload(db, db_obj)
+
+    async def create(self, db: AsyncSession, *, obj_in: UserAssetCreate) -> UserAsset:
+        """Créer un asset sans propriétaire"""
+        return await self.create_for_user(db, obj_in=obj_in, user_id=None)
+
+    async def create_many(
+        self, db: AsyncSession, *, objs_in: Sequence[UserAssetCreate], values: Optional[Dict[str, Any]] = None
+    ) -> List[UserAsset]:
+        """Créer plusieurs assets en un seul INSERT, compteurs d'usage compris"""
+        if not objs_in:
+            return []
+        ids, rows = await self._insert_many(db, objs_in, values)
+        deltas: UsageDeltas = {}
+        for row in rows:
+            add_delta(deltas, row.get("user_id"), row["file_type"], row["file_size"], 1)
+        await storage_usage.apply(db, deltas)
+        await db.commit()
+        return await self._load_many(db, ids)
+
+    async def create_many_within_quota(
+        self, db: AsyncSession, *, objs_in: Sequence[UserAssetCreate], user_id: int, quota: int = 0
+    ) -> Tuple[List[UserAsset], List[int]]:
+        """
+        Créer des assets d'un utilisateur en un seul INSERT sans dépasser `quota` (0 = illimité) ;
+        retourne les assets créés et les index refusés. L'usage est lu sous le verrou de
+        l'utilisateur, dans la transaction d'insertion.
+        """
+        accepted, rejected = list(objs_in), []
+        if quota:
+            await storage_usage.lock_user(db, user_id=user_id)
+            used = await storage_usage.get_total(db, user_id=user_id)
+            accepted = []
+            for index, obj_in in enumerate(objs_in):
+                if used + obj_in.file_size > quota:
+                    rejected.append(index)
+                else:
+                    used += obj_in.file_size
+                    accepted.append(obj_in)
+        if not accepted:
+            await db.rollback()
+            return [], rejected
+        return await self.create_many(db, objs_in=accepted, values={"user_id": user_id}), rejected
+
+    async def update(
+        self, db: AsyncSession, *, db_obj: UserAsset, obj_in: Union[UserAssetResponse, Dict[str, Any]], quota: int = 0
+    ) -> UserAsset:
+        """
+        Mettre à jour un asset (taille, type ou propriétaire reportés sur les compteurs) ;
+        QuotaExceeded (rollback) si l'usage du propriétaire augmente au-delà de `quota`
+        """
+        id = db_obj.id  # le rollback expire db_obj
+        deltas: UsageDeltas = {}
+        add_delta(deltas, db_obj.user_id, db_obj.file_type, -db_obj.file_size, -1)
+        self._assign(db_obj, obj_in)
+        add_delta(deltas, db_obj.user_id, db_obj.file_type, db_obj.file_size, 1)
+        owner = db_obj.user_id
+        grows = owner is not None and sum(size for (user_id, _), (size, _) in deltas.items() if user_id == owner) > 0
+        if quota and grows:
+            # Verrou pris avant l'écriture de l'asset, comme à la création
+            with db.no_autoflush:
+                await storage_usage.lock_user(db, user_id=owner)
+        db.add(db_obj)
+        await db.flush()
+        await storage_usage.apply(db, deltas)
+        if quota and grows:
+            try:
+                await storage_usage.check_quota(db, user_id=owner, quota=quota)
+            except QuotaExceeded:
+                await db.rollback()
+                self.invalidate(id)
+                raise
+        await db.commit()
+        self.invalidate(db_obj.id)
+        return await self._reload(db, db_obj)
+
+    async def remove(self, db: AsyncSession, *, id: int) -> UserAsset:
+        """Supprimer un asset, et son fichier s'il a été uploadé"""
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.flush()
+        await storage_usage.apply(db, {(obj.user_id, obj.file_type): (-obj.file_size, -1)})
+        key = stored_file_key(obj.user_id, obj.content_hash, obj.filename)
+        await db.commit()
+        self.invalidate(id)
+        if key is not None:
+            await delete_stored_files([key])
+        return obj
+
+    async def remove_many(self, db: AsyncSession, *, ids: Sequence[int], user_id: Optional[int] = None) -> List[int]:
+        """
+        Supprimer plusieurs assets en un seul DELETE ... RETURNING, compteurs d'usage et fichiers uploadés compris.
+        `user_id` : seuls les assets de cet utilisateur sont supprimés, les autres ids sont ignorés.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        filters = [UserAsset.id.in_(ids)]
+        if user_id is not None:
+            filters.append(UserAsset.user_id == user_id)
+        result = await db.execute(
+            delete(UserAsset).filter(*filters)
+            .returning(
+                UserAsset.id, UserAsset.user_id, UserAsset.file_type, UserAsset.file_size,
+                UserAsset.content_hash, UserAsset.filename,
+            )
+        )
+        deleted = set()
+        deltas: UsageDeltas = {}
+        keys = []
+        for asset_id, user_id, file_type, file_size, content_hash, filename in result.all():
+            deleted.add(asset_id)
+            add_delta(deltas, user_id, file_type, -file_size, -1)
+            key = stored_file_key(user_id, content_hash, filename)
+            if key is not None:
+                keys.append(key)
+        await storage_usage.apply(db, deltas)
+        await db.commit()
+        for id in deleted:
+            self.invalidate(id)
+        await delete_stored_files(keys)
+        return [id for id in ids if id in deleted]
 
-user_asset = CRUDUserAsset(UserAsset)
\ No newline at end of file
+user_asset = CRUDUserAsset(UserAsset)
@@ -1,20 +1,37 @@
-from typing import Optional
-from sqlalchemy.orm import Session
-from app.crud.base import CRUDBase
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
+from app.core.config import settings
+from app.crud.base import AsyncCRUDBase
 from app.models.models import User
 from app.schemas.schemas import UserCreate, UserUpdate
 
-class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
-    def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
+class CRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    async def get_by_email(self, db: AsyncSession, *, email: str, options: Optional[Sequence[ExecutableOption]] = None) -> Optional[User]:
         """Récupérer un utilisateur par email"""
-        return db.query(User).filter(User.email == email).first()
+        result = await db.execute(self._select(options).filter(User.email == email))
+        return result.scalars().first()
 
-    def get_by_google_id(self, db: Session, *, google_id: str) -> Optional[User]:
+    async def get_by_google_id(self, db: AsyncSession, *, google_id: str, options: Optional[Sequence[ExecutableOption]] = None) -> Optional[User]:
         """Récupérer un utilisateur par son Google ID"""
-        return db.query(User).filter(User.google_id == google_id).first()
+        result = await db.execute(self._select(options).filter(User.google_id == google_id))
+        return result.scalars().first()
 
-    def get_active_users(self, db: Session) -> list[User]:
-        """Récupérer tous les utilisateurs actifs"""
-        return db.query(User).filter(User.is_active == True).all()
+    async def get_active_users(
+        self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = settings.DEFAULT_PAGE_SIZE,
+        options: Optional[Sequence[ExecutableOption]] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Récupérer les utilisateurs actifs"""
+        return await self.get_page(db, cursor=cursor, limit=limit, filters=[User.is_active == True], options=options)
 
-user = CRUDUser(User)
\ No newline at end of file
+    async def get_auth_state(self, db: AsyncSession, *, id: int) -> Optional[Row]:
+        """Lire uniquement les colonnes utiles à l'authentification (id, is_active, is_verified, token_version)"""
+        result = await db.execute(
+            select(User.id, User.is_active, User.is_verified, User.token_version).filter(User.id == id)
+        )
+        return result.first()
+
+# Pas de cache d'entité : get() sert à l'authentification (token_version, is_active), qui ne doit
+# pas survivre plus longtemps que le snapshot d'authentification (AUTH_SNAPSHOT_TTL_SECONDS)
+user = CRUDUser(User)
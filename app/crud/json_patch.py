@@ -0,0 +1,114 @@
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Text, case, false, func, literal, true
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.schemas.schemas import JsonPatchOperation
+
+
+class JsonPatchError(ValueError):
+    """Opération JSON Patch invalide ou inapplicable au document courant"""
+
+
+class VersionConflict(Exception):
+    """Le document a changé depuis la version sur laquelle le patch a été calculé"""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Current version is {current_version}")
+        self.current_version = current_version
+
+
+def parse_pointer(pointer: str) -> List[str]:
+    """Découper un JSON Pointer (RFC 6901) : "/objects/0/x" -> ["objects", "0", "x"]"""
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _path(tokens: List[str]) -> ColumnElement:
+    return literal(tokens, ARRAY(Text))
+
+
+def _get(doc: ColumnElement, tokens: List[str]) -> ColumnElement:
+    return doc.op("#>", return_type=JSONB)(_path(tokens)) if tokens else doc
+
+
+def _exists(doc: ColumnElement, tokens: List[str]) -> ColumnElement:
+    return _get(doc, tokens).isnot(None) if tokens else true()
+
+
+def _remove(doc: ColumnElement, tokens: List[str]) -> ColumnElement:
+    return doc.op("#-", return_type=JSONB)(_path(tokens))
+
+
+# Index de tableau RFC 6901 : entier décimal, sans signe ni zéro initial
+_ARRAY_INDEX = re.compile(r"0|[1-9][0-9]*")
+
+
+def _add(doc: ColumnElement, tokens: List[str], value: ColumnElement) -> Tuple[ColumnElement, ColumnElement]:
+    """Ajout RFC 6902 : insertion avant l'index dans un tableau, "-" en fin de tableau, clé dans un objet"""
+    if not tokens:
+        return value, true()
+    parent, last = tokens[:-1], tokens[-1]
+    container = _get(doc, parent)
+    if last == "-":
+        appended = container.op("||", return_type=JSONB)(func.jsonb_build_array(value))
+        new_doc = func.jsonb_set(doc, _path(parent), appended, type_=JSONB) if parent else appended
+        return new_doc, func.jsonb_typeof(container) == "array"
+    is_array = func.jsonb_typeof(container) == "array"
+    new_doc = case(
+        (is_array, func.jsonb_insert(doc, _path(tokens), value, type_=JSONB)),
+        else_=func.jsonb_set(doc, _path(tokens), value, True, type_=JSONB),
+    )
+    # Au-delà de la fin du tableau, jsonb_insert ajouterait en dernier : erreur pour la RFC, comme
+    # un index négatif (compté depuis la fin par jsonb_insert) ou non numérique
+    in_bounds = func.jsonb_array_length(container) >= int(last) if _ARRAY_INDEX.fullmatch(last) else false()
+    return new_doc, case((is_array, in_bounds), else_=func.jsonb_typeof(container) == "object")
+
+
+def compile_operation(doc: ColumnElement, operation: JsonPatchOperation) -> Tuple[Optional[ColumnElement], ColumnElement]:
+    """
+    Traduire une opération JSON Patch en expression SQL sur la colonne JSONB `doc`.
+    Retourne (nouveau document, précondition) ; le nouveau document vaut None pour "test".
+    Si la précondition est fausse, l'opération n'est pas applicable (chemin absent, test échoué).
+    """
+    tokens = parse_pointer(operation.path)
+    needs_value = operation.op in ("add", "replace", "test")
+    if needs_value and "value" not in operation.model_fields_set:
+        raise JsonPatchError(f"'{operation.op}' requires a value")
+    value = literal(operation.value, JSONB) if needs_value else None
+
+    if operation.op == "add":
+        return _add(doc, tokens, value)
+
+    if operation.op == "remove":
+        if not tokens:
+            raise JsonPatchError("Cannot remove the document root")
+        return _remove(doc, tokens), _exists(doc, tokens)
+
+    if operation.op == "replace":
+        if not tokens:
+            return value, true()
+        return func.jsonb_set(doc, _path(tokens), value, False, type_=JSONB), _exists(doc, tokens)
+
+    if operation.op == "test":
+        return None, _get(doc, tokens) == value
+
+    # move / copy
+    if operation.from_ is None:
+        raise JsonPatchError(f"'{operation.op}' requires 'from'")
+    source = parse_pointer(operation.from_)
+    moved = _get(doc, source)
+    if operation.op == "move":
+        if tokens[:len(source)] == source and tokens != source:
+            raise JsonPatchError("Cannot move a value into one of its children")
+        if not source:
+            raise JsonPatchError("Cannot move the document root")
+        new_doc, condition = _add(_remove(doc, source), tokens, moved)
+    else:
+        new_doc, condition = _add(doc, tokens, moved)
+    return new_doc, _exists(doc, source) & condition
@@ -0,0 +1,72 @@
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, literal_column, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
+
+from app.core.config import settings
+from app.crud.base import CURSOR_RANK, decode_cursor, encode_cursor
+
+SEARCH_CONFIGS = ("french", "english")
+
+
+def to_prefix_tsquery(text: str) -> Optional[str]:
+    """
+    Transformer la saisie utilisateur en tsquery préfixe ("affi conc" -> "affi:* & conc:*")
+    pour la recherche au fil de la frappe. Retourne None si aucun mot n'est exploitable.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+class SearchMixin:
+    """
+    Recherche plein texte classée sur la colonne `search_vector` (index GIN) du modèle.
+    À combiner avec AsyncCRUDBase.
+    """
+
+    async def search_page(
+        self,
+        db: AsyncSession,
+        *,
+        query: str,
+        cursor: Optional[str] = None,
+        limit: int = settings.DEFAULT_PAGE_SIZE,
+        filters: Sequence[Any] = (),
+        options: Optional[Sequence[ExecutableOption]] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Page de résultats triée par pertinence (ts_rank_cd) puis id, paginée par curseur (score, id).
+        La requête est racinisée en français et en anglais, le dernier mot sert de préfixe.
+        """
+        ts_text = to_prefix_tsquery(query)
+        if ts_text is None:
+            return [], None
+
+        # Config en littéral regconfig : un paramètre lié serait typé regconfig côté asyncpg
+        tsquery = func.to_tsquery(literal_column(f"'{SEARCH_CONFIGS[0]}'::regconfig"), ts_text)
+        for config in SEARCH_CONFIGS[1:]:
+            tsquery = tsquery.op("||")(func.to_tsquery(literal_column(f"'{config}'::regconfig"), ts_text))
+        rank = func.ts_rank_cd(self.model.search_vector, tsquery)
+
+        limit = max(1, min(limit, settings.MAX_PAGE_SIZE))
+        stmt = (
+            self._list_select(options)
+            .add_columns(rank)
+            .filter(self.model.search_vector.op("@@")(tsquery), *filters)
+        )
+        if cursor:
+            last_rank, last_id = decode_cursor(cursor, CURSOR_RANK)
+            stmt = stmt.filter(tuple_(rank, self.model.id) < tuple_(last_rank, last_id))
+        stmt = stmt.order_by(rank.desc(), self.model.id.desc()).limit(limit + 1)
+
+        rows = (await db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_item, last_rank = rows[-1]
+            next_cursor = encode_cursor(float(last_rank), last_item.id)
+        return [item for item, _ in rows], next_cursor
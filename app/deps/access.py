@@ -0,0 +1,69 @@
+from typing import Dict, Optional, Tuple
+from fastapi import Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_project import permission_at_least, project
+from app.deps.database import get_async_db
+from app.models.models import Project
+from app.services.permissions import get_permission
+from app.services.user_snapshots import UserSnapshot
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Project not found"
+    )
+
+
+class ProjectAccess:
+    """
+    Dépendance de contrôle d'accès aux projets, une instance par requête.
+    Les permissions résolues sont mémorisées pour la requête, en plus du cache à TTL court
+    (voir PERMISSION_CACHE_TTL_SECONDS). Un projet privé inaccessible répond 404 (son existence
+    n'est pas révélée), une permission insuffisante 403.
+    """
+
+    def __init__(self, db: AsyncSession = Depends(get_async_db)):
+        self.db = db
+        self._permissions: Dict[Tuple[int, int], Optional[str]] = {}
+
+    async def permission(self, user_id: int, project_id: int, *, owner_id: Optional[int] = None) -> Optional[str]:
+        """Permission effective (owner, edit, copy, view), None sans accès ; owner_id connu = pas de requête pour le propriétaire"""
+        if owner_id is not None and owner_id == user_id:
+            return "owner"
+        key = (user_id, project_id)
+        if key not in self._permissions:
+            self._permissions[key] = await get_permission(self.db, user_id=user_id, project_id=project_id)
+        return self._permissions[key]
+
+    async def get_readable(
+        self, project_id: int, principal: Optional[UserSnapshot], *, cached: bool = True
+    ) -> Project:
+        """Projet lisible : public, ou accessible à l'utilisateur connecté ; cached=False : relu en base"""
+        db_project = await project.get(self.db, id=project_id, cached=cached)
+        if not db_project:
+            raise _not_found()
+        if db_project.is_public:
+            return db_project
+        if principal is None or await self.permission(principal.id, project_id, owner_id=db_project.owner_id) is None:
+            raise _not_found()
+        return db_project
+
+    async def require(
+        self, project_id: int, principal: UserSnapshot, required: str, *, db_project: Optional[Project] = None
+    ) -> str:
+        """
+        Vérifier que l'utilisateur a au moins la permission `required` et la retourner.
+        Sans `db_project`, la requête de permission suffit aussi à vérifier l'existence du projet.
+        """
+        owner_id = db_project.owner_id if db_project is not None else None
+        permission = await self.permission(principal.id, project_id, owner_id=owner_id)
+        if permission is None and not (db_project is not None and db_project.is_public):
+            raise _not_found()
+        if not permission_at_least(permission, required):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return permission
@@ -1,56 +1,123 @@
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import verify_token
-from app.deps.database import get_db
+from app.deps.database import get_async_db
 from app.crud.crud_users import user
 from app.models.models import User
+from app.services.user_snapshots import UserSnapshot, get_user_snapshot
 
 
 # Configuration du schéma de sécurité Bearer
 security = HTTPBearer()
+# Variante sans erreur automatique : endpoints accessibles avec ou sans token
+optional_security = HTTPBearer(auto_error=False)
 
-def get_current_user(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> tuple[int, int]:
+    """
+    Décoder le token JWT et retourner (id utilisateur, version du token)
+    Les tokens émis avant l'ajout du claim "ver" sont considérés en version 0
+    """
+    payload = verify_token(credentials.credentials)
+    if payload is None:
+        raise _credentials_exception()
+
+    user_id = payload.get("sub")
+    if user_id is None:
+        raise _credentials_exception()
+
+    try:
+        return int(user_id), int(payload.get("ver", 0))
+    except (TypeError, ValueError):
+        raise _credentials_exception()
+
+async def get_current_principal(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> UserSnapshot:
     """
-    Dépendance pour obtenir l'utilisateur actuel depuis le token JWT
+    Dépendance légère : valide le token contre le snapshot d'authentification en cache
+    Pas d'aller-retour en base tant que le snapshot est chaud (voir AUTH_SNAPSHOT_TTL_SECONDS)
     """
-    # Extraire le token
-    token = credentials.credentials
+    user_id, token_version = _decode_credentials(credentials)
 
-    # Vérifier le token
-    payload = verify_token(token)
-    if payload is None:
+    snapshot = await get_user_snapshot(db, user_id)
+    if snapshot is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            detail="User not found"
         )
 
-    # Extraire l'ID utilisateur du payload
-    user_id: int = payload.get("sub")
-    if user_id is None:
+    # Token révoqué (désactivation, révocation explicite)
+    if snapshot.token_version != token_version:
+        raise _credentials_exception()
+
+    return snapshot
+
+async def get_current_active_principal(
+    principal: UserSnapshot = Depends(get_current_principal)
+) -> UserSnapshot:
+    """
+    Dépendance légère pour s'assurer que l'utilisateur est actif
+    À utiliser pour les endpoints qui n'ont besoin que de l'ID de l'utilisateur
+    """
+    if not principal.is_active:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
         )
+    return principal
+
+async def get_optional_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[UserSnapshot]:
+    """
+    Dépendance légère optionnelle : snapshot de l'utilisateur actif, None sans token valide
+    Utile pour les lectures ouvertes aux anonymes mais dont le résultat dépend de l'utilisateur
+    """
+    if not credentials:
+        return None
+
+    try:
+        principal = await get_current_principal(credentials, db)
+    except HTTPException:
+        return None
+    return principal if principal.is_active else None
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    Dépendance pour obtenir l'utilisateur actuel depuis le token JWT
+    """
+    user_id, token_version = _decode_credentials(credentials)
 
     # Récupérer l'utilisateur depuis la base de données
-    db_user = user.get(db, id=user_id)
+    db_user = await user.get(db, id=user_id)
     if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
+    # Token révoqué (désactivation, révocation explicite)
+    if (db_user.token_version or 0) != token_version:
+        raise _credentials_exception()
+
     return db_user
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
     """
@@ -63,9 +130,9 @@ def get_current_active_user(
         )
     return current_user
 
-def get_current_user_optional(
+async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[User]:
     """
     Dépendance optionnelle - utilisateur peut être None
@@ -75,7 +142,6 @@ def get_current_user_optional(
         return None
     
     try:
-        return get_current_user(credentials, db)
+        return await get_current_user(credentials, db)
     except HTTPException:
         return None
-
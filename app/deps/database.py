@@ -1,6 +1,7 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal, SessionLocal
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -13,3 +14,10 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dépendance FastAPI pour obtenir une session asynchrone.
+    Les endpoints async l'utilisent pour ne pas bloquer un thread du threadpool pendant les requêtes SQL.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
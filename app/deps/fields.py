@@ -0,0 +1,47 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Type
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+from app.core.serialization import get_adapter
+
+
+class FieldsParam:
+    """
+    Paramètre de projection `fields=id,title,thumbnail_url` des endpoints de liste.
+    Les champs autorisés sont ceux du schéma complet : canvas_data n'est chargé que s'il est demandé.
+    Retourne None sans projection (schéma résumé par défaut), sinon l'ensemble des champs (id inclus).
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(
+            None, description="Champs à retourner, séparés par des virgules (ex. id,title,canvas_data)"
+        ),
+    ) -> Optional[Set[str]]:
+        if fields is None:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - self.schema.model_fields.keys()
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+        return requested | {"id"}
+
+
+def project_items(schema: Type[BaseModel], items: Iterable[Any], fields: Set[str]) -> List[Dict[str, Any]]:
+    """Sérialiser uniquement les champs demandés, sans toucher aux attributs non chargés"""
+    names = [name for name in schema.model_fields if name in fields]
+    adapters = [(name, get_adapter(schema.model_fields[name].annotation)) for name in names]
+    return [
+        {
+            name: adapter.dump_python(adapter.validate_python(getattr(item, name), from_attributes=True), mode="json")
+            for name, adapter in adapters
+        }
+        for item in items
+    ]
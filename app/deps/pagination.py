@@ -0,0 +1,28 @@
+from typing import Optional
+from fastapi import HTTPException, Query, status
+
+from app.core.config import settings
+from app.crud.base import decode_cursor
+
+
+class PageParams:
+    """
+    Dépendance de pagination par curseur pour les endpoints de liste.
+    La taille de page est bornée côté serveur par MAX_PAGE_SIZE.
+    """
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Curseur opaque renvoyé par la page précédente"),
+        limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    ):
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+        self.cursor = cursor
+        self.limit = limit
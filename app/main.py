@@ -1,12 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
+from app.core.database import get_pool_stats
+from app.core.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, generate_latest, snapshot_writer
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.serialization import JSON_RESPONSE_CLASS
+from app.crud.base import InvalidCursor
+from app.services.autosave import autosave_buffer
+from app.services.cache import get_cache_stats
+from app.services.password_hashing import password_hasher
+from app.services.storage import LocalStorageFiles
+from app.services.thumbnails import thumbnail_renderer
 from app.api.v1.api import api_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    autosave_buffer.start()
+    snapshot_writer.start()
+    yield
+    # Arrêt normal : écrire les autosaves en attente avant de fermer
+    await autosave_buffer.stop()
+    await thumbnail_renderer.stop()
+    password_hasher.shutdown()
+    await snapshot_writer.stop()
+
 app = FastAPI(
     title="StopPubMaker API",
     description="API pour l'application StopPubMaker",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=JSON_RESPONSE_CLASS,
 )
 
 # CORS
@@ -18,9 +44,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Requêtes SQL par requête HTTP (Server-Timing, N+1, mode strict)
+if settings.SQL_INSTRUMENTATION:
+    app.add_middleware(QueryStatsMiddleware)
+
+# Métriques HTTP : ajouté en dernier, le middleware englobe toute la chaîne (CORS compris)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Curseur d'une autre liste (p. ex. curseur de recherche sur une liste triée par date) : 400, pas 500
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSON_RESPONSE_CLASS(status_code=400, content={"detail": "Invalid cursor"})
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
+# Fichiers stockés (miniatures, assets uploadés) servis par l'application avec le stockage local
+if settings.STORAGE_BACKEND == "local":
+    os.makedirs(settings.LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(settings.LOCAL_STORAGE_URL, LocalStorageFiles(directory=settings.LOCAL_STORAGE_DIR), name="storage")
+
 @app.get("/")
 async def root():
     return {"message": "StopPubMaker API is runnig!", "status": "ok"}
@@ -29,6 +73,51 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/pool", include_in_schema=False)
+async def pool_stats():
+    """
+    Statistiques internes des pools de connexions (dimensionnement)
+    """
+    return get_pool_stats()
+
+@app.get("/health/cache", include_in_schema=False)
+async def cache_stats():
+    """
+    Compteurs internes des caches d'entités (hits, misses, évictions)
+    """
+    return get_cache_stats()
+
+@app.get("/health/hashing", include_in_schema=False)
+async def hashing_stats():
+    """
+    État du pool de hachage des mots de passe (file d'attente, rejets)
+    """
+    return password_hasher.stats()
+
+@app.get("/health/autosave", include_in_schema=False)
+async def autosave_stats():
+    """
+    État du tampon d'autosave (en attente, flushs, échecs)
+    """
+    return autosave_buffer.stats()
+
+@app.get("/health/thumbnails", include_in_schema=False)
+async def thumbnail_stats():
+    """
+    État du rendu des miniatures (en attente, rendues, réutilisées, échecs)
+    """
+    return thumbnail_renderer.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Métriques au format texte Prometheus (tous les workers avec METRICS_MULTIPROC_DIR)
+    """
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    body = await asyncio.to_thread(generate_latest, REGISTRY.snapshot())
+    return Response(content=body, media_type=CONTENT_TYPE)
+
 
 if __name__ == "__main__":
     import uvicorn
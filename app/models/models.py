@@ -1,12 +1,28 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Float
-from sqlalchemy.orm import relationship, DeclarativeBase
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Float, Computed, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, synonym, deferred, DeclarativeBase
 from datetime import datetime
+from app.models.types import CompressedJSON
 
 class Base(DeclarativeBase):
     pass
 
+# Vecteur de recherche plein texte (titre pondéré A, description B), racinisé en français et en anglais.
+# Colonne générée par Postgres et indexée en GIN (voir la migration add_search_vectors).
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('french', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('french', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_google_id", "google_id", unique=True, postgresql_where=text("google_id IS NOT NULL")),
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_active_created_at_id", "created_at", "id", postgresql_where=text("is_active")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -16,6 +32,7 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     google_id = Column(String, nullable=True) # OAuth Google
     avatar_url = Column(String, nullable=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0") # Incrémenté pour révoquer les tokens
     created_at = Column(DateTime, default=datetime.now)
     
     projects = relationship("Project", back_populates="owner")
@@ -37,25 +54,40 @@ class Category(Base):
 
 class Template(Base):
     __tablename__ = "templates"
+    __table_args__ = (
+        Index("ix_templates_created_at_id", "created_at", "id"),
+        Index("ix_templates_category_id_created_at_id", "category_id", "created_at", "id"),
+        Index("ix_templates_active_created_at_id", "created_at", "id", postgresql_where=text("is_active")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    canvas_data = Column(JSON, nullable=False)
+    # bytea compressé (voir app/models/types.py), décodé à chaque chargement : différé par défaut,
+    # seules les lectures qui servent le document le chargent (undefer, voir crud_template)
+    canvas_data = deferred(Column(CompressedJSON, nullable=False))
     thumbnail_url = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.now)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
 
     category_id = Column(Integer, ForeignKey("categories.id"))
-    category = relationship("Category", back_populates="templates")
+    category = relationship("Category", back_populates="templates", lazy="raise_on_sql")
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        Index("ix_projects_owner_id_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_projects_public_created_at_id", "created_at", "id", postgresql_where=text("is_public")),
+        Index("ix_projects_format_type_created_at_id", "format_type", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
-    canvas_data = Column(JSON, nullable=False)
+    canvas_data = Column(JSONB, nullable=False)  # JSONB : patchs appliqués en base (jsonb_set, #-)
+    canvas_version = Column(Integer, nullable=False, default=1, server_default="1")
     thumbnail_url = Column(String, nullable=True)
     is_public = Column(Boolean, default=False)
     format_type = Column(String, default="A4")  # A4, A5, custom
@@ -63,13 +95,25 @@ class Project(Base):
     height = Column(Float, nullable=True)       # Pour formats custom
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
     
     owner_id = Column(Integer, ForeignKey("users.id"))
-    owner = relationship("User", back_populates="projects")
+    # raise_on_sql : chargé explicitement par les options du CRUD (pas de N+1 ni de lazy load en async)
+    owner = relationship("User", back_populates="projects", lazy="raise_on_sql")
     shared_projects = relationship("SharedProject", back_populates="project")
 
 class UserAsset(Base):
     __tablename__ = "user_assets"
+    __table_args__ = (
+        Index("ix_user_assets_created_at_id", "created_at", "id"),
+        Index("ix_user_assets_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_user_assets_user_id_file_type_created_at_id", "user_id", "file_type", "created_at", "id"),
+        Index("ix_user_assets_file_type_created_at_id", "file_type", "created_at", "id"),
+        Index(
+            "uq_user_assets_user_id_content_hash", "user_id", "content_hash",
+            unique=True, postgresql_where=text("content_hash IS NOT NULL"),
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
@@ -77,13 +121,29 @@ class UserAsset(Base):
     cloudinary_url = Column(String, nullable=False)
     file_type = Column(String, nullable=False)  # image, icon, etc.
     file_size = Column(Integer, nullable=False)  # en bytes
+    content_hash = Column(String(64), nullable=True)  # SHA-256 des assets uploadés (déduplication par utilisateur)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user_id = Column(Integer, ForeignKey("users.id"))
     user = relationship("User", back_populates="user_assets")
 
+# Compteurs d'usage du stockage par utilisateur et type de fichier, tenus à jour dans la transaction
+# de chaque création/suppression d'asset (crud_user_asset) ; réconciliés par reconcile_storage_usage.py
+class UserStorageUsage(Base):
+    __tablename__ = "user_storage_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    file_type = Column(String, primary_key=True)
+    total_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    asset_count = Column(Integer, nullable=False, default=0, server_default="0")
+
 class SharedProject(Base):
     __tablename__ = "shared_projects"
+    __table_args__ = (
+        Index("uq_shared_projects_user_project", "shared_with_user_id", "project_id", unique=True),
+        Index("ix_shared_projects_user_shared_at_id", "shared_with_user_id", "shared_at", "id"),
+        Index("ix_shared_projects_project_shared_at_id", "project_id", "shared_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     permission = Column(String, default="view")  # view, edit, copy
@@ -91,6 +151,7 @@ class SharedProject(Base):
     
     project_id = Column(Integer, ForeignKey("projects.id"))
     shared_with_user_id = Column(Integer, ForeignKey("users.id"))
+    shared_with_id = synonym("shared_with_user_id")  # nom utilisé par les schémas
     
-    project = relationship("Project", back_populates="shared_projects")
-    shared_with = relationship("User", back_populates="shared_projects")
\ No newline at end of file
+    project = relationship("Project", back_populates="shared_projects", lazy="raise_on_sql")
+    shared_with = relationship("User", back_populates="shared_projects", lazy="raise_on_sql")
\ No newline at end of file
@@ -0,0 +1,82 @@
+import json
+import zlib
+from typing import Any, Optional
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # dépendance optionnelle (extra "zstd")
+    zstandard = None
+
+# En-tête : magic (2 octets) + version du format + codec
+MAGIC = b"CJ"
+FORMAT_VERSION = 1
+CODECS = {"none": 0, "deflate": 1, "zstd": 2}
+_CODEC_NAMES = {value: name for name, value in CODECS.items()}
+
+
+def encode_json(value: Any, codec: Optional[str] = None, level: Optional[int] = None) -> bytes:
+    """Sérialiser en JSON compact puis compresser, précédé de l'en-tête de format"""
+    codec = codec or settings.CANVAS_COMPRESSION
+    level = settings.CANVAS_COMPRESSION_LEVEL if level is None else level
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    if codec == "deflate":
+        payload = zlib.compress(raw, 6 if level is None else level)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("CANVAS_COMPRESSION=zstd requires the 'zstandard' package")
+        payload = zstandard.ZstdCompressor(level=3 if level is None else level).compress(raw)
+    elif codec == "none":
+        payload = raw
+    else:
+        raise ValueError(f"Unknown canvas codec: {codec!r}")
+    return MAGIC + bytes((FORMAT_VERSION, CODECS[codec])) + payload
+
+
+def decode_json(data: bytes) -> Any:
+    """Décoder une valeur écrite par encode_json, quel que soit le codec utilisé à l'écriture"""
+    data = bytes(data)
+    if data[:2] != MAGIC:
+        # Valeur JSON brute (écrite avant la compression)
+        return json.loads(data)
+    version, codec = data[2], data[3]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported canvas format version: {version}")
+    payload = data[4:]
+    name = _CODEC_NAMES.get(codec)
+    if name == "deflate":
+        payload = zlib.decompress(payload)
+    elif name == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd-compressed canvas requires the 'zstandard' package")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif name != "none":
+        raise ValueError(f"Unknown canvas codec id: {codec}")
+    return json.loads(payload)
+
+
+class CompressedJSON(TypeDecorator):
+    """
+    Document JSON stocké compressé (bytea) avec un en-tête de format.
+    Le codec d'écriture suit CANVAS_COMPRESSION ; la lecture détecte le codec depuis l'en-tête,
+    une colonne peut donc mélanger des valeurs écrites avec des réglages différents.
+    Le décodage a lieu au chargement de la colonne, sans valeur paresseuse (les schémas attendent
+    un dict) : la colonne doit être différée (deferred) et chargée par les seules requêtes qui
+    servent le document.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return encode_json(value)
+
+    def process_result_value(self, value: Optional[bytes], dialect) -> Any:
+        if value is None:
+            return None
+        return decode_json(value)
@@ -1,6 +1,33 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Generic, TypeVar
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# === PAGINATION ===
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = Field(None, description="Curseur de la page suivante (null sur la dernière page)")
+
+# === BULK ===
+class BulkCreate(BaseModel, Generic[T]):
+    items: List[T] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+class BulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=settings.BULK_MAX_ITEMS)
+
+class BulkItemError(BaseModel):
+    index: int = Field(..., description="Position de l'élément dans la requête")
+    detail: str
+
+class BulkCreateResult(BaseModel, Generic[T]):
+    created: List[T]
+    errors: List[BulkItemError] = []
+
+class BulkDeleteResult(BaseModel):
+    deleted: List[int]
+    errors: List[BulkItemError] = []
 
 # === USER SCHEMAS ===
 class UserBase(BaseModel):
@@ -76,6 +103,19 @@ class TemplateResponse(TemplateBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Template sans canvas_data : listes, galeries
+class TemplateSummary(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    thumbnail_url: str
+    category_id: int
+    is_active: bool
+    created_at: datetime
+    category: CategoryResponse
+
+    model_config = ConfigDict(from_attributes=True)
+
 # === PROJECT SCHEMAS ===
 class ProjectBase(BaseModel): 
     title: str = Field(..., min_length=1, max_length=100) 
@@ -103,12 +143,65 @@ class ProjectResponse(ProjectBase):
     id: int 
     owner_id: int 
     thumbnail_url: Optional[str] = None 
+    canvas_version: int
     created_at: datetime 
     updated_at: datetime 
     owner: UserResponse
 
     model_config = ConfigDict(from_attributes=True)
 
+# Projet sans canvas_data : listes, galeries, projets partagés
+class ProjectSummary(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    is_public: bool
+    format_type: str
+    width: Optional[float] = None
+    height: Optional[float] = None
+    thumbnail_url: Optional[str] = None
+    canvas_version: int
+    owner_id: int
+    created_at: datetime
+    updated_at: datetime
+    owner: UserResponse
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Projet accessible à l'utilisateur connecté (propriétaire ou partage) et sa permission effective
+class AccessibleProject(BaseModel):
+    project: ProjectSummary
+    permission: str = Field(..., description="owner, edit, copy ou view")
+
+# === CANVAS PATCH SCHEMAS ===
+class JsonPatchOperation(BaseModel):
+    op: str = Field(..., pattern=r'^(add|remove|replace|move|copy|test)$')
+    path: str = Field(..., description="JSON Pointer (RFC 6901)")
+    value: Any = None
+    from_: Optional[str] = Field(None, alias="from", description="JSON Pointer source (move, copy)")
+
+class CanvasPatch(BaseModel):
+    version: int = Field(..., ge=1, description="Version du canvas sur laquelle le patch a été calculé")
+    operations: List[JsonPatchOperation] = Field(..., min_length=1, max_length=500, description="Opérations RFC 6902")
+
+class CanvasVersion(BaseModel):
+    version: int
+
+# === AUTOSAVE SCHEMAS ===
+class AutosaveRequest(BaseModel):
+    canvas_data: Dict[str, Any]
+
+class AutosaveStatus(BaseModel):
+    project_id: int
+    state: str = Field(..., description="idle, pending, flushing, saved ou failed")
+    pending_since: Optional[datetime] = None
+    saves_coalesced: int = Field(0, description="Sauvegardes remplacées depuis le dernier flush")
+    last_flushed_at: Optional[datetime] = None
+    version: Optional[int] = Field(None, description="Version du canvas après le dernier flush")
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 # === USER ASSET SCHEMAS ===
 class UserAssetBase(BaseModel): 
     filename: str 
@@ -123,10 +216,21 @@ class UserAssetCreate(UserAssetBase):
 class UserAssetResponse(UserAssetBase): 
     id: int 
     user_id: int
+    content_hash: Optional[str] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
+class FileTypeUsage(BaseModel):
+    total_bytes: int
+    asset_count: int
+
+class StorageUsage(BaseModel):
+    total_bytes: int
+    asset_count: int
+    quota_bytes: Optional[int] = Field(None, description="null = illimité")
+    by_type: Dict[str, FileTypeUsage]
+
 # === SHARED PROJECT SCHEMAS ===
 class SharedProjectBase(BaseModel): 
     permission: str = Field(default="view", pattern=r'^(view|edit|copy)$')
@@ -140,7 +244,7 @@ class SharedProjectResponse(SharedProjectBase):
     project_id: int 
     shared_with_id: int 
     shared_at: datetime 
-    project: ProjectResponse 
+    project: ProjectSummary 
     shared_with: UserResponse
 
     model_config = ConfigDict(from_attributes=True)
@@ -171,4 +275,48 @@ class PasswordResetConfirm(BaseModel):
     new_password: str = Field(..., min_length=6, description="New password")
 
 class RefreshTokenRequest(BaseModel):
-    refresh_token: str = Field(..., description="Refresh token")
\ No newline at end of file
+    refresh_token: str = Field(..., description="Refresh token")
+
+# === DASHBOARD ===
+# Page d'accueil de l'éditeur en une requête ; next_cursor reprend sur l'endpoint de liste correspondant
+class Dashboard(BaseModel):
+    user: UserResponse
+    projects: Page[ProjectSummary]
+    shared_projects: Page[SharedProjectResponse]
+    assets: Page[UserAssetResponse]
+    categories: Page[CategoryResponse]
+
+# === EXPORT / IMPORT ===
+# Enregistrements des exports (NDJSON, zip) : colonnes du modèle sans relations.
+# À l'import, id et propriétaire sont réattribués ; les dates absentes valent la date d'import.
+class ProjectExport(ProjectBase):
+    id: Optional[int] = None
+    owner_id: Optional[int] = None
+    thumbnail_url: Optional[str] = None
+    canvas_version: int = 1
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TemplateExport(TemplateBase):
+    id: Optional[int] = None
+    category_id: int
+    is_active: bool = True
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class UserAssetExport(UserAssetBase):
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    content_hash: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ImportResult(BaseModel):
+    imported: Dict[str, int]
+    skipped: Dict[str, int] = Field(default_factory=dict, description="Doublons et types non importables")
+    errors: List[BulkItemError] = Field(default_factory=list, description="index = numéro de ligne (100 premières erreurs)")
+    error_count: int = 0
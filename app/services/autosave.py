@@ -0,0 +1,193 @@
+"""
+Autosave write-behind des canvas de projets.
+
+L'éditeur envoie le canvas complet plusieurs fois par seconde pendant un glisser-déposer.
+Chaque sauvegarde remplace la précédente dans un tampon en mémoire (une entrée par projet),
+et une tâche de fond écrit le dernier état toutes les AUTOSAVE_FLUSH_INTERVAL_SECONDS :
+le volume d'écriture dépend du nombre d'éditeurs actifs, pas du nombre de frappes.
+
+Durabilité :
+- une sauvegarde acceptée (202) n'est PAS durable tant que son état n'est pas "saved" ;
+- en cas d'arrêt normal (lifespan), le tampon est vidé avant la fermeture du processus ;
+- en cas de crash (kill -9, OOM), les sauvegardes reçues depuis le dernier flush sont perdues :
+  au plus AUTOSAVE_FLUSH_INTERVAL_SECONDS d'édition par projet. Le canvas en base reste
+  celui du dernier flush réussi (jamais un état partiel : chaque flush est une transaction) ;
+- une sauvegarde explicite (POST .../autosave/flush) n'est acquittée qu'après le commit ;
+- le tampon est propre à chaque worker : avec plusieurs workers, un même projet doit être
+  routé vers le même worker (affinité de session), sinon l'ordre des écritures n'est pas garanti ;
+- les écritures sont last-writer-wins, comme PUT sans If-Match ; un PUT qui remplace le canvas
+  ou un PATCH du canvas abandonne l'autosave en attente du projet, qui ne peut donc pas
+  l'écraser au flush suivant.
+Voir benchmarks/autosave_crash.py pour le scénario de reprise après crash.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.crud_project import project
+from app.services.thumbnails import thumbnail_renderer
+
+logger = logging.getLogger(__name__)
+
+# Statuts conservés après écriture, pour que le client puisse les consulter
+STATUS_RETENTION = timedelta(minutes=10)
+
+
+@dataclass
+class AutosaveState:
+    project_id: int
+    canvas_data: Optional[Dict[str, Any]] = None
+    pending_since: Optional[datetime] = None
+    saves_coalesced: int = 0
+    flushing: bool = False
+    last_flushed_at: Optional[datetime] = None
+    version: Optional[int] = None
+    error: Optional[str] = None
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def state(self) -> str:
+        if self.flushing:
+            return "flushing"
+        if self.error:
+            return "failed"
+        if self.canvas_data is not None:
+            return "pending"
+        return "saved" if self.last_flushed_at else "idle"
+
+
+class AutosaveBuffer:
+    """Tampon des derniers canvas par projet, écrit en base par une tâche de fond"""
+
+    def __init__(self, *, interval: float, max_pending: int, session_factory=AsyncSessionLocal):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._states: Dict[int, AutosaveState] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def _pending_count(self) -> int:
+        return sum(1 for state in self._states.values() if state.canvas_data is not None)
+
+    async def save(self, project_id: int, canvas_data: Dict[str, Any]) -> AutosaveState:
+        """Remplacer le canvas en attente du projet ; écrit immédiatement si le tampon est plein"""
+        self.received += 1
+        state = self._states.setdefault(project_id, AutosaveState(project_id))
+        # L'échec d'un flush précédent ne concerne plus le canvas en attente, qui est remplacé
+        state.error = None
+        if state.canvas_data is None:
+            state.pending_since = datetime.now()
+            state.saves_coalesced = 0
+            if self._pending_count() >= self.max_pending:
+                state.canvas_data = canvas_data
+                await self.flush_project(project_id)
+                return state
+        else:
+            state.saves_coalesced += 1
+        state.canvas_data = canvas_data
+        return state
+
+    async def discard(self, project_id: int) -> None:
+        """
+        Abandonner le canvas en attente du projet, remplacé par une écriture directe (PUT, PATCH).
+        Attend la fin d'un flush en cours : il ne peut pas écraser l'écriture qui suit.
+        """
+        state = self._states.get(project_id)
+        if state is None:
+            return
+        async with state.lock:
+            state.canvas_data = None
+            state.pending_since = None
+            state.error = None
+
+    def status(self, project_id: int) -> Optional[AutosaveState]:
+        return self._states.get(project_id)
+
+    async def flush_project(self, project_id: int) -> Optional[AutosaveState]:
+        """Écrire le dernier canvas en attente du projet (no-op s'il n'y en a pas)"""
+        state = self._states.get(project_id)
+        if state is None:
+            return None
+        async with state.lock:
+            canvas_data = state.canvas_data
+            if canvas_data is None:
+                return state
+            state.flushing = True
+            try:
+                async with self.session_factory() as db:
+                    version = await project.write_canvas(db, id=project_id, canvas_data=canvas_data)
+            except Exception as exc:
+                self.failures += 1
+                state.error = str(exc) or exc.__class__.__name__
+                logger.exception("Autosave flush failed for project %s", project_id)
+                return state
+            finally:
+                state.flushing = False
+
+            self.flushes += 1
+            # Une sauvegarde arrivée pendant l'écriture reste en attente pour le prochain flush
+            if state.canvas_data is canvas_data:
+                state.canvas_data = None
+                state.pending_since = None
+            state.error = None if version is not None else "Project not found"
+            if version is not None:
+                thumbnail_renderer.schedule(project_id)
+            state.version = version
+            state.last_flushed_at = datetime.now()
+            return state
+
+    async def flush_all(self) -> None:
+        for project_id in [pid for pid, state in self._states.items() if state.canvas_data is not None]:
+            await self.flush_project(project_id)
+
+    def _prune(self) -> None:
+        limit = datetime.now() - STATUS_RETENTION
+        for project_id, state in list(self._states.items()):
+            if state.canvas_data is None and not state.flushing and (state.last_flushed_at or limit) <= limit:
+                del self._states[project_id]
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush_all()
+                self._prune()
+            except Exception:
+                logger.exception("Autosave flush loop error")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Arrêter la tâche de fond et écrire tout ce qui est en attente (arrêt normal)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval,
+            "pending": self._pending_count(),
+            "tracked_projects": len(self._states),
+            "saves_received": self.received,
+            "flushes": self.flushes,
+            "failures": self.failures,
+        }
+
+
+autosave_buffer = AutosaveBuffer(
+    interval=settings.AUTOSAVE_FLUSH_INTERVAL_SECONDS, max_pending=settings.AUTOSAVE_MAX_PENDING
+)
@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Protocol
+
+from app.core.metrics import REGISTRY, Counter, Gauge
+
+
+class CacheBackend(Protocol):
+    """
+    Interface d'un cache clé/valeur utilisé par le CRUD.
+    L'implémentation en mémoire ci-dessous peut être remplacée par un backend partagé (Redis...).
+    """
+
+    name: str
+
+    def get(self, key: Hashable) -> Optional[Any]: ...
+
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    def delete(self, key: Hashable) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class LRUTTLCache:
+    """Cache en mémoire du processus, éviction LRU et expiration par TTL"""
+
+    def __init__(self, name: str, *, max_entries: int = 1000, ttl: float = 30.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        register_cache(self)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+_caches: Dict[str, CacheBackend] = {}
+
+
+def register_cache(cache: CacheBackend) -> None:
+    """Enregistrer un cache pour publier ses compteurs"""
+    _caches[cache.name] = cache
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Compteurs de tous les caches enregistrés (par processus)"""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+cache_hits = Counter("cache_hits_total", "Lectures servies par le cache", ("cache",))
+cache_misses = Counter("cache_misses_total", "Lectures absentes du cache (ou expirées)", ("cache",))
+cache_evictions = Counter("cache_evictions_total", "Entrées évincées (LRU)", ("cache",))
+cache_entries = Gauge("cache_entries", "Entrées en cache", ("cache",))
+
+
+def _collect_cache_metrics() -> None:
+    """Taux de succès d'un cache : rate(cache_hits_total) / (rate(cache_hits_total) + rate(cache_misses_total))"""
+    for name, stats in get_cache_stats().items():
+        cache_hits.set_total((name,), stats["hits"])
+        cache_misses.set_total((name,), stats["misses"])
+        cache_evictions.set_total((name,), stats["evictions"])
+        cache_entries.set((name,), stats["entries"])
+
+
+REGISTRY.register_collector(_collect_cache_metrics)
@@ -0,0 +1,200 @@
+"""
+Rendu d'un canvas (JSON Fabric.js) en miniature PNG.
+
+Module sans dépendance à l'application (ni configuration, ni base) : il est importé par les
+processus du pool de rendu. Le rendu est volontairement approximatif — formes, chemins et
+textes avec leurs transformations ; les images distantes sont remplacées par un aplat
+(aucun accès réseau dans les workers).
+"""
+import io
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from PIL import Image, ImageColor, ImageDraw, ImageFont
+except ImportError:  # dépendance optionnelle (extra "thumbnails")
+    Image = None
+
+# Incrémenter quand le rendu change : les miniatures existantes seront régénérées
+RENDERER_VERSION = 1
+
+# Taille des pages en unités du canvas (pixels à 300 dpi)
+FORMAT_SIZES = {"A4": (2480.0, 3508.0), "A5": (1748.0, 2480.0)}
+
+_ORIGINS = {"left": 0.0, "top": 0.0, "center": 0.5, "right": 1.0, "bottom": 1.0}
+_RGBA_RE = re.compile(r"^rgba?\(\s*([\d.]+)\s*,\s*([\d.]+)\s*,\s*([\d.]+)\s*(?:,\s*([\d.]+)\s*)?\)$")
+_PLACEHOLDER = "#d0d4da"
+
+Matrix = Tuple[float, float, float, float, float, float]
+Point = Tuple[float, float]
+
+
+def page_size(format_type: Optional[str], width: Optional[float], height: Optional[float]) -> Tuple[float, float]:
+    """Taille de la page : A4/A5, ou width/height pour un format custom (A4 à défaut)"""
+    if format_type == "custom" and width and height and width > 0 and height > 0:
+        return float(width), float(height)
+    return FORMAT_SIZES.get(format_type or "A4", FORMAT_SIZES["A4"])
+
+
+def _multiply(a: Matrix, b: Matrix) -> Matrix:
+    return (
+        a[0] * b[0] + a[2] * b[1], a[1] * b[0] + a[3] * b[1],
+        a[0] * b[2] + a[2] * b[3], a[1] * b[2] + a[3] * b[3],
+        a[0] * b[4] + a[2] * b[5] + a[4], a[1] * b[4] + a[3] * b[5] + a[5],
+    )
+
+
+def _apply(m: Matrix, points: Iterable[Point]) -> List[Point]:
+    return [(m[0] * x + m[2] * y + m[4], m[1] * x + m[3] * y + m[5]) for x, y in points]
+
+
+def _number(obj: Dict[str, Any], key: str, default: float = 0.0) -> float:
+    value = obj.get(key, default)
+    return float(value) if isinstance(value, (int, float)) else default
+
+
+def _color(value: Any, opacity: float) -> Optional[Tuple[int, int, int, int]]:
+    """Couleur CSS (hex, nom, rgb/rgba) ou dégradé Fabric (premier arrêt) en RGBA ; None si transparent"""
+    if isinstance(value, dict):
+        stops = value.get("colorStops") or []
+        value = stops[0].get("color") if stops and isinstance(stops[0], dict) else None
+    if not isinstance(value, str) or not value or value == "transparent":
+        return None
+    match = _RGBA_RE.match(value.strip())
+    try:
+        if match:
+            r, g, b = (int(float(c)) for c in match.groups()[:3])
+            alpha = float(match.group(4)) if match.group(4) is not None else 1.0
+        else:
+            r, g, b = ImageColor.getrgb(value)[:3]
+            alpha = 1.0
+    except ValueError:
+        return None
+    a = int(255 * max(0.0, min(1.0, alpha * opacity)))
+    return (r, g, b, a) if a else None
+
+
+def _ellipse(rx: float, ry: float, steps: int = 32) -> List[Point]:
+    return [(rx + rx * math.cos(2 * math.pi * i / steps), ry + ry * math.sin(2 * math.pi * i / steps)) for i in range(steps)]
+
+
+def _path_points(path: Any) -> List[Point]:
+    """Points d'extrémité d'un chemin (liste Fabric ou chaîne SVG absolue) ; les courbes sont approchées par leurs extrémités"""
+    if isinstance(path, str):
+        tokens = re.findall(r"[A-Za-z]|-?\d*\.?\d+(?:e-?\d+)?", path)
+        commands: List[List[Any]] = []
+        for token in tokens:
+            if token.isalpha():
+                commands.append([token])
+            elif commands:
+                commands[-1].append(float(token))
+        path = commands
+    points: List[Point] = []
+    x = y = 0.0
+    for command in path if isinstance(path, list) else []:
+        if not command or not isinstance(command, list):
+            continue
+        op, args = str(command[0]).upper(), [a for a in command[1:] if isinstance(a, (int, float))]
+        if op == "H" and args:
+            x = float(args[-1])
+        elif op == "V" and args:
+            y = float(args[-1])
+        elif op != "Z" and len(args) >= 2:
+            x, y = float(args[-2]), float(args[-1])
+        else:
+            continue
+        points.append((x, y))
+    return points
+
+
+def _local_shape(obj: Dict[str, Any]) -> Tuple[float, float, List[Point]]:
+    """Largeur, hauteur et contour de l'objet dans son repère local [0, w] x [0, h]"""
+    kind = obj.get("type")
+    width, height = _number(obj, "width"), _number(obj, "height")
+    if kind == "circle":
+        r = _number(obj, "radius")
+        return 2 * r, 2 * r, _ellipse(r, r)
+    if kind == "ellipse":
+        rx, ry = _number(obj, "rx"), _number(obj, "ry")
+        return 2 * rx, 2 * ry, _ellipse(rx, ry)
+    if kind == "triangle":
+        return width, height, [(width / 2, 0), (width, height), (0, height)]
+    if kind in ("polygon", "polyline", "path", "line"):
+        if kind == "path":
+            raw = _path_points(obj.get("path"))
+        elif kind == "line":
+            raw = [(_number(obj, "x1"), _number(obj, "y1")), (_number(obj, "x2"), _number(obj, "y2"))]
+        else:
+            raw = [(_number(p, "x"), _number(p, "y")) for p in obj.get("points") or [] if isinstance(p, dict)]
+        if not raw:
+            return width, height, []
+        min_x, min_y = min(p[0] for p in raw), min(p[1] for p in raw)
+        points = [(px - min_x, py - min_y) for px, py in raw]
+        return (width or max(p[0] for p in points)), (height or max(p[1] for p in points)), points
+    return width, height, [(0, 0), (width, 0), (width, height), (0, height)]
+
+
+def _object_matrix(obj: Dict[str, Any], parent: Matrix, width: float, height: float) -> Matrix:
+    """parent · T(left, top) · R(angle) · S(scaleX, scaleY) · T(-origine)"""
+    angle = math.radians(_number(obj, "angle"))
+    cos, sin = math.cos(angle), math.sin(angle)
+    sx = _number(obj, "scaleX", 1.0) * (-1 if obj.get("flipX") else 1)
+    sy = _number(obj, "scaleY", 1.0) * (-1 if obj.get("flipY") else 1)
+    ox = _ORIGINS.get(obj.get("originX", "left"), 0.0) * width
+    oy = _ORIGINS.get(obj.get("originY", "top"), 0.0) * height
+    local = (cos * sx, sin * sx, -sin * sy, cos * sy, 0.0, 0.0)
+    local = _multiply(local, (1.0, 0.0, 0.0, 1.0, -ox, -oy))
+    placed = (local[0], local[1], local[2], local[3], local[4] + _number(obj, "left"), local[5] + _number(obj, "top"))
+    return _multiply(parent, placed)
+
+
+def _draw_objects(draw: "ImageDraw.ImageDraw", objects: Sequence[Any], parent: Matrix, opacity: float) -> None:
+    for obj in objects:
+        if not isinstance(obj, dict) or obj.get("visible") is False:
+            continue
+        kind = obj.get("type")
+        alpha = opacity * _number(obj, "opacity", 1.0)
+        width, height, outline = _local_shape(obj)
+        matrix = _object_matrix(obj, parent, width, height)
+        scale = math.sqrt(abs(matrix[0] * matrix[3] - matrix[1] * matrix[2]))
+
+        if kind == "group":
+            # Les enfants d'un groupe sont positionnés par rapport à son centre
+            centre = _multiply(matrix, (1.0, 0.0, 0.0, 1.0, width / 2, height / 2))
+            _draw_objects(draw, obj.get("objects") or [], centre, alpha)
+        elif kind in ("text", "i-text", "textbox"):
+            fill = _color(obj.get("fill", "#000000"), alpha)
+            size = max(1, int(_number(obj, "fontSize", 40) * scale))
+            if fill and size >= 2:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:  # Pillow < 10.1 : police bitmap de taille fixe
+                    font = ImageFont.load_default()
+                draw.multiline_text(_apply(matrix, [(0, 0)])[0], str(obj.get("text", "")), fill=fill, font=font)
+        elif outline:
+            points = _apply(matrix, outline)
+            fill = _PLACEHOLDER if kind == "image" else obj.get("fill")
+            stroke = _color(obj.get("stroke"), alpha)
+            stroke_width = max(1, int(_number(obj, "strokeWidth", 1) * scale)) if stroke else 0
+            if kind in ("line", "polyline"):
+                draw.line(points, fill=stroke or _color(fill, alpha), width=stroke_width or 1)
+            else:
+                draw.polygon(points, fill=_color(fill, alpha), outline=stroke, width=stroke_width)
+
+
+def render_thumbnail(canvas_data: Dict[str, Any], page_width: float, page_height: float, max_size: int) -> bytes:
+    """Rendre le canvas en PNG dont le plus grand côté mesure `max_size` pixels"""
+    if Image is None:
+        raise RuntimeError("Thumbnail rendering requires the 'Pillow' package")
+    k = max_size / max(page_width, page_height)
+    size = (max(1, round(page_width * k)), max(1, round(page_height * k)))
+    background = _color(canvas_data.get("background"), 1.0) or (255, 255, 255, 255)
+    # Base RGB : ImageDraw ne mélange les couleurs RGBA (opacité) que sur une image RGB
+    image = Image.new("RGB", size, background[:3])
+    draw = ImageDraw.Draw(image, "RGBA")
+    _draw_objects(draw, canvas_data.get("objects") or [], (k, 0.0, 0.0, k, 0.0, 0.0), 1.0)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
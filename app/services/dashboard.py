@@ -0,0 +1,59 @@
+"""
+Tableau de bord de la page d'accueil de l'éditeur en un seul aller-retour.
+
+Les sections sont indépendantes : chacune est lue dans sa propre session (une AsyncSession
+n'accepte pas de requêtes concurrentes) et toutes en parallèle, au plus
+DASHBOARD_MAX_CONCURRENCY connexions à la fois pour une requête. Une section en erreur annule
+les autres (TaskGroup).
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.crud_category import category
+from app.crud.crud_project import project
+from app.crud.crud_shared_project import shared_project
+from app.crud.crud_user_asset import user_asset
+from app.crud.crud_users import user
+
+Loader = Callable[[AsyncSession], Awaitable[Any]]
+
+
+def _page(result: Any) -> Dict[str, Any]:
+    items, next_cursor = result
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def load_dashboard(user_id: int, *, limits: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """
+    Utilisateur, projets, projets partagés avec lui, assets et catégories actives.
+    `limits` : nombre d'éléments par section (0 = section vide, sans requête).
+    Retourne None si l'utilisateur n'existe plus.
+    """
+    loaders: Dict[str, Loader] = {
+        "projects": lambda db: project.get_user_projects(db, owner_id=user_id, limit=limits["projects"]),
+        "shared_projects": lambda db: shared_project.get_by_user(db, user_id=user_id, limit=limits["shared_projects"]),
+        "assets": lambda db: user_asset.get_by_user(db, user_id=user_id, limit=limits["assets"]),
+        "categories": lambda db: category.get_active_categories(db, limit=limits["categories"]),
+    }
+    slots = asyncio.Semaphore(max(1, settings.DASHBOARD_MAX_CONCURRENCY))
+
+    async def run(loader: Loader) -> Any:
+        async with slots:
+            async with AsyncSessionLocal() as db:
+                return await loader(db)
+
+    async with asyncio.TaskGroup() as group:
+        user_task = group.create_task(run(lambda db: user.get(db, id=user_id)))
+        tasks = {name: group.create_task(run(loader)) for name, loader in loaders.items() if limits[name] > 0}
+
+    db_user = user_task.result()
+    if db_user is None:
+        return None
+    dashboard: Dict[str, Any] = {"user": db_user}
+    for name in loaders:
+        dashboard[name] = _page(tasks[name].result()) if name in tasks else {"items": [], "next_cursor": None}
+    return dashboard
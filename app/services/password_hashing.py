@@ -0,0 +1,83 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_and_update_password
+
+
+class HashingOverloaded(Exception):
+    """File d'attente du pool de hachage pleine"""
+
+
+class PasswordHasher:
+    """
+    Exécute bcrypt dans un pool de processus borné, hors de la boucle d'événements
+    et du threadpool partagé. Au-delà de `max_queue` calculs en cours ou en attente,
+    les appels échouent immédiatement (HashingOverloaded) au lieu de s'empiler.
+    """
+
+    def __init__(self, *, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0  # exceptions du calcul, pool cassé (BrokenProcessPool), annulations
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn : des workers forkés hériteraient du socket d'écoute du serveur et
+            # le garderaient ouvert après la mort du processus principal
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_queue:
+            self._rejected += 1
+            raise HashingOverloaded()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except BaseException:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+        self._completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hacher un mot de passe avec le coût courant (BCRYPT_ROUNDS)"""
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Vérifier un mot de passe ; retourne aussi le nouveau hash si le coût a changé"""
+        return await self._submit(verify_and_update_password, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.crud_project import project
+from app.services.cache import LRUTTLCache
+
+# Valeur en cache pour "aucun accès" (None signifie absent du cache)
+_NO_ACCESS = ""
+
+permission_cache = LRUTTLCache(
+    "permission", max_entries=settings.PERMISSION_CACHE_MAX_ENTRIES, ttl=settings.PERMISSION_CACHE_TTL_SECONDS
+)
+
+
+async def get_permission(db: AsyncSession, *, user_id: int, project_id: int) -> Optional[str]:
+    """Permission effective depuis le cache (TTL court), sinon une requête UNION indexée"""
+    if settings.PERMISSION_CACHE:
+        cached = permission_cache.get((user_id, project_id))
+        if cached is not None:
+            return cached or None
+
+    permission = await project.get_permission(db, user_id=user_id, project_id=project_id)
+    remember_permission(user_id, project_id, permission)
+    return permission
+
+
+def remember_permission(user_id: int, project_id: int, permission: Optional[str]) -> None:
+    """Mettre en cache une permission déjà résolue (p. ex. par la liste des projets accessibles)"""
+    if settings.PERMISSION_CACHE:
+        permission_cache.set((user_id, project_id), permission or _NO_ACCESS)
+
+
+def invalidate_permission(user_id: Optional[int], project_id: Optional[int]) -> None:
+    """
+    Hook d'invalidation : à appeler après tout changement de partage (création, modification,
+    suppression). Vide l'entrée de ce worker ; les autres workers convergent au plus tard après
+    PERMISSION_CACHE_TTL_SECONDS.
+    """
+    if user_id is not None and project_id is not None:
+        permission_cache.delete((user_id, project_id))
@@ -0,0 +1,388 @@
+"""
+Export et import en flux des données (sauvegardes, demandes de portabilité).
+
+Export : chaque type est lu par un curseur côté serveur (AsyncSession.stream + yield_per), par
+lots de EXPORT_BATCH_SIZE lignes en colonnes simples (pas d'objets ORM ni d'identity map), et
+chaque lot est sérialisé et envoyé avant la lecture du suivant : la mémoire reste bornée par un
+lot quelle que soit la taille du compte. Les types sont lus dans une même transaction
+REPEATABLE READ (instantané cohérent). Deux formats :
+- NDJSON : une ligne d'en-tête {"type": "export", "data": {...}} puis une ligne par
+  enregistrement, {"type": "project" | "template" | "asset", "data": {...}} ;
+- zip : projects.ndjson, templates.ndjson, assets.ndjson (une ligne = un enregistrement) et
+  manifest.json, compressés au fil de l'eau (archive écrite sans seek).
+
+Import : les mêmes formats sont relus ligne par ligne (le zip est d'abord écrit sur disque, son
+répertoire central étant à la fin), validés et insérés par lots, une transaction par lot. Les
+ids sont réattribués et le propriétaire est l'utilisateur cible ; les assets respectent le quota
+de stockage. Seuls les fichiers de métadonnées sont exportés : les fichiers des assets restent
+dans le stockage, référencés par leur URL. Un asset importé doit donc pointer dans le stockage de
+ce déploiement (pas d'URL arbitraire comptée pour une taille déclarée), et son empreinte
+content_hash, déclarée par le fichier et non vérifiée, n'est pas reprise : elle capterait la
+déduplication des uploads suivants.
+"""
+import asyncio
+import io
+import json
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import IO, Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.serialization import dump_json
+from app.crud.crud_category import category
+from app.crud.crud_storage_usage import UsageDeltas, add_delta, storage_usage
+from app.models.models import Project, Template, UserAsset
+from app.schemas.schemas import BulkItemError, ProjectExport, TemplateExport, UserAssetExport
+from app.services.permissions import invalidate_permission
+from app.services.storage import get_storage
+
+FORMAT_VERSION = 1
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+ZIP_MEDIA_TYPE = "application/zip"
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass(frozen=True)
+class RecordType:
+    model: Any
+    schema: Type[BaseModel]
+    owner_column: Optional[str]  # None : données globales (catalogue de templates)
+    entry: str  # fichier de l'archive zip
+
+
+RECORD_TYPES: Dict[str, RecordType] = {
+    "project": RecordType(Project, ProjectExport, "owner_id", "projects.ndjson"),
+    "template": RecordType(Template, TemplateExport, None, "templates.ndjson"),
+    "asset": RecordType(UserAsset, UserAssetExport, "user_id", "assets.ndjson"),
+}
+# Export d'un utilisateur : ses données, sans le catalogue global
+USER_TYPES = ("project", "asset")
+
+
+class InvalidImport(ValueError):
+    """Fichier d'import illisible (archive invalide, version inconnue...)"""
+
+
+class ImportTooLarge(Exception):
+    """Ligne plus longue que IMPORT_MAX_RECORD_BYTES, ou archive plus grande que IMPORT_MAX_ARCHIVE_BYTES"""
+
+
+# === EXPORT ===
+
+def _columns(record_type: RecordType) -> List[Any]:
+    """Colonnes exportées : les champs du schéma (pas de search_vector ni de relations)"""
+    return [getattr(record_type.model, name) for name in record_type.schema.model_fields]
+
+
+async def iter_batches(user_id: Optional[int], types: Sequence[str]) -> AsyncIterator[Tuple[str, List[bytes]]]:
+    """
+    Lots d'enregistrements sérialisés en JSON, type par type, lus par curseur côté serveur.
+    `user_id` None : toutes les lignes (export administrateur).
+    """
+    async with AsyncSessionLocal() as db:
+        await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        for name in types:
+            record_type = RECORD_TYPES[name]
+            query = select(*_columns(record_type)).order_by(record_type.model.id)
+            if user_id is not None and record_type.owner_column:
+                query = query.where(getattr(record_type.model, record_type.owner_column) == user_id)
+            result = await db.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield name, [dump_json(record_type.schema, row) for row in rows]
+
+
+def _manifest(user_id: Optional[int], types: Sequence[str]) -> Dict[str, Any]:
+    return {"version": FORMAT_VERSION, "user_id": user_id, "types": list(types), "exported_at": datetime.now().isoformat()}
+
+
+async def export_ndjson(user_id: Optional[int], types: Sequence[str]) -> AsyncIterator[bytes]:
+    """Export NDJSON, un bloc par lot"""
+    yield json.dumps({"type": "export", "data": _manifest(user_id, types)}).encode() + b"\n"
+    async for name, records in iter_batches(user_id, types):
+        prefix = b'{"type":"' + name.encode() + b'","data":'
+        yield b"".join(prefix + record + b"}\n" for record in records)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destination non seekable de l'archive : garde les octets écrits jusqu'au prochain envoi"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _write_records(entry: IO[bytes], records: List[bytes]) -> None:
+    entry.write(b"\n".join(records) + b"\n")
+
+
+async def export_zip(user_id: Optional[int], types: Sequence[str]) -> AsyncIterator[bytes]:
+    """Export zip, un bloc compressé par lot (compression hors de la boucle d'événements)"""
+    sink = _ChunkSink()
+    manifest = _manifest(user_id, types)
+    counts = dict.fromkeys(types, 0)
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        entry, current = None, None
+        async for name, records in iter_batches(user_id, types):
+            if name != current:
+                if entry is not None:
+                    entry.close()
+                entry, current = archive.open(RECORD_TYPES[name].entry, "w", force_zip64=True), name
+            await asyncio.to_thread(_write_records, entry, records)
+            counts[name] += len(records)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+        if entry is not None:
+            entry.close()
+        archive.writestr("manifest.json", json.dumps({**manifest, "counts": counts}, indent=2))
+    yield sink.drain()
+
+
+# === IMPORT ===
+
+# (numéro de ligne, type, données) ; type None : ligne invalide, données = message d'erreur
+Record = Tuple[int, Optional[str], Any]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Découper un flux d'octets en lignes, sans garder plus d'une ligne en mémoire"""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            yield bytes(buffer[start:end])
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > settings.IMPORT_MAX_RECORD_BYTES:
+            raise ImportTooLarge()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _parse(line_no: int, line: bytes, kind: Optional[str] = None) -> Optional[Record]:
+    """Décoder une ligne NDJSON ; `kind` imposé dans l'archive zip (un fichier par type)"""
+    if not line.strip():
+        return None
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line_no, None, f"{RECORD_TYPES[kind].entry}: Invalid JSON" if kind else "Invalid JSON"
+    if kind is not None:
+        return line_no, kind, record
+    if not isinstance(record, dict) or not isinstance(record.get("type"), str):
+        return line_no, None, "Expected an object with 'type' and 'data'"
+    if record["type"] == "export":
+        version = (record.get("data") or {}).get("version")
+        if version != FORMAT_VERSION:
+            raise InvalidImport(f"Unsupported export version: {version}")
+        return None
+    if record["type"] not in RECORD_TYPES:
+        return line_no, None, f"Unknown record type: {record['type']}"
+    return line_no, record["type"], record.get("data")
+
+
+async def ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Enregistrements d'un export NDJSON lu en flux"""
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        record = _parse(line_no, line)
+        if record is not None:
+            yield record
+
+
+async def spool_archive(chunks: AsyncIterator[bytes]) -> str:
+    """Écrire une archive reçue en flux dans un fichier temporaire (à supprimer par l'appelant)"""
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=".zip")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.IMPORT_MAX_ARCHIVE_BYTES:
+                    raise ImportTooLarge()
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _read_lines(f: IO[bytes], count: int) -> List[bytes]:
+    lines = []
+    for _ in range(count):
+        line = f.readline(settings.IMPORT_MAX_RECORD_BYTES + 1)
+        if not line:
+            break
+        if len(line) > settings.IMPORT_MAX_RECORD_BYTES:
+            raise ImportTooLarge()
+        lines.append(line)
+    return lines
+
+
+async def zip_records(path: str) -> AsyncIterator[Record]:
+    """Enregistrements d'une archive zip, fichier par fichier, lus par lots hors de la boucle d'événements"""
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as exc:
+        raise InvalidImport("Invalid zip archive") from exc
+    with archive:
+        names = set(archive.namelist())
+        if "manifest.json" in names:
+            version = json.loads(archive.read("manifest.json")).get("version")
+            if version != FORMAT_VERSION:
+                raise InvalidImport(f"Unsupported export version: {version}")
+        for kind, record_type in RECORD_TYPES.items():
+            if record_type.entry not in names:
+                continue
+            with archive.open(record_type.entry) as f:
+                line_no = 0
+                while lines := await asyncio.to_thread(_read_lines, f, settings.EXPORT_BATCH_SIZE):
+                    for line in lines:
+                        line_no += 1
+                        record = _parse(line_no, line, kind)
+                        if record is not None:
+                            yield record
+
+
+class Importer:
+    """
+    Insertion par lots des enregistrements importés dans le compte `user_id`.
+    `templates` : importer aussi les templates (catalogue global, réservé à l'administration) ;
+    sinon ils sont comptés dans skipped. `quota` : quota de stockage des assets (0 = illimité).
+    """
+
+    def __init__(self, db: AsyncSession, *, user_id: int, templates: bool = False, quota: int = 0):
+        self.db = db
+        self.user_id = user_id
+        self.templates = templates
+        self.quota = quota
+        self.pending: Dict[str, List[Tuple[int, BaseModel]]] = {kind: [] for kind in RECORD_TYPES}
+        self.imported = dict.fromkeys(RECORD_TYPES, 0)
+        self.skipped = dict.fromkeys(RECORD_TYPES, 0)
+        self.errors: List[BulkItemError] = []
+        self.error_count = 0
+
+    def error(self, line_no: int, detail: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(BulkItemError(index=line_no, detail=detail))
+
+    async def add(self, line_no: int, kind: Optional[str], data: Any) -> None:
+        if kind is None:
+            self.error(line_no, data)
+            return
+        if kind == "template" and not self.templates:
+            self.skipped[kind] += 1
+            return
+        try:
+            item = RECORD_TYPES[kind].schema.model_validate(data)
+        except ValidationError as exc:
+            first = exc.errors()[0]
+            self.error(line_no, f"Invalid {kind}: {'.'.join(map(str, first['loc']))}: {first['msg']}")
+            return
+        self.pending[kind].append((line_no, item))
+        if len(self.pending[kind]) >= settings.EXPORT_BATCH_SIZE:
+            await self.flush(kind)
+
+    async def flush(self, kind: Optional[str] = None) -> None:
+        """Insérer les lots en attente (d'un type, ou de tous), une transaction par lot"""
+        for name in [kind] if kind else list(RECORD_TYPES):
+            batch, self.pending[name] = self.pending[name], []
+            if batch:
+                await getattr(self, f"_insert_{name}s")(batch)
+                await self.db.commit()
+
+    def _row(self, item: BaseModel, *, exclude: set) -> Dict[str, Any]:
+        row = item.model_dump(exclude={"id", *exclude})
+        now = datetime.now()
+        for column in ("created_at", "updated_at"):
+            if column in row and row[column] is None:
+                row[column] = now
+        return row
+
+    async def _insert_projects(self, batch: List[Tuple[int, ProjectExport]]) -> None:
+        rows = [{**self._row(item, exclude={"owner_id"}), "owner_id": self.user_id} for _, item in batch]
+        ids = (await self.db.execute(insert(Project).returning(Project.id), rows)).scalars().all()
+        for project_id in ids:
+            # Un "aucun accès" mis en cache pour un id réutilisé serait faux
+            invalidate_permission(self.user_id, project_id)
+        self.imported["project"] += len(ids)
+
+    async def _insert_templates(self, batch: List[Tuple[int, TemplateExport]]) -> None:
+        known = await category.existing_ids(self.db, {item.category_id for _, item in batch})
+        rows = []
+        for line_no, item in batch:
+            if item.category_id in known:
+                rows.append(self._row(item, exclude=set()))
+            else:
+                self.error(line_no, f"Unknown category: {item.category_id}")
+        if rows:
+            await self.db.execute(insert(Template), rows)
+            self.imported["template"] += len(rows)
+
+    async def _insert_assets(self, batch: List[Tuple[int, UserAssetExport]]) -> None:
+        planned = 0
+        if self.quota:
+            # Usage relu à chaque lot sous le verrou de l'utilisateur : les uploads concurrents comptent
+            await storage_usage.lock_user(self.db, user_id=self.user_id)
+            planned = await storage_usage.get_total(self.db, user_id=self.user_id)
+        storage = get_storage()
+        rows = []
+        deltas: UsageDeltas = {}
+        for line_no, item in batch:
+            if not storage.owns_url(item.cloudinary_url):
+                self.error(line_no, "Asset URL is not in this deployment's storage")
+                continue
+            if self.quota and planned + item.file_size > self.quota:
+                self.error(line_no, "Storage quota exceeded")
+                continue
+            planned += item.file_size
+            # Sans content_hash : ni déduplication des uploads, ni suppression du fichier avec l'asset
+            rows.append({**self._row(item, exclude={"user_id", "content_hash"}), "user_id": self.user_id})
+            add_delta(deltas, self.user_id, item.file_type, item.file_size, 1)
+        if not rows:
+            return
+        await self.db.execute(insert(UserAsset), rows)
+        await storage_usage.apply(self.db, deltas)
+        self.imported["asset"] += len(rows)
+
+    def result(self) -> Dict[str, Any]:
+        return {"imported": self.imported, "skipped": self.skipped, "errors": self.errors, "error_count": self.error_count}
+
+
+async def import_records(
+    records: AsyncIterator[Record], *, user_id: int, templates: bool = False, quota: int = 0
+) -> Dict[str, Any]:
+    """
+    Importer des enregistrements (ndjson_records, zip_records) dans le compte `user_id`.
+    Les lignes invalides sont rapportées dans errors sans interrompre l'import ; les lots déjà
+    insérés restent en place si l'import échoue en cours de route.
+    """
+    async with AsyncSessionLocal() as db:
+        importer = Importer(db, user_id=user_id, templates=templates, quota=quota)
+        async for line_no, kind, data in records:
+            await importer.add(line_no, kind, data)
+        await importer.flush()
+    return importer.result()
@@ -0,0 +1,195 @@
+import io
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+from functools import lru_cache
+from typing import Any, Dict, IO, Protocol, Tuple
+
+import cloudinary.api
+import cloudinary.exceptions
+import cloudinary.uploader
+import cloudinary.utils
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from app.core.config import settings
+
+
+class StorageBackend(Protocol):
+    """
+    Interface du stockage des fichiers (miniatures, assets uploadés), adressés par une clé
+    relative (`thumbnails/<hash>.png`). Les appels sont bloquants : à exécuter hors de la
+    boucle d'événements (asyncio.to_thread).
+    """
+
+    name: str
+
+    def exists(self, key: str) -> bool: ...
+
+    def save(self, key: str, data: bytes, content_type: str) -> str: ...
+
+    def save_file(self, key: str, path: str, content_type: str) -> str: ...
+
+    def url(self, key: str) -> str: ...
+
+    def owns_url(self, url: str) -> bool: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+class LocalStorage:
+    """Stockage sur le système de fichiers local, servi par l'application sous `base_url`"""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def _write(self, key: str, source: IO[bytes]) -> str:
+        """Écrire le fichier de façon atomique (fichier temporaire puis rename), par blocs, et retourner son URL"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(source, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return self.url(key)
+
+    def save(self, key: str, data: bytes, content_type: str) -> str:
+        return self._write(key, io.BytesIO(data))
+
+    def save_file(self, key: str, path: str, content_type: str) -> str:
+        with open(path, "rb") as source:
+            return self._write(key, source)
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def owns_url(self, url: str) -> bool:
+        """L'URL désigne-t-elle un fichier de ce stockage ?"""
+        if not url.startswith(self.base_url + "/"):
+            return False
+        try:
+            self._path(url[len(self.base_url) + 1:])
+        except ValueError:
+            return False
+        return True
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class LocalStorageFiles(StaticFiles):
+    """
+    Application qui sert LocalStorage sous LOCAL_STORAGE_URL. Les assets uploadés gardent
+    l'extension choisie par le client (.html, .svg...) : ils sont servis en pièce jointe et sans
+    détection de type (nosniff), le navigateur ne les exécute donc pas dans l'origine de l'API
+    (XSS stocké). Les miniatures, rendues par l'application, restent affichables.
+    """
+
+    def file_response(self, full_path: Any, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        if not self.get_path(scope).startswith("thumbnails" + os.sep):
+            response.headers["Content-Disposition"] = "attachment"
+        return response
+
+
+class CloudinaryStorage:
+    """
+    Stockage Cloudinary. Les images et vidéos sont publiées sous la clé sans extension (le format
+    est ajouté par Cloudinary), les autres fichiers en "raw" avec leur extension.
+    Les fichiers sont envoyés par blocs (upload_large) : jamais chargés entièrement en mémoire.
+    """
+
+    name = "cloudinary"
+
+    def __init__(self, *, cloud_name: str, api_key: str, api_secret: str, folder: str = ""):
+        self.credentials = {"cloud_name": cloud_name, "api_key": api_key, "api_secret": api_secret}
+        self.folder = folder.strip("/")
+        # https://res.cloudinary.com/<cloud>/<resource_type>/upload/[v<version>/]<public_id>
+        self._url_pattern = re.compile(
+            rf"https://res\.cloudinary\.com/{re.escape(cloud_name)}/(image|video|raw)/upload/(v\d+/)?"
+            + (re.escape(self.folder + "/") if self.folder else "")
+            + r"[^?#]+"
+        )
+
+    def _resource(self, key: str) -> Tuple[str, Dict[str, Any]]:
+        """public_id et options (resource_type, format) d'une clé"""
+        key = f"{self.folder}/{key}" if self.folder else key
+        mime = mimetypes.guess_type(key)[0] or ""
+        stem, ext = os.path.splitext(key)
+        if mime.startswith("image/"):
+            return stem, {"resource_type": "image", "format": ext.lstrip(".") or None}
+        if mime.startswith(("video/", "audio/")):
+            return stem, {"resource_type": "video", "format": ext.lstrip(".") or None}
+        return key, {"resource_type": "raw"}
+
+    def exists(self, key: str) -> bool:
+        public_id, options = self._resource(key)
+        try:
+            cloudinary.api.resource(public_id, resource_type=options["resource_type"], **self.credentials)
+        except cloudinary.exceptions.NotFound:
+            return False
+        return True
+
+    def _upload(self, key: str, source: Any) -> str:
+        public_id, options = self._resource(key)
+        result = cloudinary.uploader.upload_large(
+            source, public_id=public_id, resource_type=options["resource_type"],
+            overwrite=False, unique_filename=False, **self.credentials,
+        )
+        return result["secure_url"]
+
+    def save(self, key: str, data: bytes, content_type: str) -> str:
+        return self._upload(key, io.BytesIO(data))
+
+    def save_file(self, key: str, path: str, content_type: str) -> str:
+        return self._upload(key, path)
+
+    def url(self, key: str) -> str:
+        public_id, options = self._resource(key)
+        return cloudinary.utils.cloudinary_url(public_id, secure=True, **options, **self.credentials)[0]
+
+    def owns_url(self, url: str) -> bool:
+        """L'URL désigne-t-elle une ressource de ce compte Cloudinary, sous `folder` ?"""
+        return self._url_pattern.fullmatch(url) is not None
+
+    def delete(self, key: str) -> None:
+        public_id, options = self._resource(key)
+        cloudinary.uploader.destroy(public_id, resource_type=options["resource_type"], invalidate=True, **self.credentials)
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """Backend de stockage configuré (STORAGE_BACKEND)"""
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.LOCAL_STORAGE_DIR, settings.LOCAL_STORAGE_URL)
+    if settings.STORAGE_BACKEND == "cloudinary":
+        return CloudinaryStorage(
+            cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+            api_key=settings.CLOUDINARY_API_KEY,
+            api_secret=settings.CLOUDINARY_API_SECRET,
+            folder=settings.CLOUDINARY_FOLDER,
+        )
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
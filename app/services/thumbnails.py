@@ -0,0 +1,174 @@
+"""
+Miniatures des projets rendues côté serveur, hors du chemin des requêtes.
+
+Chaque sauvegarde du canvas planifie un rendu (schedule) ; une tâche par projet relit le
+dernier canvas en base, et les sauvegardes rapprochées sont fusionnées en un seul rendu.
+La miniature est adressée par l'empreinte du contenu (canvas, taille de page, version du
+moteur de rendu) : un canvas inchangé n'est jamais rendu deux fois, même d'un projet à
+l'autre (copie d'un template). Le rendu s'exécute dans un pool de processus borné.
+
+thumbnail_url n'est écrit que si le canvas n'a pas changé pendant le rendu (canvas_version) ;
+sinon le rendu suivant, déjà planifié, s'en charge. Les rendus en attente sont perdus à
+l'arrêt du processus : la miniature sera produite à la prochaine sauvegarde.
+
+Au plus THUMBNAIL_WORKERS rendus s'exécutent à la fois (les autres tâches attendent leur tour
+sans connexion), et aucune connexion n'est tenue pendant le rendu ni l'écriture du fichier :
+la lecture du canvas et l'enregistrement de thumbnail_url sont deux sessions courtes.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud.crud_project import project
+from app.services.canvas_render import RENDERER_VERSION, Image, page_size, render_thumbnail
+from app.services.storage import StorageBackend, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def thumbnail_key(canvas_data: Dict[str, Any], width: float, height: float, max_size: int) -> str:
+    """Clé de stockage de la miniature : empreinte SHA-256 du contenu rendu"""
+    canonical = json.dumps(
+        [RENDERER_VERSION, max_size, width, height, canvas_data],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return f"thumbnails/{hashlib.sha256(canonical.encode()).hexdigest()}.png"
+
+
+class ThumbnailRenderer:
+    """Planifie et exécute le rendu des miniatures dans un pool de processus borné"""
+
+    def __init__(
+        self, *, enabled: bool, workers: int, max_size: int, max_pending: int,
+        storage_factory: Callable[[], StorageBackend] = get_storage, session_factory=AsyncSessionLocal,
+    ):
+        self.enabled = enabled and Image is not None
+        self.workers = workers
+        self.max_size = max_size
+        self.max_pending = max_pending
+        self.storage_factory = storage_factory
+        self.session_factory = session_factory
+        self._executor: Optional[Executor] = None
+        # Un rendu par processus du pool (un à la fois sur le thread par défaut)
+        self._slots = asyncio.Semaphore(max(workers, 1))
+        self._pending: Set[int] = set()
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.scheduled = 0
+        self.dropped = 0
+        self.rendered = 0
+        self.reused = 0
+        self.unchanged = 0
+        self.stale = 0
+        self.failures = 0
+        if enabled and Image is None:
+            logger.warning("THUMBNAILS_ENABLED is set but Pillow is not installed: thumbnails disabled")
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn, comme le pool de hachage : pas d'héritage du socket d'écoute
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def schedule(self, project_id: int) -> None:
+        """Planifier le rendu de la miniature du projet (sans attendre) ; fusionné avec un rendu déjà en attente"""
+        if not self.enabled:
+            return
+        if project_id not in self._pending and len(self._pending) + len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.scheduled += 1
+        self._pending.add(project_id)
+        if project_id not in self._tasks:
+            # Contexte vide : la tâche survit à la requête qui l'a planifiée et ne doit pas hériter
+            # de ses contextvars (statistiques SQL de la requête, budget du mode strict...)
+            self._tasks[project_id] = asyncio.create_task(self._run(project_id), context=contextvars.Context())
+
+    async def _run(self, project_id: int) -> None:
+        try:
+            while project_id in self._pending:
+                self._pending.discard(project_id)
+                try:
+                    await self.render_project(project_id)
+                except Exception:
+                    self.failures += 1
+                    logger.exception("Thumbnail rendering failed for project %s", project_id)
+        finally:
+            self._tasks.pop(project_id, None)
+
+    async def render_project(self, project_id: int) -> Optional[str]:
+        """Rendre (si nécessaire) la miniature du canvas courant et l'enregistrer ; retourne son URL"""
+        async with self._slots:
+            async with self.session_factory() as db:
+                source = await project.get_render_source(db, id=project_id)
+            if source is None:
+                return None
+            width, height = page_size(source.format_type, source.width, source.height)
+            storage = self.storage_factory()
+            key = thumbnail_key(source.canvas_data, width, height, self.max_size)
+            url = storage.url(key)
+            if source.thumbnail_url == url:
+                self.unchanged += 1
+                return url
+
+            if await asyncio.to_thread(storage.exists, key):
+                self.reused += 1
+            else:
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(
+                    self._get_executor(), render_thumbnail, source.canvas_data, width, height, self.max_size
+                )
+                await asyncio.to_thread(storage.save, key, data, "image/png")
+                self.rendered += 1
+
+            async with self.session_factory() as db:
+                updated = await project.set_thumbnail(
+                    db, id=project_id, thumbnail_url=url, canvas_version=source.canvas_version
+                )
+            if not updated:
+                self.stale += 1
+            return url
+
+    async def stop(self) -> None:
+        """Abandonner les rendus en cours (arrêt du processus) et fermer le pool"""
+        self._pending.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "pending": len(self._pending),
+            "running": len(self._tasks),
+            "scheduled": self.scheduled,
+            "dropped": self.dropped,
+            "rendered": self.rendered,
+            "reused": self.reused,
+            "unchanged": self.unchanged,
+            "stale": self.stale,
+            "failures": self.failures,
+        }
+
+
+thumbnail_renderer = ThumbnailRenderer(
+    enabled=settings.THUMBNAILS_ENABLED,
+    workers=settings.THUMBNAIL_WORKERS,
+    max_size=settings.THUMBNAIL_MAX_SIZE,
+    max_pending=settings.THUMBNAIL_MAX_PENDING,
+)
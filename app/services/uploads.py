@@ -0,0 +1,238 @@
+"""
+Upload des assets en flux.
+
+Le corps multipart est analysé au fil de la réception (python-multipart) : les données du
+fichier sont hachées (SHA-256) et écrites par blocs dans un fichier temporaire, sans jamais
+être chargées entièrement en mémoire. L'empreinte déduplique les fichiers par utilisateur :
+un fichier déjà uploadé par le même utilisateur n'est ni re-stocké ni ré-enregistré.
+"""
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.crud.crud_storage_usage import QuotaExceeded, storage_usage
+from app.crud.crud_user_asset import delete_stored_files, user_asset
+from app.models.models import UserAsset
+from app.schemas.schemas import UserAssetCreate
+from app.services.storage import get_storage
+
+# Champs texte acceptés à côté du fichier (file_type...) : taille bornée
+MAX_FIELD_SIZE = 1024
+
+
+class InvalidUpload(ValueError):
+    """Corps multipart invalide (pas de fichier, fichier vide, champ trop long...)"""
+
+
+class UploadTooLarge(Exception):
+    """Fichier plus grand que UPLOAD_MAX_BYTES"""
+
+
+@dataclass
+class ReceivedFile:
+    path: str
+    filename: str
+    content_type: str
+    size: int
+    sha256: str
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    def cleanup(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _Part:
+    """État de la partie multipart en cours d'analyse"""
+
+    def __init__(self):
+        self.header_field = bytearray()
+        self.header_value = bytearray()
+        self.headers: Dict[bytes, bytes] = {}
+        self.name = ""
+        self.is_file = False
+        self.value = bytearray()
+
+
+class _SpoolWriter:
+    """Fichier temporaire haché au fil de l'écriture (appelé hors de la boucle d'événements)"""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="upload-")
+        self.file = os.fdopen(fd, "wb")
+        self.digest = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self.digest.update(data)
+        self.file.write(data)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def receive_upload(request: Request, *, file_field: str = "file", max_size: int = settings.UPLOAD_MAX_BYTES) -> ReceivedFile:
+    """
+    Lire une requête multipart/form-data en flux ; le fichier `file_field` est écrit dans un
+    fichier temporaire (à supprimer avec cleanup()) et haché au passage.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUpload("Expected a multipart/form-data body")
+
+    spool = _SpoolWriter()
+    fields: Dict[str, str] = {}
+    file_info: Dict[str, str] = {}
+    part = _Part()
+    pending: List[bytes] = []
+    pending_size = 0
+    size = 0
+
+    def on_part_begin() -> None:
+        nonlocal part
+        part = _Part()
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        part.header_field += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        part.header_value += data[start:end]
+
+    def on_header_end() -> None:
+        part.headers[bytes(part.header_field).lower()] = bytes(part.header_value)
+        part.header_field, part.header_value = bytearray(), bytearray()
+
+    def on_headers_finished() -> None:
+        _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+        part.name = disposition.get(b"name", b"").decode("latin-1")
+        filename = disposition.get(b"filename")
+        if part.name == file_field and filename is not None:
+            if file_info:
+                raise InvalidUpload(f"Only one '{file_field}' part is accepted")
+            file_info.update(
+                filename=os.path.basename(filename.decode("utf-8", "replace")) or "upload",
+                content_type=part.headers.get(b"content-type", b"application/octet-stream").decode("latin-1"),
+            )
+            part.is_file = True
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        nonlocal size, pending_size
+        if part.is_file:
+            size += end - start
+            if size > max_size:
+                raise UploadTooLarge()
+            pending.append(data[start:end])
+            pending_size += end - start
+        else:
+            part.value += data[start:end]
+            if len(part.value) > MAX_FIELD_SIZE:
+                raise InvalidUpload(f"Field '{part.name}' is too long")
+
+    def on_part_end() -> None:
+        if not part.is_file:
+            fields[part.name] = part.value.decode("utf-8", "replace")
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            # Écritures disque (et hachage) par blocs de UPLOAD_CHUNK_SIZE, dans un thread
+            if pending_size >= settings.UPLOAD_CHUNK_SIZE:
+                data = b"".join(pending)
+                pending.clear()
+                pending_size = 0
+                await asyncio.to_thread(spool.write, data)
+        parser.finalize()
+        if pending:
+            await asyncio.to_thread(spool.write, b"".join(pending))
+    except BaseException:
+        spool.close()
+        os.unlink(spool.path)
+        raise
+    spool.close()
+
+    received = ReceivedFile(
+        path=spool.path, filename=file_info.get("filename", ""), content_type=file_info.get("content_type", ""),
+        size=size, sha256=spool.digest.hexdigest(), fields=fields,
+    )
+    if not file_info or not size:
+        received.cleanup()
+        raise InvalidUpload(f"Missing or empty '{file_field}' file")
+    return received
+
+
+def asset_file_type(content_type: str) -> str:
+    """Type d'asset déduit du type MIME (image, video, audio, document)"""
+    main_type = content_type.split("/", 1)[0]
+    return main_type if main_type in ("image", "video", "audio") else "document"
+
+
+def asset_key(user_id: int, received: ReceivedFile) -> str:
+    """Clé de stockage adressée par le contenu : assets/<user_id>/<sha256><ext>"""
+    ext = os.path.splitext(received.filename)[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,10}", ext):
+        ext = mimetypes.guess_extension(received.content_type) or ""
+    return f"assets/{user_id}/{received.sha256}{ext}"
+
+
+async def store_upload(db: AsyncSession, *, user_id: int, received: ReceivedFile, quota: int = 0) -> Tuple[UserAsset, bool]:
+    """
+    Stocker le fichier reçu et créer l'asset ; retourne (asset, created).
+    Un fichier identique déjà uploadé par l'utilisateur retourne l'asset existant sans rien stocker.
+    QuotaExceeded si le fichier ferait dépasser `quota` (vérifié avant l'envoi au stockage, puis
+    dans la transaction de création).
+    """
+    existing = await user_asset.get_by_hash(db, user_id=user_id, content_hash=received.sha256)
+    if existing is not None:
+        return existing, False
+    await storage_usage.check_quota(db, user_id=user_id, quota=quota, extra_bytes=received.size)
+    # Pas de transaction ouverte pendant l'envoi au stockage : le quota est revérifié à la création
+    await db.rollback()
+
+    key = asset_key(user_id, received)
+    url = await asyncio.to_thread(get_storage().save_file, key, received.path, received.content_type)
+    asset_in = UserAssetCreate(
+        filename=key,
+        original_filename=received.filename,
+        cloudinary_url=url,
+        file_type=received.fields.get("file_type") or asset_file_type(received.content_type),
+        file_size=received.size,
+    )
+    try:
+        asset = await user_asset.create_for_user(
+            db, obj_in=asset_in, user_id=user_id, content_hash=received.sha256, quota=quota
+        )
+        return asset, True
+    except QuotaExceeded:
+        # Quota dépassé entre-temps (uploads concurrents) : le fichier déjà stocké n'est pas gardé,
+        # sauf s'il appartient à un asset identique créé en parallèle
+        if await user_asset.get_by_hash(db, user_id=user_id, content_hash=received.sha256) is None:
+            await delete_stored_files([key])
+        raise
+    except IntegrityError:
+        # Upload concurrent du même fichier : l'index unique (user_id, content_hash) a tranché
+        await db.rollback()
+        existing: Optional[UserAsset] = await user_asset.get_by_hash(db, user_id=user_id, content_hash=received.sha256)
+        if existing is None:
+            raise
+        return existing, False
@@ -0,0 +1,54 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud.crud_users import user
+from app.services.cache import LRUTTLCache
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """État d'authentification d'un utilisateur, suffisant pour les endpoints protégés"""
+
+    id: int
+    is_active: bool
+    is_verified: bool
+    token_version: int
+
+
+snapshot_cache = LRUTTLCache(
+    "user_snapshot", max_entries=settings.AUTH_SNAPSHOT_MAX_ENTRIES, ttl=settings.AUTH_SNAPSHOT_TTL_SECONDS
+)
+
+
+async def get_user_snapshot(db: AsyncSession, user_id: int) -> Optional[UserSnapshot]:
+    """Snapshot depuis le cache (TTL court), sinon une requête sur 4 colonnes"""
+    if settings.AUTH_SNAPSHOT_CACHE:
+        cached = snapshot_cache.get(user_id)
+        if cached is not None:
+            return cached
+
+    row = await user.get_auth_state(db, id=user_id)
+    if row is None:
+        return None
+    snapshot = UserSnapshot(
+        id=row.id,
+        is_active=bool(row.is_active),
+        is_verified=bool(row.is_verified),
+        token_version=row.token_version or 0,
+    )
+    if settings.AUTH_SNAPSHOT_CACHE:
+        snapshot_cache.set(user_id, snapshot)
+    return snapshot
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Hook d'invalidation : à appeler après toute modification de l'état d'authentification
+    d'un utilisateur (désactivation, révocation, suppression). Vide le snapshot de ce worker ;
+    les autres workers convergent au plus tard après AUTH_SNAPSHOT_TTL_SECONDS.
+    """
+    snapshot_cache.delete(user_id)
+
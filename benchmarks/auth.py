@@ -0,0 +1,58 @@
+"""
+Latence d'un endpoint protégé avec et sans le snapshot d'authentification en cache.
+
+POST /api/v1/auth/logout ne fait rien d'autre qu'authentifier la requête : la
+latence mesurée est donc celle de la dépendance d'authentification.
+
+Usage :
+    AUTH_SNAPSHOT_CACHE=false uvicorn app.main:app --port 8001 &
+    AUTH_SNAPSHOT_CACHE=true uvicorn app.main:app --port 8002 &
+    python -m benchmarks.auth --email a@b.fr --password secret \\
+        --base-url http://localhost:8001 --base-url http://localhost:8002
+
+Avec AUTH_SNAPSHOT_CACHE=false chaque requête lit l'état de l'utilisateur en base ;
+avec true, seule la première requête par utilisateur et par TTL touche la base.
+"""
+import argparse
+import asyncio
+import json
+from typing import List
+
+import httpx
+
+from benchmarks.load import run
+
+
+async def _login(base_url: str, email: str, password: str) -> str:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+
+async def bench(base_urls: List[str], email: str, password: str, concurrency: int, duration: float) -> List[dict]:
+    """Mesurer POST /auth/logout sur chaque serveur, l'un après l'autre"""
+    results = []
+    for base_url in base_urls:
+        token = await _login(base_url, email, password)
+        results.append(await run(
+            f"{base_url}/api/v1/auth/logout", concurrency, duration, token=token, method="POST"
+        ))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", action="append", required=True)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    args = parser.parse_args()
+
+    results = asyncio.run(bench(args.base_url, args.email, args.password, args.concurrency, args.duration))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
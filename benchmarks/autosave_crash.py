@@ -0,0 +1,98 @@
+"""
+Scénario de reprise après crash de l'autosave write-behind (voir app/services/autosave.py).
+
+Usage (base locale migrée, *jamais* en production) :
+    python -m benchmarks.autosave_crash
+
+Lance un serveur uvicorn avec un intervalle de flush très long, puis vérifie :
+1. une sauvegarde explicite (autosave puis POST .../autosave/flush) survit à un kill -9 ;
+2. une sauvegarde seulement acceptée (202) est perdue au kill -9 : la base garde le
+   dernier état écrit, jamais un état partiel ;
+3. un arrêt normal (SIGTERM) écrit les sauvegardes en attente avant de quitter.
+Le script sort en erreur si l'un des comportements attendus n'est pas observé.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+
+
+def _start(port: int) -> subprocess.Popen:
+    env = {**os.environ, "AUTOSAVE_FLUSH_INTERVAL_SECONDS": "3600"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+def _stop(process: subprocess.Popen, sig: int) -> None:
+    process.send_signal(sig)
+    process.wait(timeout=30)
+
+
+def _check(label: str, actual, expected) -> bool:
+    ok = actual == expected
+    print(f"{'OK  ' if ok else 'FAIL'} {label}: {actual!r} (attendu {expected!r})")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    base = f"http://127.0.0.1:{args.port}/api/v1"
+    email, password = f"crash-{uuid.uuid4().hex[:8]}@example.com", "crash-test"
+
+    server = _start(args.port)
+    try:
+        httpx.post(f"{base}/auth/register", json={"email": email, "password": password, "full_name": "Crash Test"}).raise_for_status()
+        token = httpx.post(f"{base}/auth/login", json={"email": email, "password": password}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        created = httpx.post(f"{base}/projects/", headers=headers, json={
+            "title": "Crash", "canvas_data": {"step": "created"}, "owner_id": 0,
+        })
+        created.raise_for_status()
+        project_id = created.json()["id"]
+
+        httpx.put(f"{base}/projects/{project_id}/autosave", headers=headers, json={"canvas_data": {"step": "saved"}})
+        flushed = httpx.post(f"{base}/projects/{project_id}/autosave/flush", headers=headers).json()
+        httpx.put(f"{base}/projects/{project_id}/autosave", headers=headers, json={"canvas_data": {"step": "lost"}})
+    finally:
+        _stop(server, signal.SIGKILL)
+
+    server = _start(args.port)
+    try:
+        after_crash = httpx.get(f"{base}/projects/{project_id}", headers=headers).json()
+        httpx.put(f"{base}/projects/{project_id}/autosave", headers=headers, json={"canvas_data": {"step": "graceful"}})
+    finally:
+        _stop(server, signal.SIGTERM)
+
+    server = _start(args.port)
+    try:
+        after_shutdown = httpx.get(f"{base}/projects/{project_id}", headers=headers).json()
+    finally:
+        _stop(server, signal.SIGTERM)
+
+    results = [
+        _check("flush explicite avant kill -9", after_crash["canvas_data"], {"step": "saved"}),
+        _check("version après kill -9", after_crash["canvas_version"], flushed["version"]),
+        _check("autosave en attente après SIGTERM", after_shutdown["canvas_data"], {"step": "graceful"}),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
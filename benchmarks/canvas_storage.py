@@ -0,0 +1,120 @@
+"""
+Benchmark du stockage des canvas : JSON brut contre CompressedJSON (deflate, zstd).
+
+Usage (base locale migrée, *jamais* en production) :
+    python -m benchmarks.canvas_storage --rows 2000 --objects 400
+
+Génère des canvas synthétiques (chemins SVG, blocs de texte) de `--objects` objets,
+puis mesure pour chaque codec : taille encodée, temps d'encodage et de décodage.
+Avec --database, écrit aussi `--rows` lignes dans deux tables temporaires (json et
+bytea) et compare la taille sur disque (TOAST compris) et les temps d'écriture et
+de lecture complète.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.models.types import decode_json, encode_json, zstandard
+
+FONTS = ["Montserrat", "Roboto", "Lobster", "Playfair Display", "Open Sans"]
+WORDS = "grande braderie annuelle samedi dimanche entrée libre buvette concert gratuit promo -50%".split()
+
+
+def make_canvas(objects: int, seed: int = 0) -> Dict[str, Any]:
+    """Canvas Fabric.js-like : mélange de chemins, de textes et d'images"""
+    rng = random.Random(seed)
+    items: List[Dict[str, Any]] = []
+    for i in range(objects):
+        kind = i % 3
+        base = {"left": rng.randint(0, 2480), "top": rng.randint(0, 3508), "angle": 0, "opacity": 1}
+        if kind == 0:
+            points = " ".join(f"L {rng.randint(0, 500)} {rng.randint(0, 500)}" for _ in range(rng.randint(5, 40)))
+            items.append({**base, "type": "path", "path": f"M 0 0 {points} Z", "fill": "#%06x" % rng.randint(0, 0xFFFFFF)})
+        elif kind == 1:
+            items.append({
+                **base, "type": "textbox", "text": " ".join(rng.choices(WORDS, k=rng.randint(2, 12))),
+                "fontFamily": rng.choice(FONTS), "fontSize": rng.randint(12, 96), "styles": {},
+            })
+        else:
+            items.append({**base, "type": "image", "src": f"https://res.cloudinary.com/demo/image/upload/v1/{i}.png"})
+    return {"version": "5.3.0", "background": "#ffffff", "objects": items}
+
+
+def _median_us(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1_000_000, 1)
+
+
+def bench_codecs(canvas: Dict[str, Any], repeat: int) -> List[Dict[str, Any]]:
+    raw = json.dumps(canvas).encode()
+    results = [{"codec": "json", "bytes": len(raw),
+                "encode_us": _median_us(lambda: json.dumps(canvas).encode(), repeat),
+                "decode_us": _median_us(lambda: json.loads(raw), repeat)}]
+    codecs = ["none", "deflate"] + (["zstd"] if zstandard is not None else [])
+    for codec in codecs:
+        encoded = encode_json(canvas, codec)
+        results.append({
+            "codec": codec, "bytes": len(encoded), "ratio": round(len(raw) / len(encoded), 2),
+            "encode_us": _median_us(lambda: encode_json(canvas, codec), repeat),
+            "decode_us": _median_us(lambda: decode_json(encoded), repeat),
+        })
+    return results
+
+
+def bench_database(rows: int, objects: int, codec: str) -> List[Dict[str, Any]]:
+    canvases = [make_canvas(objects, seed) for seed in range(min(rows, 50))]
+    results = []
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TEMP TABLE bench_canvas_json (id serial PRIMARY KEY, canvas_data json NOT NULL)"))
+        conn.execute(text("CREATE TEMP TABLE bench_canvas_bytea (id serial PRIMARY KEY, canvas_data bytea NOT NULL)"))
+        for table, encode, decode in (
+            ("bench_canvas_json", json.dumps, lambda value: value),
+            ("bench_canvas_bytea", lambda value: encode_json(value, codec), decode_json),
+        ):
+            start = time.perf_counter()
+            for offset in range(0, rows, 500):
+                batch = [{"data": encode(canvases[i % len(canvases)])} for i in range(offset, min(rows, offset + 500))]
+                conn.execute(text(f"INSERT INTO {table} (canvas_data) VALUES (:data)"), batch)
+            conn.commit()
+            write_ms = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            for (value,) in conn.execute(text(f"SELECT canvas_data FROM {table}")):
+                decode(value)
+            read_ms = (time.perf_counter() - start) * 1000
+
+            size = conn.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar()
+            results.append({
+                "table": table, "rows": rows, "total_bytes": size,
+                "write_ms": round(write_ms, 1), "read_decode_ms": round(read_ms, 1),
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=400, help="objets par canvas")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--database", action="store_true", help="mesurer aussi en base (tables temporaires)")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--codec", default="deflate", choices=["none", "deflate", "zstd"])
+    args = parser.parse_args()
+
+    report: Dict[str, Any] = {"codecs": bench_codecs(make_canvas(args.objects), args.repeat)}
+    if args.database:
+        report["database"] = bench_database(args.rows, args.objects, args.codec)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Vérifie, via EXPLAIN, que les getters CRUD s'appuient sur les index attendus.
+
+Usage (base locale migrée) :
+    python -m benchmarks.explain
+
+Les requêtes sont celles réellement construites par les getters (capturées avant
+exécution), puis expliquées sur le moteur synchrone avec enable_seqscan désactivé :
+sur une petite base le planner préférerait un seq scan, on vérifie donc que l'index
+est *utilisable*. Code de sortie 1 si un index attendu n'apparaît pas dans le plan.
+"""
+import asyncio
+import json
+import sys
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+
+from app.core.database import engine
+from app.crud.crud_project import project
+from app.crud.crud_shared_project import shared_project
+from app.crud.crud_template import template
+from app.crud.crud_user_asset import user_asset
+from app.crud.crud_users import user
+
+
+class _Captured(Exception):
+    pass
+
+
+class _CaptureSession:
+    """Fausse AsyncSession qui intercepte la requête construite par un getter"""
+
+    statement: Any = None
+
+    async def execute(self, statement, *args, **kwargs):
+        self.statement = statement
+        raise _Captured()
+
+
+async def capture_statement(getter: Callable[[Any], Awaitable[Any]]):
+    """Requête SQL construite par un getter CRUD, sans l'exécuter"""
+    session = _CaptureSession()
+    try:
+        await getter(session)
+    except _Captured:
+        pass
+    return session.statement
+
+
+CASES: List[Tuple[str, Callable[[Any], Awaitable[Any]]]] = [
+    ("ix_projects_owner_id_created_at_id", lambda db: project.get_user_projects(db, owner_id=1)),
+    ("ix_projects_public_created_at_id", lambda db: project.get_public_projects(db)),
+    ("ix_projects_format_type_created_at_id", lambda db: project.get_by_format(db, format_type="A5")),
+    ("ix_projects_search_vector", lambda db: project.search_projects(db, query="affiche")),
+    ("ix_templates_category_id_created_at_id", lambda db: template.get_by_category(db, category_id=1)),
+    ("ix_templates_active_created_at_id", lambda db: template.get_active_templates(db)),
+    ("ix_user_assets_user_id_created_at_id", lambda db: user_asset.get_by_user(db, user_id=1)),
+    ("ix_user_assets_user_id_file_type_created_at_id", lambda db: user_asset.get_user_assets_by_type(db, user_id=1, file_type="image")),
+    ("ix_user_assets_file_type_created_at_id", lambda db: user_asset.get_by_type(db, file_type="image")),
+    ("ix_shared_projects_user_shared_at_id", lambda db: shared_project.get_by_user(db, user_id=1)),
+    ("ix_shared_projects_project_shared_at_id", lambda db: shared_project.get_by_project(db, project_id=1)),
+    ("uq_shared_projects_user_project", lambda db: shared_project.get_user_project_permission(db, user_id=1, project_id=1)),
+    ("ix_users_google_id", lambda db: user.get_by_google_id(db, google_id="g-1")),
+    ("ix_users_active_created_at_id", lambda db: user.get_active_users(db)),
+]
+
+
+# Parcours d'index ordonnés : la pagination par clé lit l'index dans l'ordre, sans tri ni bitmap
+ORDERED_SCANS = ("Index Scan", "Index Only Scan")
+
+
+def index_scans(plan: Any) -> List[Tuple[str, str]]:
+    """Nœuds du plan (format JSON) qui lisent un index : (Node Type, Index Name)"""
+    scans = []
+    if isinstance(plan, dict):
+        if "Index Name" in plan:
+            scans.append((plan["Node Type"], plan["Index Name"]))
+        for value in plan.values():
+            scans.extend(index_scans(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            scans.extend(index_scans(value))
+    return scans
+
+
+def explain(conn: Connection, getter: Callable[[Any], Awaitable[Any]]) -> Any:
+    """Plan JSON de la requête d'un getter (connexion avec enable_seqscan = off)"""
+    statement = asyncio.run(capture_statement(getter))
+    compiled = statement.compile(dialect=postgresql.dialect())
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar_one()
+    return json.loads(plan) if isinstance(plan, str) else plan
+
+
+def main() -> int:
+    failures = 0
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        for expected, getter in CASES:
+            scans = index_scans(explain(conn, getter))
+            ok = expected in [name for _, name in scans]
+            failures += not ok
+            used = ", ".join(f"{name} ({node})" for node, name in scans)
+            print(f"{'OK  ' if ok else 'FAIL'} {expected:<50} plan: {used or 'seq scan'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
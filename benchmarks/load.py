@@ -0,0 +1,88 @@
+"""
+Mesure du débit (requêtes/seconde) d'un endpoint sous forte concurrence.
+
+Usage :
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.load --url http://localhost:8000/api/v1/projects/public --concurrency 200 --duration 30
+
+Lancer le script sur le commit précédent (endpoints sync + create_engine) puis
+sur la pile async pour comparer les req/s à concurrence égale.
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+import httpx
+
+
+def percentiles(latencies: List[float]) -> dict:
+    """p50, p95, p99 et maximum (en ms) d'une liste de durées en secondes"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    if not count:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+
+    def at(q: float) -> float:
+        return round(latencies[min(count - 1, int(count * q))] * 1000, 2)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(latencies[-1] * 1000, 2)}
+
+
+async def _worker(
+    client: httpx.AsyncClient, method: str, url: str, deadline: float, latencies: List[float], errors: List[int]
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url: str, concurrency: int, duration: float, token: Optional[str] = None, method: str = "GET") -> dict:
+    """Lancer `concurrency` clients en parallèle pendant `duration` secondes"""
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: List[float] = []
+    errors: List[int] = []
+
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30.0) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(
+            _worker(client, method, url, deadline, latencies, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    count = len(latencies)
+    return {
+        "method": method,
+        "url": url,
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": len(errors),
+        "requests_per_second": round(count / elapsed, 1) if elapsed else 0.0,
+        **percentiles(latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000/api/v1/projects/public")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--token", default=None, help="JWT d'accès pour les endpoints protégés")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, args.token, args.method))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
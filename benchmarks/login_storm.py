@@ -0,0 +1,105 @@
+"""
+Débit de /auth/login et latence des autres routes pendant une rafale de logins.
+
+Mesure d'abord la latence d'une route légère seule (--probe-url), puis la même
+latence pendant que `--login-concurrency` clients enchaînent des logins. Avec le
+hachage dans le pool de processus, la latence de la sonde doit rester stable ;
+les logins en excès reçoivent 503 (PASSWORD_HASH_MAX_QUEUE) au lieu de s'empiler.
+
+Usage :
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.login_storm --email a@b.fr --password secret
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+
+def _percentiles(latencies: List[float]) -> dict:
+    latencies = sorted(latencies)
+    count = len(latencies)
+    if not count:
+        return {"requests": 0, "p50_ms": None, "p99_ms": None}
+    return {
+        "requests": count,
+        "p50_ms": round(latencies[count // 2] * 1000, 2),
+        "p99_ms": round(latencies[min(count - 1, int(count * 0.99))] * 1000, 2),
+    }
+
+
+async def _probe(client: httpx.AsyncClient, url: str, deadline: float, latencies: List[float]) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(url)
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+
+
+async def _login(
+    client: httpx.AsyncClient, url: str, credentials: dict, deadline: float, statuses: Counter, latencies: List[float]
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post(url, json=credentials)
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - start)
+
+
+async def storm(
+    base_url: str, probe_url: str, email: str, password: str, login_concurrency: int, duration: float
+) -> dict:
+    """Sonde seule pendant `duration`, puis sonde + rafale de logins pendant `duration`"""
+    credentials = {"email": email, "password": password}
+    limits = httpx.Limits(max_connections=login_concurrency + 10)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        baseline: List[float] = []
+        await _probe(client, probe_url, time.perf_counter() + duration, baseline)
+
+        during: List[float] = []
+        logins: List[float] = []
+        statuses: Counter = Counter()
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            _probe(client, probe_url, deadline, during),
+            *(_login(client, "/api/v1/auth/login", credentials, deadline, statuses, logins)
+              for _ in range(login_concurrency)),
+        )
+        elapsed = time.perf_counter() - started
+
+    return {
+        "probe_url": probe_url,
+        "probe_baseline": _percentiles(baseline),
+        "probe_during_storm": _percentiles(during),
+        "login": {
+            **_percentiles(logins),
+            "logins_per_second": round(statuses[200] / elapsed, 1),
+            "statuses": dict(statuses),
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--probe-url", default="/api/v1/categories/")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--login-concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(storm(
+        args.base_url, args.probe_url, args.email, args.password, args.login_concurrency, args.duration
+    ))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
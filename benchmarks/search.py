@@ -0,0 +1,84 @@
+"""
+Benchmark de la recherche : ILIKE '%q%' (ancien chemin) contre tsvector + GIN.
+
+Usage (base locale migrée, *jamais* en production) :
+    python -m benchmarks.search --rows 1000000 --query "affiche concert"
+
+Le script insère `--rows` projets synthétiques (generate_series) s'ils ne sont pas déjà
+présents, lance ANALYZE puis affiche le plan et le temps médian de chaque requête.
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.crud.search import to_prefix_tsquery
+
+WORDS = "affiche concert festival soldes promo menu restaurant salon mariage vide-grenier brocante yoga"
+
+SEED_SQL = """
+INSERT INTO users (email, full_name, is_active, is_verified, created_at)
+SELECT 'bench-search@example.com', 'Bench Search', true, true, now()
+WHERE NOT EXISTS (SELECT 1 FROM users WHERE email = 'bench-search@example.com');
+
+INSERT INTO projects (title, description, canvas_data, is_public, format_type, created_at, updated_at, owner_id)
+SELECT
+    initcap((string_to_array(:words, ' '))[1 + (g % 12)]) || ' ' || g,
+    'Flyer ' || (string_to_array(:words, ' '))[1 + ((g / 12) % 12)] || ' pour la ville ' || (g % 500),
+    '{}'::json, g % 3 = 0, 'A4', now() - g * interval '1 second', now(),
+    (SELECT id FROM users WHERE email = 'bench-search@example.com')
+FROM generate_series(1, :rows) AS g;
+"""
+
+ILIKE_SQL = """
+SELECT id FROM projects
+WHERE title ILIKE :pattern OR description ILIKE :pattern
+LIMIT 50
+"""
+
+TSVECTOR_SQL = """
+SELECT id, ts_rank_cd(search_vector, q) AS rank
+FROM projects, to_tsquery('french'::regconfig, :ts) || to_tsquery('english'::regconfig, :ts) AS q
+WHERE search_vector @@ q
+ORDER BY rank DESC, id DESC
+LIMIT 50
+"""
+
+
+def _time(conn, sql: str, params: dict, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--query", default="affiche concert")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        count = conn.execute(text("SELECT count(*) FROM projects")).scalar_one()
+        if count < args.rows:
+            print(f"Insertion de {args.rows - count} projets...")
+            for statement in SEED_SQL.strip().split(";\n\n"):
+                conn.execute(text(statement), {"words": WORDS, "rows": args.rows - count})
+        conn.execute(text("ANALYZE projects"))
+
+    ilike_params = {"pattern": f"%{args.query}%"}
+    ts_params = {"ts": to_prefix_tsquery(args.query)}
+    with engine.connect() as conn:
+        for name, sql, params in (("ilike", ILIKE_SQL, ilike_params), ("tsvector", TSVECTOR_SQL, ts_params)):
+            plan = conn.execute(text("EXPLAIN ANALYZE " + sql), params).scalars().all()
+            print(f"--- {name}: médiane {_time(conn, sql, params, args.repeat):.2f} ms")
+            print("\n".join(plan))
+
+
+if __name__ == "__main__":
+    main()
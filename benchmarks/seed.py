@@ -0,0 +1,180 @@
+"""
+Jeu de données synthétique pour les benchmarks de bout en bout (voir benchmarks/suite.py).
+
+Usage (base locale migrée, *jamais* en production) :
+    python -m benchmarks.seed --users 200 --projects-per-user 20 --objects 200
+    python -m benchmarks.seed --reset ...   # supprime d'abord les données bench-* existantes
+
+Crée des utilisateurs bench-<n>@example.com (mot de passe --password), des catégories et
+templates bench-*, des projets aux canvas de taille réaliste (--objects en moyenne, entre
+un quart et le double), un tiers publics, des partages entre utilisateurs et des assets
+(compteurs d'usage du stockage compris). Même --seed = mêmes données : les runs restent
+comparables. Affiche en JSON les volumes créés et la durée du seeding.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Sequence
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.engine import Connection
+
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.models.models import Category, Project, SharedProject, Template, User, UserAsset, UserStorageUsage
+from benchmarks.canvas_storage import WORDS, make_canvas
+
+BENCH_EMAIL = "bench-{}@example.com"
+BENCH_PREFIX = "bench-"
+PERMISSIONS = ["view", "view", "copy", "edit"]
+FILE_TYPES = [("image", ".png", 50_000, 4_000_000), ("document", ".pdf", 20_000, 2_000_000), ("video", ".mp4", 1_000_000, 20_000_000)]
+
+
+def _batches(rows: Sequence[Dict[str, Any]], size: int) -> Iterable[Sequence[Dict[str, Any]]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(conn: Connection, table: Any, rows: List[Dict[str, Any]], batch_size: int = 1000) -> List[int]:
+    """INSERT multi-lignes par lots, retourne les ids dans l'ordre des lignes"""
+    ids: List[int] = []
+    for batch in _batches(rows, batch_size):
+        result = conn.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), list(batch))
+        ids.extend(result.scalars().all())
+    return ids
+
+
+def reset(conn: Connection) -> None:
+    """Supprimer les données bench-* (ordre des clés étrangères)"""
+    bench_users = select(User.id).where(User.email.like(f"{BENCH_PREFIX}%@example.com")).scalar_subquery()
+    bench_projects = select(Project.id).where(Project.owner_id.in_(bench_users)).scalar_subquery()
+    conn.execute(delete(SharedProject).where(
+        SharedProject.project_id.in_(bench_projects) | SharedProject.shared_with_user_id.in_(bench_users)
+    ))
+    conn.execute(delete(Project).where(Project.owner_id.in_(bench_users)))
+    conn.execute(delete(UserAsset).where(UserAsset.user_id.in_(bench_users)))
+    conn.execute(delete(UserStorageUsage).where(UserStorageUsage.user_id.in_(bench_users)))
+    conn.execute(delete(User).where(User.id.in_(bench_users)))
+    bench_categories = select(Category.id).where(Category.name.like(f"{BENCH_PREFIX}%")).scalar_subquery()
+    conn.execute(delete(Template).where(Template.category_id.in_(bench_categories)))
+    conn.execute(delete(Category).where(Category.id.in_(bench_categories)))
+
+
+def seed(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    now = datetime.now()
+    # Quelques canvas de référence réutilisés : le seeding reste rapide, les tailles varient
+    canvases = [
+        make_canvas(max(1, int(args.objects * factor)), seed=args.seed + i)
+        for i, factor in enumerate([0.25, 0.5, 0.75, 1.0, 1.0, 1.0, 1.25, 1.5, 2.0])
+    ]
+
+    with engine.begin() as conn:
+        if args.reset:
+            reset(conn)
+        elif conn.scalar(select(User.id).where(User.email == BENCH_EMAIL.format(0))) is not None:
+            raise SystemExit("Bench data already present: use --reset to recreate it")
+
+        password_hash = get_password_hash(args.password)
+        user_ids = _insert(conn, User.__table__, [
+            {
+                "email": BENCH_EMAIL.format(i), "full_name": f"Bench User {i}", "password_hash": password_hash,
+                "is_active": True, "is_verified": True, "created_at": now - timedelta(days=rng.randint(0, 365)),
+            }
+            for i in range(args.users)
+        ])
+
+        category_ids = _insert(conn, Category.__table__, [
+            {"name": f"{BENCH_PREFIX}{i}-{WORDS[i % len(WORDS)]}", "color": "#%06x" % rng.randint(0, 0xFFFFFF), "is_active": True}
+            for i in range(args.categories)
+        ])
+        _insert(conn, Template.__table__, [
+            {
+                "title": f"{WORDS[i % len(WORDS)].capitalize()} {i}", "description": " ".join(rng.choices(WORDS, k=6)),
+                "canvas_data": rng.choice(canvases), "thumbnail_url": f"https://example.com/templates/{i}.png",
+                "category_id": rng.choice(category_ids), "is_active": True,
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(args.templates)
+        ], batch_size=200)
+
+        project_rows = []
+        for owner_id in user_ids:
+            for j in range(args.projects_per_user):
+                created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+                project_rows.append({
+                    "title": f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {j}",
+                    "description": " ".join(rng.choices(WORDS, k=rng.randint(3, 12))),
+                    "canvas_data": rng.choice(canvases), "is_public": rng.random() < 1 / 3,
+                    "format_type": rng.choice(["A4", "A4", "A5"]), "owner_id": owner_id,
+                    "created_at": created_at, "updated_at": created_at,
+                })
+        project_ids = _insert(conn, Project.__table__, project_rows, batch_size=200)
+        owners = {project_id: row["owner_id"] for project_id, row in zip(project_ids, project_rows)}
+
+        share_rows = []
+        for user_id in user_ids:
+            # Échantillon sans doublon ; les projets de l'utilisateur lui-même sont écartés
+            sample = rng.sample(project_ids, min(len(project_ids), args.shares_per_user + args.projects_per_user))
+            for project_id in [p for p in sample if owners[p] != user_id][:args.shares_per_user]:
+                share_rows.append({
+                    "shared_with_user_id": user_id, "project_id": project_id,
+                    "permission": rng.choice(PERMISSIONS), "shared_at": now - timedelta(minutes=rng.randint(0, 10_000)),
+                })
+        _insert(conn, SharedProject.__table__, share_rows)
+
+        asset_rows = []
+        for user_id in user_ids:
+            for j in range(args.assets_per_user):
+                file_type, ext, low, high = rng.choice(FILE_TYPES)
+                asset_rows.append({
+                    "filename": f"assets/{user_id}/bench-{j}{ext}", "original_filename": f"{rng.choice(WORDS)}-{j}{ext}",
+                    "cloudinary_url": f"https://example.com/assets/{user_id}/{j}{ext}", "file_type": file_type,
+                    "file_size": rng.randint(low, high), "user_id": user_id,
+                    "created_at": now - timedelta(minutes=rng.randint(0, 10_000)),
+                })
+        _insert(conn, UserAsset.__table__, asset_rows)
+        # Compteurs d'usage cohérents avec les assets insérés hors CRUD
+        conn.execute(text("""
+            INSERT INTO user_storage_usage (user_id, file_type, total_bytes, asset_count)
+            SELECT user_id, file_type, sum(file_size), count(*) FROM user_assets
+            WHERE user_id = ANY(:user_ids) GROUP BY user_id, file_type
+        """), {"user_ids": user_ids})
+
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE"))
+
+    return {
+        "seed": args.seed,
+        "users": len(user_ids),
+        "categories": len(category_ids),
+        "templates": args.templates,
+        "projects": len(project_ids),
+        "shares": len(share_rows),
+        "assets": len(asset_rows),
+        "canvas_objects": [len(canvas["objects"]) for canvas in canvases],
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--projects-per-user", type=int, default=20)
+    parser.add_argument("--objects", type=int, default=200, help="objets par canvas (moyenne)")
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--templates", type=int, default=200)
+    parser.add_argument("--shares-per-user", type=int, default=5)
+    parser.add_argument("--assets-per-user", type=int, default=20)
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reset", action="store_true", help="supprimer les données bench-* existantes avant")
+    args = parser.parse_args()
+    print(json.dumps(seed(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark de la sérialisation d'une page de /projects/public (par 100 lignes).
+
+Usage :
+    python -m benchmarks.serialization --rows 100 --objects 400
+
+Construit `--rows` objets Project (avec leur owner) en mémoire, sans base, et compare :
+- default : pipeline standard de FastAPI (validation du response_model, jsonable
+  puis JSONResponse / json.dumps) ;
+- orjson : même pipeline, rendu par ORJSONResponse ;
+- fast : chemin FAST_JSON_RESPONSES (TypeAdapter en cache, dump_json direct).
+Mesuré pour ProjectSummary (réponse par défaut de /projects/public) et pour
+ProjectResponse (canvas complet, fields=...,canvas_data ou GET /projects/{id}).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.serialization import dump_json
+from app.models.models import Project, User
+from app.schemas.schemas import Page, ProjectResponse, ProjectSummary
+from benchmarks.canvas_storage import make_canvas
+
+
+def make_page(rows: int, objects: int) -> Dict[str, Any]:
+    owner = User(id=1, email="bench@example.com", full_name="Bench", is_active=True, is_verified=True,
+                 created_at=datetime.now())
+    items = [
+        Project(
+            id=i, title=f"Flyer {i}", description="Braderie annuelle", canvas_data=make_canvas(objects, i),
+            canvas_version=1, is_public=True, format_type="A4", thumbnail_url=None, owner_id=1, owner=owner,
+            created_at=datetime.now(), updated_at=datetime.now(),
+        )
+        for i in range(rows)
+    ]
+    return {"items": items, "next_cursor": None}
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def bench(response_type: Any, page: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    field = create_model_field(name="Response", type_=response_type, mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def standard(response_class) -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=page))
+        return response_class(content).body
+
+    try:
+        return {
+            "default_ms": _median_ms(lambda: standard(JSONResponse), repeat),
+            "orjson_ms": _median_ms(lambda: standard(ORJSONResponse), repeat),
+            "fast_ms": _median_ms(lambda: dump_json(response_type, page), repeat),
+            "body_bytes": len(dump_json(response_type, page)),
+        }
+    finally:
+        loop.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--objects", type=int, default=400, help="objets par canvas")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    page = make_page(args.rows, args.objects)
+    report: List[Dict[str, Any]] = []
+    for name, response_type in (("ProjectSummary", Page[ProjectSummary]), ("ProjectResponse", Page[ProjectResponse])):
+        report.append({"schema": name, "rows": args.rows, **bench(response_type, page, args.repeat)})
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Suite de benchmarks de bout en bout : principaux parcours de l'éditeur sous concurrence.
+
+Usage (base locale, *jamais* en production) :
+    python -m benchmarks.seed --users 200 --projects-per-user 20 --objects 200
+    uvicorn app.main:app --workers 1 &
+    python -m benchmarks.suite --output runs/$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --compare runs/<commit précédent>.json
+
+Parcours (--flows), chacun --duration secondes avec --concurrency clients, l'un après l'autre :
+    login      POST /auth/login (bcrypt : débit borné par le pool de hachage)
+    dashboard  GET /me/dashboard
+    gallery    GET /projects/public en suivant next_cursor (jusqu'à --gallery-pages pages)
+    autosave   PUT /projects/{id}/autosave d'un canvas de --objects objets, projet de l'utilisateur
+    search     GET /projects/?search=<mot>
+
+Chaque client joue un utilisateur seedé (bench-<n>@example.com). Le résultat JSON donne par
+parcours le débit, p50/p95/p99, les statuts en erreur et, si l'API publie l'en-tête
+Server-Timing, le nombre moyen de requêtes SQL et le temps moyen en base. Avec --compare,
+les écarts de débit et de p95 par rapport à un run précédent sont ajoutés au rapport.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import subprocess
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.canvas_storage import WORDS, make_canvas
+from benchmarks.load import percentiles
+from benchmarks.seed import BENCH_EMAIL
+
+SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+@dataclass
+class BenchUser:
+    email: str
+    token: str
+    id: int
+    project_ids: List[int] = field(default_factory=list)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+@dataclass
+class Context:
+    users: List[BenchUser]
+    password: str
+    canvas: Dict[str, Any]
+    gallery_pages: int
+
+
+Flow = Callable[[httpx.AsyncClient, Context, random.Random, Dict[str, Any]], Awaitable[httpx.Response]]
+
+
+async def flow_login(client: httpx.AsyncClient, ctx: Context, rng: random.Random, state: Dict[str, Any]) -> httpx.Response:
+    user = rng.choice(ctx.users)
+    return await client.post("/api/v1/auth/login", json={"email": user.email, "password": ctx.password})
+
+
+async def flow_dashboard(client: httpx.AsyncClient, ctx: Context, rng: random.Random, state: Dict[str, Any]) -> httpx.Response:
+    return await client.get("/api/v1/me/dashboard", headers=rng.choice(ctx.users).headers)
+
+
+async def flow_gallery(client: httpx.AsyncClient, ctx: Context, rng: random.Random, state: Dict[str, Any]) -> httpx.Response:
+    params = {"limit": 24}
+    if state.get("cursor"):
+        params["cursor"] = state["cursor"]
+    response = await client.get("/api/v1/projects/public", params=params)
+    state["pages"] = state.get("pages", 0) + 1
+    next_cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+    if next_cursor is None or state["pages"] >= ctx.gallery_pages:
+        state.clear()
+    else:
+        state["cursor"] = next_cursor
+    return response
+
+
+async def flow_autosave(client: httpx.AsyncClient, ctx: Context, rng: random.Random, state: Dict[str, Any]) -> httpx.Response:
+    user = rng.choice([user for user in ctx.users if user.project_ids])
+    project_id = rng.choice(user.project_ids)
+    return await client.put(f"/api/v1/projects/{project_id}/autosave", json={"canvas_data": ctx.canvas}, headers=user.headers)
+
+
+async def flow_search(client: httpx.AsyncClient, ctx: Context, rng: random.Random, state: Dict[str, Any]) -> httpx.Response:
+    return await client.get("/api/v1/projects/", params={"search": rng.choice(WORDS), "limit": 20})
+
+
+FLOWS: Dict[str, Flow] = {
+    "login": flow_login,
+    "dashboard": flow_dashboard,
+    "gallery": flow_gallery,
+    "autosave": flow_autosave,
+    "search": flow_search,
+}
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    for _ in range(20):
+        response = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+        if response.status_code != 503:  # file du pool de hachage pleine : réessayer
+            response.raise_for_status()
+            return response.json()["access_token"]
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Login kept failing with 503 for {email}")
+
+
+async def prepare(client: httpx.AsyncClient, users: int, password: str) -> List[BenchUser]:
+    """Connecter les utilisateurs seedés et récupérer quelques-uns de leurs projets"""
+    slots = asyncio.Semaphore(8)
+
+    async def prepare_user(index: int) -> BenchUser:
+        email = BENCH_EMAIL.format(index)
+        async with slots:
+            token = await _login(client, email, password)
+        headers = {"Authorization": f"Bearer {token}"}
+        me = (await client.get("/api/v1/auth/me", headers=headers)).raise_for_status().json()
+        projects = (await client.get(
+            f"/api/v1/projects/user/{me['id']}", params={"limit": 20, "fields": "id"}
+        )).raise_for_status().json()
+        return BenchUser(email=email, token=token, id=me["id"], project_ids=[p["id"] for p in projects["items"]])
+
+    return list(await asyncio.gather(*(prepare_user(index) for index in range(users))))
+
+
+async def run_flow(
+    client: httpx.AsyncClient, name: str, ctx: Context, concurrency: int, duration: float, seed: int
+) -> Dict[str, Any]:
+    """Lancer `concurrency` clients sur un parcours pendant `duration` secondes"""
+    flow = FLOWS[name]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    db_ms: List[float] = []
+    db_queries: List[int] = []
+
+    async def worker(rng: random.Random, deadline: float) -> None:
+        state: Dict[str, Any] = {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await flow(client, ctx, rng, state)
+            except httpx.HTTPError:
+                statuses["transport_error"] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] += 1
+            timing = SERVER_TIMING_RE.search(response.headers.get("server-timing", ""))
+            if timing:
+                db_ms.append(float(timing.group(1)))
+                db_queries.append(int(timing.group(2)))
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(random.Random(seed * 1000 + i), deadline) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    errors = {status: count for status, count in statuses.items() if not status.startswith(("2", "3"))}
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        **percentiles(latencies),
+        "errors": sum(errors.values()),
+        "error_statuses": errors,
+        "db_queries_avg": round(sum(db_queries) / len(db_queries), 2) if db_queries else None,
+        "db_ms_avg": round(sum(db_ms) / len(db_ms), 2) if db_ms else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Écarts en % du débit et du p95 par rapport à un run précédent (positif = plus de débit / plus lent)"""
+    def change(new: Optional[float], old: Optional[float]) -> Optional[float]:
+        return round((new - old) / old * 100, 1) if new is not None and old else None
+
+    return {
+        name: {
+            "requests_per_second_pct": change(result["requests_per_second"], baseline["flows"][name]["requests_per_second"]),
+            "p95_pct": change(result["p95_ms"], baseline["flows"][name]["p95_ms"]),
+        }
+        for name, result in report["flows"].items() if name in baseline.get("flows", {})
+    }
+
+
+async def bench(args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency + 8, max_keepalive_connections=args.concurrency + 8)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60.0) as client:
+        users = await prepare(client, args.users, args.password)
+        ctx = Context(users=users, password=args.password, canvas=make_canvas(args.objects, seed=args.seed), gallery_pages=args.gallery_pages)
+        report: Dict[str, Any] = {
+            "label": args.label,
+            "git_commit": _git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "users": len(users),
+            "canvas_objects": args.objects,
+            "flows": {},
+        }
+        for name in args.flows.split(","):
+            report["flows"][name] = await run_flow(client, name, ctx, args.concurrency, args.duration, args.seed)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--flows", default=",".join(FLOWS), help="parcours séparés par des virgules")
+    parser.add_argument("--users", type=int, default=50, help="utilisateurs seedés utilisés par les clients")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="secondes par parcours")
+    parser.add_argument("--objects", type=int, default=200, help="objets du canvas envoyé par autosave")
+    parser.add_argument("--gallery-pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default=None, help="libellé du run (branche, réglage testé...)")
+    parser.add_argument("--output", default=None, help="écrire aussi le rapport JSON dans ce fichier")
+    parser.add_argument("--compare", default=None, help="rapport JSON d'un run précédent")
+    args = parser.parse_args()
+
+    unknown = set(args.flows.split(",")) - FLOWS.keys()
+    if unknown:
+        parser.error(f"unknown flows: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(bench(args))
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Export et import administrateur des données (sauvegardes, demandes de portabilité).
+
+Usage :
+    python data_export.py export --output backup.zip                      # tous les projets, templates et assets
+    python data_export.py export --user-id 42 --format ndjson --output -  # un utilisateur, sur la sortie standard
+    python data_export.py import backup.zip --user-id 42 [--no-quota]
+
+L'export lit par curseur côté serveur et écrit lot par lot (voir app/services/portability.py) :
+la mémoire reste constante quelle que soit la volumétrie. L'import rattache projets et assets à
+--user-id (nouveaux ids) et importe aussi les templates dont la catégorie existe ; le rapport
+est affiché en JSON.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.database import async_engine
+from app.services.portability import (
+    RECORD_TYPES, USER_TYPES, export_ndjson, export_zip, import_records, ndjson_records, zip_records,
+)
+
+async def export(user_id, fmt: str, output: str) -> None:
+    types = USER_TYPES if user_id is not None else tuple(RECORD_TYPES)
+    chunks = export_zip(user_id, types) if fmt == "zip" else export_ndjson(user_id, types)
+    out = sys.stdout.buffer if output == "-" else open(output, "wb")
+    try:
+        async for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    await async_engine.dispose()
+
+async def _file_chunks(path: str):
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            yield chunk
+
+async def import_file(path: str, user_id: int, quota: int) -> dict:
+    records = zip_records(path) if path.endswith(".zip") else ndjson_records(_file_chunks(path))
+    result = await import_records(records, user_id=user_id, templates=True, quota=quota)
+    await async_engine.dispose()
+    return {**result, "errors": [error.model_dump() for error in result["errors"]]}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export / import en flux des projets, templates et assets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export")
+    export_parser.add_argument("--user-id", type=int, default=None, help="un seul utilisateur (sans les templates)")
+    export_parser.add_argument("--format", choices=("ndjson", "zip"), default="zip")
+    export_parser.add_argument("--output", required=True, help="fichier de sortie, - pour la sortie standard")
+    import_parser = commands.add_parser("import")
+    import_parser.add_argument("path", help="export .zip ou .ndjson")
+    import_parser.add_argument("--user-id", type=int, required=True, help="propriétaire des projets et assets importés")
+    import_parser.add_argument("--no-quota", action="store_true", help="ignorer le quota de stockage")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        asyncio.run(export(args.user_id, args.format, args.output))
+    else:
+        quota = 0 if args.no_quota else settings.STORAGE_QUOTA_BYTES
+        result = asyncio.run(import_file(args.path, args.user_id, quota))
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if result["error_count"] else 0)
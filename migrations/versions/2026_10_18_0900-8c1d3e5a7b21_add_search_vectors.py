@@ -0,0 +1,42 @@
+"""Add full-text search vectors on projects and templates
+
+Revision ID: 8c1d3e5a7b21
+Revises: 2f82e35fc74c
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1d3e5a7b21'
+down_revision = '2f82e35fc74c'
+branch_labels = None
+depends_on = None
+
+# Titre pondéré A, description B, racinisés en français et en anglais
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('french', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('french', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    for table in ('projects', 'templates'):
+        op.add_column(table, sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_SQL, persisted=True),
+            nullable=True,
+        ))
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    for table in ('templates', 'projects'):
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,67 @@
+"""Add indexes for CRUD query patterns
+
+Revision ID: 4e7f9a2c6d13
+Revises: 8c1d3e5a7b21
+Create Date: 2026-10-18 09:30:00.000000
+
+Les index sont construits avec CREATE INDEX CONCURRENTLY (hors transaction) pour
+pouvoir appliquer la migration sur une base en production sans bloquer les écritures.
+Ils suivent l'ordre de pagination par curseur (colonne de date, id).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e7f9a2c6d13'
+down_revision = '8c1d3e5a7b21'
+branch_labels = None
+depends_on = None
+
+# (nom, table, colonnes, unique, clause WHERE partielle)
+INDEXES = [
+    ('ix_users_google_id', 'users', ['google_id'], True, 'google_id IS NOT NULL'),
+    ('ix_users_created_at_id', 'users', ['created_at', 'id'], False, None),
+    ('ix_users_active_created_at_id', 'users', ['created_at', 'id'], False, 'is_active'),
+    ('ix_projects_created_at_id', 'projects', ['created_at', 'id'], False, None),
+    ('ix_projects_owner_id_created_at_id', 'projects', ['owner_id', 'created_at', 'id'], False, None),
+    ('ix_projects_public_created_at_id', 'projects', ['created_at', 'id'], False, 'is_public'),
+    ('ix_projects_format_type_created_at_id', 'projects', ['format_type', 'created_at', 'id'], False, None),
+    ('ix_templates_created_at_id', 'templates', ['created_at', 'id'], False, None),
+    ('ix_templates_category_id_created_at_id', 'templates', ['category_id', 'created_at', 'id'], False, None),
+    ('ix_templates_active_created_at_id', 'templates', ['created_at', 'id'], False, 'is_active'),
+    ('ix_user_assets_created_at_id', 'user_assets', ['created_at', 'id'], False, None),
+    ('ix_user_assets_user_id_created_at_id', 'user_assets', ['user_id', 'created_at', 'id'], False, None),
+    ('ix_user_assets_user_id_file_type_created_at_id', 'user_assets', ['user_id', 'file_type', 'created_at', 'id'], False, None),
+    ('ix_user_assets_file_type_created_at_id', 'user_assets', ['file_type', 'created_at', 'id'], False, None),
+    ('uq_shared_projects_user_project', 'shared_projects', ['shared_with_user_id', 'project_id'], True, None),
+    ('ix_shared_projects_user_shared_at_id', 'shared_projects', ['shared_with_user_id', 'shared_at', 'id'], False, None),
+    ('ix_shared_projects_project_shared_at_id', 'shared_projects', ['project_id', 'shared_at', 'id'], False, None),
+]
+
+
+def upgrade() -> None:
+    # Supprimer les partages en double avant de créer l'index unique (on garde le plus ancien)
+    op.execute("""
+        DELETE FROM shared_projects a
+        USING shared_projects b
+        WHERE a.shared_with_user_id = b.shared_with_user_id
+          AND a.project_id = b.project_id
+          AND a.id > b.id
+    """)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique, where in INDEXES:
+            # Un CONCURRENTLY interrompu laisse un index INVALID : on le supprime avant de réessayer
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.create_index(
+                name, table, columns, unique=unique,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,24 @@
+"""Add users.token_version
+
+Revision ID: b5d2f0c41e87
+Revises: 4e7f9a2c6d13
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d2f0c41e87'
+down_revision = '4e7f9a2c6d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
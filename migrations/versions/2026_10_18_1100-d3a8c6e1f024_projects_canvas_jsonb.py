@@ -0,0 +1,40 @@
+"""Store projects.canvas_data as JSONB and add canvas_version
+
+Revision ID: d3a8c6e1f024
+Revises: b5d2f0c41e87
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8c6e1f024'
+down_revision = 'b5d2f0c41e87'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Réécriture de la table (ACCESS EXCLUSIVE) : à lancer hors des heures de pointe
+    op.alter_column(
+        'projects', 'canvas_data',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        existing_nullable=False,
+        postgresql_using='canvas_data::jsonb',
+    )
+    op.add_column('projects', sa.Column('canvas_version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('projects', 'canvas_version')
+    op.alter_column(
+        'projects', 'canvas_data',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using='canvas_data::json',
+    )
@@ -0,0 +1,122 @@
+"""Store templates.canvas_data compressed (bytea) and use lz4 TOAST for projects
+
+Revision ID: 7a4e2b9d5c30
+Revises: d3a8c6e1f024
+Create Date: 2026-10-18 12:00:00.000000
+
+Le canvas des templates est réécrit par lots dans une nouvelle colonne bytea
+(format de app/models/types.py, codec deflate) : chaque lot est une
+transaction courte, la table reste accessible pendant le backfill. Les colonnes
+sont échangées à la fin, une fois toutes les lignes converties.
+
+projects.canvas_data reste en JSONB (patchs appliqués en base) : on passe sa
+compression TOAST à lz4 (Postgres 14+), plus rapide que pglz ; seules les valeurs
+réécrites ensuite en bénéficient.
+"""
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+try:
+    import zstandard
+except ImportError:  # dépendance optionnelle (extra "zstd")
+    zstandard = None
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4e2b9d5c30'
+down_revision = 'd3a8c6e1f024'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# Format de app/models/types.py figé à cette révision (en-tête "CJ", version 1) : la migration
+# ne doit pas changer si le module ou les réglages de l'application évoluent
+MAGIC = b"CJ"
+FORMAT_VERSION = 1
+CODEC_NONE, CODEC_DEFLATE, CODEC_ZSTD = 0, 1, 2
+
+
+def encode_json(value) -> bytes:
+    """JSON compact compressé en deflate (niveau 6), précédé de l'en-tête de format"""
+    raw = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+    return MAGIC + bytes((FORMAT_VERSION, CODEC_DEFLATE)) + zlib.compress(raw, 6)
+
+
+def decode_json(data: bytes):
+    """Décoder une valeur de la colonne compressée, quel que soit le codec de l'application à l'écriture"""
+    data = bytes(data)
+    if data[:2] != MAGIC:
+        return json.loads(data)
+    version, codec, payload = data[2], data[3], data[4:]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported canvas format version: {version}")
+    if codec == CODEC_DEFLATE:
+        payload = zlib.decompress(payload)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Reading zstd-compressed canvas requires the 'zstandard' package")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec != CODEC_NONE:
+        raise ValueError(f"Unknown canvas codec id: {codec}")
+    return json.loads(payload)
+
+
+def _backfill(select_sql: str, update_sql: str, convert) -> None:
+    """Convertir les lignes par lots, chaque lot dans sa propre transaction (autocommit)"""
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        while True:
+            rows = bind.execute(sa.text(select_sql), {"limit": BATCH_SIZE}).fetchall()
+            if not rows:
+                break
+            values = ", ".join(f"(:id{i}, :value{i})" for i in range(len(rows)))
+            params = {}
+            for i, (id_, value) in enumerate(rows):
+                params[f"id{i}"] = id_
+                params[f"value{i}"] = convert(value)
+            bind.execute(sa.text(update_sql.format(values=values)), params)
+
+
+def _set_projects_compression(method: str) -> None:
+    """SET COMPRESSION (Postgres 14+, lz4 selon la compilation du serveur) : ignoré si indisponible"""
+    bind = op.get_bind()
+    if bind.dialect.server_version_info[0] < 14:
+        return
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text(f"ALTER TABLE projects ALTER COLUMN canvas_data SET COMPRESSION {method}"))
+    except sa.exc.DBAPIError:
+        pass
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS : le backfill est validé lot par lot, une migration interrompue reprend où elle s'est arrêtée
+    op.execute("ALTER TABLE templates ADD COLUMN IF NOT EXISTS canvas_data_compressed BYTEA")
+    _backfill(
+        "SELECT id, canvas_data FROM templates WHERE canvas_data_compressed IS NULL ORDER BY id LIMIT :limit",
+        "UPDATE templates AS t SET canvas_data_compressed = v.value::bytea "
+        "FROM (VALUES {values}) AS v(id, value) WHERE t.id = v.id",
+        encode_json,
+    )
+    op.drop_column('templates', 'canvas_data')
+    op.alter_column('templates', 'canvas_data_compressed', new_column_name='canvas_data', nullable=False)
+
+    _set_projects_compression('lz4')
+
+
+def downgrade() -> None:
+    _set_projects_compression('pglz')
+
+    op.execute("ALTER TABLE templates ADD COLUMN IF NOT EXISTS canvas_data_json JSON")
+    _backfill(
+        "SELECT id, canvas_data FROM templates WHERE canvas_data_json IS NULL ORDER BY id LIMIT :limit",
+        "UPDATE templates AS t SET canvas_data_json = v.value::json "
+        "FROM (VALUES {values}) AS v(id, value) WHERE t.id = v.id",
+        lambda value: json.dumps(decode_json(value), ensure_ascii=False),
+    )
+    op.drop_column('templates', 'canvas_data')
+    op.alter_column('templates', 'canvas_data_json', new_column_name='canvas_data', nullable=False)
@@ -0,0 +1,31 @@
+"""Add user_assets.content_hash for upload deduplication
+
+Revision ID: e61b7c9a4f52
+Revises: 7a4e2b9d5c30
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e61b7c9a4f52'
+down_revision = '7a4e2b9d5c30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user_assets', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # Un même fichier (SHA-256) n'est enregistré qu'une fois par utilisateur ; les assets
+    # antérieurs, sans empreinte, ne sont pas concernés
+    op.create_index(
+        'uq_user_assets_user_id_content_hash', 'user_assets', ['user_id', 'content_hash'],
+        unique=True, postgresql_where=sa.text('content_hash IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_user_assets_user_id_content_hash', table_name='user_assets')
+    op.drop_column('user_assets', 'content_hash')
@@ -0,0 +1,38 @@
+"""Add user_storage_usage counters
+
+Revision ID: a9c4e7d21b63
+Revises: e61b7c9a4f52
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c4e7d21b63'
+down_revision = 'e61b7c9a4f52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_storage_usage',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('file_type', sa.String(), nullable=False),
+        sa.Column('total_bytes', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('asset_count', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'file_type'),
+    )
+    # Compteurs initiaux ; les écarts ultérieurs sont corrigés par reconcile_storage_usage.py
+    op.execute(
+        "INSERT INTO user_storage_usage (user_id, file_type, total_bytes, asset_count) "
+        "SELECT user_id, file_type, sum(file_size), count(*) FROM user_assets "
+        "WHERE user_id IS NOT NULL GROUP BY user_id, file_type"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_storage_usage')
@@ -0,0 +1,49 @@
+"""
+Réconciliation des compteurs d'usage du stockage (user_storage_usage) avec user_assets.
+
+Usage :
+    python reconcile_storage_usage.py [--batch-size 500] [--dry-run]
+
+Parcourt les utilisateurs par lots (une transaction par lot), recalcule octets et nombre
+d'assets par type de fichier, corrige les compteurs (sauf --dry-run) et affiche les écarts
+en JSON. Peut tourner pendant le trafic : chaque lot verrouille brièvement ses utilisateurs.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal, async_engine
+from app.crud.crud_storage_usage import storage_usage
+from app.models.models import User
+
+async def reconcile(batch_size: int, fix: bool) -> dict:
+    report = {"users_checked": 0, "batches": 0, "fixed": fix, "drift": []}
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            user_ids = list((await db.execute(
+                select(User.id).where(User.id > last_id).order_by(User.id).limit(batch_size)
+            )).scalars().all())
+            if not user_ids:
+                break
+            report["drift"].extend(await storage_usage.reconcile_batch(db, user_ids=user_ids, fix=fix))
+        report["users_checked"] += len(user_ids)
+        report["batches"] += 1
+        last_id = user_ids[-1]
+    report["drift_bytes"] = sum(abs(row["expected_bytes"] - row["counted_bytes"]) for row in report["drift"])
+    await async_engine.dispose()
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcule les compteurs d'usage du stockage et rapporte les écarts")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="rapporter les écarts sans les corriger")
+    args = parser.parse_args()
+    result = asyncio.run(reconcile(args.batch_size, fix=not args.dry_run))
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["drift"] else 0)
@@ -0,0 +1,83 @@
+"""
+Autosave write-behind face aux écritures directes du canvas : un PUT ou un PATCH abandonne
+l'autosave en attente, qui ne doit pas l'écraser au flush suivant.
+
+Nécessite une base Postgres migrée (alembic upgrade head) désignée par DATABASE_URL ; ignoré
+sinon. Chaque exécution crée son propre utilisateur et ses projets.
+"""
+import os
+import uuid
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+API = "/api/v1"
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="module")
+def owner(client):
+    credentials = {"email": f"autosave-{uuid.uuid4().hex}@example.com", "password": "autosave-secret"}
+    user = client.post(f"{API}/auth/register", json={**credentials, "full_name": "Autosave"}).json()
+    token = client.post(f"{API}/auth/login", json=credentials).json()["access_token"]
+    return user["id"], {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def project_id(client, owner):
+    user_id, headers = owner
+    response = client.post(
+        f"{API}/projects/", json={"title": "Autosave", "canvas_data": {"objects": []}, "owner_id": user_id}, headers=headers
+    )
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def _autosave(client, headers, project_id, canvas_data):
+    response = client.put(f"{API}/projects/{project_id}/autosave", json={"canvas_data": canvas_data}, headers=headers)
+    assert response.status_code == 202
+    assert response.json()["state"] == "pending"
+
+
+def _canvas_after_flush(client, headers, project_id):
+    assert client.post(f"{API}/projects/{project_id}/autosave/flush", headers=headers).status_code == 200
+    project = client.get(f"{API}/projects/{project_id}", headers=headers).json()
+    return project["canvas_data"], project["canvas_version"]
+
+
+def test_put_discards_pending_autosave(client, owner, project_id):
+    _, headers = owner
+    _autosave(client, headers, project_id, {"objects": ["autosave"]})
+    response = client.put(f"{API}/projects/{project_id}", json={"canvas_data": {"objects": ["put"]}}, headers=headers)
+    assert response.status_code == 200
+
+    canvas_data, version = _canvas_after_flush(client, headers, project_id)
+    assert canvas_data == {"objects": ["put"]}
+    assert version == response.json()["canvas_version"]
+
+
+def test_patch_discards_pending_autosave(client, owner, project_id):
+    _, headers = owner
+    version = client.get(f"{API}/projects/{project_id}", headers=headers).json()["canvas_version"]
+    _autosave(client, headers, project_id, {"objects": ["autosave"]})
+    response = client.patch(
+        f"{API}/projects/{project_id}/canvas",
+        json={"version": version, "operations": [{"op": "add", "path": "/objects/-", "value": "patch"}]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    canvas_data, new_version = _canvas_after_flush(client, headers, project_id)
+    assert canvas_data == {"objects": ["patch"]}
+    assert new_version == response.json()["version"]
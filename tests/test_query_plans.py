@@ -0,0 +1,74 @@
+"""
+Plans des requêtes paginées par clé : chaque getter CRUD doit lire l'index composite attendu.
+
+Nécessite une base Postgres migrée (alembic upgrade head) désignée par DATABASE_URL ; ignoré
+sinon. Un volume synthétique est inséré puis analysé dans une transaction annulée en fin de
+module : sur des tables vides, les statistiques ne permettent pas de juger le plan. Les
+requêtes paginées doivent parcourir l'index dans l'ordre (Index Scan / Index Only Scan), sans
+tri ; la recherche plein texte et les lectures unitaires acceptent tout parcours de l'index.
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL is not set", allow_module_level=True)
+
+from app.core.database import engine
+from benchmarks.explain import CASES, ORDERED_SCANS, explain, index_scans
+
+# Lectures non paginées : le type de parcours est laissé au planner
+UNORDERED = {"ix_projects_search_vector", "uq_shared_projects_user_project", "ix_users_google_id"}
+
+# Les clés interrogées par CASES (utilisateur, catégorie et projet 1, type image) portent des
+# centaines de lignes (environ 5 % du volume), comme un gros compte en production : c'est là que
+# la pagination par clé doit lire l'index dans l'ordre plutôt que trier. Le reste est réparti.
+SYNTHETIC_DATA = [
+    """INSERT INTO users (id, email, full_name, is_active, google_id, created_at)
+       SELECT i, 'plan-' || i || '@example.com', 'Plan ' || i, i % 2 = 0,
+              CASE WHEN i % 10 = 0 THEN 'plan-g-' || i END, now() - i * interval '1 minute'
+       FROM generate_series(1, 5000) i ON CONFLICT (id) DO NOTHING""",
+    """INSERT INTO projects (title, canvas_data, is_public, format_type, owner_id, created_at, updated_at)
+       SELECT 'Projet ' || i, '{}'::jsonb, i % 3 = 0, CASE WHEN i % 20 = 10 THEN 'A5' ELSE 'A4' END,
+              CASE WHEN i % 20 = 0 THEN 1 ELSE 2 + i % 4999 END, now() - i * interval '1 minute', now()
+       FROM generate_series(1, 20000) i""",
+    """INSERT INTO categories (id, name, is_active)
+       SELECT i, 'plan-' || i, true FROM generate_series(1, 20) i ON CONFLICT (id) DO NOTHING""",
+    """INSERT INTO templates (title, canvas_data, thumbnail_url, is_active, category_id, created_at)
+       SELECT 'Template ' || i, '\\x00'::bytea, 'x', i % 10 <> 0, CASE WHEN i % 20 = 0 THEN 1 ELSE 2 + i % 19 END,
+              now() - i * interval '1 minute'
+       FROM generate_series(1, 20000) i""",
+    """INSERT INTO user_assets (filename, original_filename, cloudinary_url, file_type, file_size, user_id, created_at)
+       SELECT 'f' || i, 'f' || i, 'x', CASE WHEN i % 8 IN (0, 1) THEN 'image' ELSE 'document' END, 1000,
+              CASE WHEN i % 20 = 0 THEN 1 ELSE 2 + i % 4999 END, now() - i * interval '1 minute'
+       FROM generate_series(1, 20000) i""",
+    """INSERT INTO shared_projects (permission, project_id, shared_with_user_id, shared_at)
+       SELECT 'view', 1, u.id, now() - u.id * interval '1 second'
+       FROM users u WHERE u.id BETWEEN 1 AND 2000 AND EXISTS (SELECT 1 FROM projects WHERE id = 1)
+       ON CONFLICT DO NOTHING""",
+    """INSERT INTO shared_projects (permission, project_id, shared_with_user_id, shared_at)
+       SELECT 'view', p.id, 1, now() - p.id * interval '1 second'
+       FROM (SELECT id FROM projects ORDER BY id LIMIT 3000) p
+       ON CONFLICT DO NOTHING""",
+    "ANALYZE users, projects, categories, templates, user_assets, shared_projects",
+]
+
+
+@pytest.fixture(scope="module")
+def conn():
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        for statement in SYNTHETIC_DATA:
+            connection.exec_driver_sql(statement.replace("%", "%%"))
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        yield connection
+        transaction.rollback()
+
+
+@pytest.mark.parametrize("expected, getter", CASES, ids=[expected for expected, _ in CASES])
+def test_query_uses_index(conn, expected, getter):
+    scans = index_scans(explain(conn, getter))
+    nodes = [node for node, name in scans if name == expected]
+    assert nodes, f"{expected} not used, plan scans: {scans}"
+    if expected not in UNORDERED:
+        assert any(node in ORDERED_SCANS for node in nodes), f"{expected} not read in order: {scans}"